@@ -1,5 +1,5 @@
 from aocd.models import Puzzle
-from bs4 import BeautifulSoup
+import prose
 
 def puzzle_solved(puzzle_year, puzzle_day, puzzle_part):
     puzzle = Puzzle(year=puzzle_year, day=puzzle_day)
@@ -10,25 +10,34 @@ def puzzle_solved(puzzle_year, puzzle_day, puzzle_part):
     else:
         raise Exception(f'Unknown part {puzzle_part}')
 
-def puzzle_prose(puzzle_year, puzzle_day, puzzle_part):
-    prose = BeautifulSoup(Puzzle(year=puzzle_year, day=puzzle_day)._get_prose(), features="html.parser")
-    articles = [article.text for article in prose.find_all('article', class_='day-desc')]
-    if not articles:
-        return prose.text
+def answer(puzzle_year, puzzle_day, puzzle_part):
+    """Returns the correct answer of a part we've solved, or None."""
+    puzzle = Puzzle(year=puzzle_year, day=puzzle_day)
     if puzzle_part == 1:
-        return articles[0]
-    return '\n'.join(articles)
+        return puzzle.answer_a if puzzle.answered_a else None
+    elif puzzle_part == 2:
+        return puzzle.answer_b if puzzle.answered_b else None
+    else:
+        raise Exception(f'Unknown part {puzzle_part}')
+
+def puzzle_prose(puzzle_year, puzzle_day, puzzle_part):
+    return prose.extract(Puzzle(year=puzzle_year, day=puzzle_day)._get_prose(), puzzle_part)
 
 def input(puzzle_year, puzzle_day):
     return Puzzle(year=puzzle_year, day=puzzle_day).input_data
 
 def check_answer(puzzle_year, puzzle_day, puzzle_part, answer):
+    """Returns True or False, or None if the site didn't judge the answer.
+
+    aocd doesn't always submit, for instance when we answered too recently or it can tell
+    from earlier submissions that the answer is wrong, and the site may refuse to judge it.
+    """
     puzzle = Puzzle(year=puzzle_year, day=puzzle_day)
     if puzzle_part == 1:
         if puzzle.answered_a:
             return puzzle.answer_a == answer
         puzzle.answer_a = answer
-        return puzzle.answered_a
+        return True if puzzle.answered_a else _verdict(puzzle, 'a', answer)
     elif puzzle_part == 2:
         if puzzle_day == 25:
             raise Exception("There's no part 2 for day 25.")
@@ -41,6 +50,17 @@ def check_answer(puzzle_year, puzzle_day, puzzle_part, answer):
         if puzzle.answer_a == answer:
             return False
         puzzle.answer_b = answer
-        return puzzle.answered_b
+        return True if puzzle.answered_b else _verdict(puzzle, 'b', answer)
     else:
         raise Exception(f'Unknown part {puzzle_part}')
+
+def _verdict(puzzle, part, answer):
+    """What the site said the last time this answer was submitted: True, False or None if it didn't judge it."""
+    for result in reversed(puzzle.submit_results):
+        if result['part'] == part and result['value'] == answer:
+            if "That's the right answer" in result['message']:
+                return True
+            if "That's not the right answer" in result['message']:
+                return False
+            return None
+    return None
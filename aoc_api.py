@@ -1,9 +1,36 @@
-import aoc
+import atexit
+import concurrent.futures
 import gemini_driver
+from input_files import InputFiles
 import perform
+import preflight
 import prompt
 import ollama_driver
-from typing import List, Tuple, Union
+import os
+from puzzle_fixtures import PuzzleFixtures
+from puzzle_store import PuzzleStore
+import threading
+from typing import Dict, List, Tuple, Union
+
+# Puzzles are fetched from the Advent of Code site once, then served from the local store,
+# unless AOC_FIXTURES names fixtures to read them from, see set_puzzle_fixtures(). The aoc
+# module, and aocd with it, is only imported once puzzles are needed from the site.
+aoc = PuzzleFixtures(os.environ['AOC_FIXTURES']) if os.environ.get('AOC_FIXTURES') else None
+_aoc_lock = threading.Lock()
+
+def _puzzles():
+    """The puzzle source, the local store of the site's puzzles unless fixtures were set."""
+    global aoc
+    with _aoc_lock:
+        if aoc is None:
+            import aoc as aoc_site
+            aoc = PuzzleStore(aoc_site)
+        return aoc
+
+def set_puzzle_fixtures(path: str):
+    """Reads the puzzles from a puzzle_fixtures directory or zip file from now on, without going online."""
+    global aoc
+    aoc = PuzzleFixtures(path)
 
 def model_families() -> List[str]:
     """
@@ -37,10 +64,10 @@ def puzzle_instructions(puzzle_year: int, puzzle_day: int, puzzle_part: int) ->
         return ('error', 'there is no puzzle day 25 part 2')
     if puzzle_part > 1:
         precursor_puzzle_part = puzzle_part-1
-        if not aoc.puzzle_solved(puzzle_year, puzzle_day, precursor_puzzle_part):
+        if not _puzzles().puzzle_solved(puzzle_year, puzzle_day, precursor_puzzle_part):
             return ('sequence', (puzzle_year, puzzle_day, precursor_puzzle_part))
 
-    puzzle_prose = aoc.puzzle_prose(puzzle_year, puzzle_day, puzzle_part)
+    puzzle_prose = _puzzles().puzzle_prose(puzzle_year, puzzle_day, puzzle_part)
     
     return ('success', puzzle_prose)
 
@@ -99,49 +126,160 @@ def generate_program(model_family: str, model_name: str, full_prompt: str, puzzl
     else:
         raise Exception(f'Unknown model family {model_family}')
 
-def model_quota_timeout(model_family: str, model_name: str) -> int:
+def rate_limits(model_family: str, model_name: str) -> Dict[str, int]:
+    """Returns the quotas of a model.
+
+    Args:
+        model_family (str): The name of the model family.
+        model_name (str): The name of the model.
+
+    Returns:
+        Dict[str, int]: The number of requests allowed per 'minute' and per 'day'. Windows
+            without a quota are left out.
+    """
     if model_family == 'Gemini':
-        return gemini_driver.model_quota_timeout(model_name)
+        return gemini_driver.rate_limits(model_name)
     elif model_family == 'ollama':
-        return ollama_driver.model_quota_timeout(model_name)
+        return ollama_driver.rate_limits(model_name)
     else:
         raise Exception(f'Unknown model family {model_family}')
 
+def model_load_seconds(model_family: str) -> Dict[str, float]:
+    """Returns the time spent loading each of the family's models into memory so far.
+
+    Args:
+        model_family (str): The name of the model family.
+
+    Returns:
+        Dict[str, float]: model name -> seconds. Hosted models are never loaded by us, so
+            their families return an empty dict.
+    """
+    if model_family == 'ollama':
+        return ollama_driver.load_seconds()
+    return {}
+
+
+
+# Runs programs concurrently when set, see set_sandbox_pool().
+_sandbox_pool = None
+
+def set_sandbox_pool(pool):
+    """Runs programs on a sandbox_pool.SandboxPool from now on, or on the calling thread if pool is None."""
+    global _sandbox_pool
+    _sandbox_pool = pool
+
+# Programs that can't run are rejected before they're started.
+_preflight = preflight.Preflight()
+
+def preflight_stats() -> str:
+    """Describes how many programs were rejected without running them, and the time that saved."""
+    return _preflight.format_stats()
+
+# Outcomes of programs that have already run, see set_result_cache().
+_result_cache = None
+
+def set_result_cache(cache):
+    """Reuses the outcomes in a result_cache.ResultCache instead of running the same program twice, or always runs programs if cache is None."""
+    global _result_cache
+    _result_cache = cache
 
+# Puzzle inputs written to files for the programs' stdin, see input_file().
+_input_files = None
+_input_files_lock = threading.Lock()
 
-def run_program(puzzle_year: int, puzzle_day: int, puzzle_part: int, program: str, timeout: int) -> Tuple[str, Union[str, int]]:
-    """Tests the program in a safe environment.
+def input_file(puzzle_year: int, puzzle_day: int) -> perform.InputFile:
+    """Returns the puzzle's input as a file, fetching and writing it the first time it's needed."""
+    global _input_files
+    with _input_files_lock:
+        if _input_files is None:
+            _input_files = InputFiles()
+            atexit.register(_input_files.close)
+    return _input_files.get((puzzle_year, puzzle_day), lambda: _puzzles().input(puzzle_year, puzzle_day))
+
+def submit_program(puzzle_year: int, puzzle_day: int, puzzle_part: int, program: str, timeout: int) -> concurrent.futures.Future:
+    """Starts running the program on the sandbox pool, unless the result cache has its outcome.
+
+    Programs that can't run, such as prose or code with a syntax error, fail right away
+    without starting a sandbox process, see preflight.Preflight.
+
+    Returns:
+        concurrent.futures.Future: Resolves to the same tuple run_program returns. Without a
+            sandbox pool the program has already run by the time this returns.
+    """
+    assert(program)
+    if timeout == None:
+        timeout = 10
+    assert(timeout > 0)
+    rejection = _preflight.check(program)
+    if rejection is not None:
+        future = concurrent.futures.Future()
+        future.set_result(_program_result('error', rejection, None, timeout))
+        return future
+
+    input = input_file(puzzle_year, puzzle_day)
+    # A cached result has no profile, and a profiled run's CPU time includes the sampling.
+    cache, key, cached = None if perform.profiling() else _result_cache, None, None
+    if cache is not None:
+        key = cache.key(program, input, puzzle_part, timeout, warm=perform.warm_pool_running())
+        cached = cache.get(key)
+    if cached is not None:
+        job = concurrent.futures.Future()
+        job.set_result(cached)
+    elif _sandbox_pool is None:
+        job = concurrent.futures.Future()
+        job.set_result(perform.run_measured(program, input, [str(puzzle_part)], timeout))
+    else:
+        job = _sandbox_pool.submit(program, input, [str(puzzle_part)], timeout)
+
+    future = concurrent.futures.Future()
+    def done(job):
+        try:
+            if cached is None:
+                if cache is not None:
+                    cache.put(key, job.result())
+                if job.result()[0] == 'error':
+                    _preflight.observe_failure(job.result()[2])
+            future.set_result(_program_result(*job.result(), timeout))
+        except Exception as e:
+            future.set_exception(e)
+    job.add_done_callback(done)
+    return future
+
+def run_program(puzzle_year: int, puzzle_day: int, puzzle_part: int, program: str, timeout: int) -> Tuple[str, Union[str, int], perform.Usage | None]:
+    """Tests the program in a safe environment, with resource limits.
 
     Args:
         puzzle_year (int): The year of the puzzle.
         puzzle_day (int): The day of the puzzle.
         puzzle_part (int): The part of the puzzle (1 or 2).
         program (str): The program code to run.
-        timeout (int): The timeout in seconds.
+        timeout (int): The timeout in seconds of CPU time.
 
     Returns:
-        Tuple[str, Union[str, int]]: A tuple indicating the result of running the program:
-            - ('error', <error message>)
-            - ('timeout', <int timeout value>)
-            - ('answer', <answer>)
+        Tuple[str, Union[str, int], perform.Usage | None]: A tuple indicating the result of running
+        the program, and the CPU time and memory it used:
+            - ('error', <error message>, <usage>)
+            - ('timeout', <int timeout value>, <usage>)
+            - ('output_limit', <message>, <usage>) if it printed too much
+            - ('answer', <answer>, <usage>)
     """
-    assert(program)
-    if timeout == None:
-        timeout = 10
-    assert(timeout > 0)
-    input = aoc.input(puzzle_year, puzzle_day)
-    result, answer = perform.run(program, input, [str(puzzle_part)], timeout)
+    return submit_program(puzzle_year, puzzle_day, puzzle_part, program, timeout).result()
+
+def _program_result(result, answer, usage, timeout):
     if answer:
         answer = answer.strip()
     if result == 'error':
         print(f'computation failed: {answer}')
-        return (result, answer)
+        return (result, answer, usage)
     elif result == 'timeout':
         print('computation timed out')
-        return (result, timeout)
+        return (result, timeout, usage)
+    elif result == 'output_limit':
+        print(f'computation stopped: {answer}')
+        return (result, answer, usage)
     elif result == 'success':
         print(f'computation finished, answer: \'{answer}\'')
-        return('answer', answer)
+        return('answer', answer, usage)
     else:
         raise Exception(f'Unknown result {result}')
 
@@ -157,4 +295,12 @@ def check_answer(puzzle_year: int, puzzle_day: int, puzzle_part: int, answer: st
     Returns:
         bool: True if the answer is correct, False otherwise.
     """
-    return aoc.check_answer(puzzle_year, puzzle_day, puzzle_part, answer)
+    return _puzzles().check_answer(puzzle_year, puzzle_day, puzzle_part, answer)
+
+def verify_answers(answers: List[Tuple[int, int, int, str]]) -> List[bool | None]:
+    """Checks (puzzle_year, puzzle_day, puzzle_part, answer)s against the known answers, without submitting any.
+
+    Returns:
+        List[bool | None]: True or False for each answer, or None if it isn't known yet.
+    """
+    return _puzzles().verify_many(answers)
@@ -0,0 +1,68 @@
+import argparse
+import blobs
+import datetime
+import os
+import tempfile
+import time
+from db_util import create_or_open_puzzle_db, open_puzzle_db
+from experiment_runner import Attempt, save_attempt
+from rate_limiter import RateLimiter
+
+PROMPT = "x" * 5000
+PROGRAM = "import sys\nprint(sum(int(line) for line in sys.stdin))\n" * 20
+
+def cells(count):
+    for i in range(count):
+        yield 2015 + i // 50 % 10, i % 25 + 1, 1, 'Gemini', f'bench-{i // 500}'
+
+def per_puzzle_connection(db_name, count):
+    """The old runner: reopen and bootstrap the database for every puzzle and commit every statement."""
+    for puzzle_year, puzzle_day, puzzle_part, model_family, model_name in cells(count):
+        conn = create_or_open_puzzle_db(db_name)
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT OR IGNORE INTO Experiments (
+                model_family, model_name, puzzle_year, puzzle_day, puzzle_part,
+                prompt_hash, program_hash, experiment_started_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (model_family, model_name, puzzle_year, puzzle_day, puzzle_part,
+              blobs.put(cursor, PROMPT), blobs.put(cursor, PROGRAM), datetime.datetime.now()))
+        conn.commit()
+        cursor.execute("""
+            UPDATE Experiments
+            SET run_status = 'answer', answer = ?, answer_is_correct = ?, experiment_finished_at = ?
+            WHERE model_family = ? AND model_name = ? AND puzzle_year = ? AND puzzle_day = ? AND puzzle_part = ?
+        """, ('42', True, datetime.datetime.now(), model_family, model_name, puzzle_year, puzzle_day, puzzle_part))
+        conn.commit()
+        conn.close()
+
+def long_lived_session(db_name, count):
+    """The current runner: one connection, one transaction per attempt."""
+    create_or_open_puzzle_db(db_name).close()
+    conn = open_puzzle_db(db_name)
+    rate_limiter = RateLimiter({})
+    for cell in cells(count):
+        attempt = Attempt(*cell)
+        attempt.row.update(prompt=PROMPT, program=PROGRAM, experiment_started_at=datetime.datetime.now(),
+                           run_status='answer', answer='42', answer_is_correct=True,
+                           experiment_finished_at=datetime.datetime.now())
+        save_attempt(conn, attempt, rate_limiter)
+    conn.close()
+
+def measure(fn, count):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "puzzle.db")
+        start = time.perf_counter()
+        fn(db_name, count)
+        return (time.perf_counter() - start) / count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measures the database overhead of recording one attempt.")
+    parser.add_argument("--attempts", type=int, default=500, help="Number of attempts to record")
+    args = parser.parse_args()
+
+    before = measure(per_puzzle_connection, args.attempts)
+    after = measure(long_lived_session, args.attempts)
+    print(f"Per-puzzle connection: {before * 1000:.2f} ms per attempt")
+    print(f"Long-lived session:    {after * 1000:.2f} ms per attempt")
+    print(f"Speedup: {before / after:.1f}x")
@@ -0,0 +1,38 @@
+import argparse
+import time
+from aocd.models import AOCD_DATA_DIR
+import prose
+from test_prose import PAGE, beautiful_soup_prose
+
+def measure(extract, pages, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        for page in pages:
+            for puzzle_part in [1, 2]:
+                extract(page, puzzle_part)
+    return (time.perf_counter() - start) / (runs * len(pages) * 2)
+
+def uncached(page, puzzle_part):
+    prose._parse.cache_clear()
+    return prose.extract(page, puzzle_part)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares extracting puzzle prose with BeautifulSoup and with prose.extract.")
+    parser.add_argument("--runs", type=int, default=20, help="Number of times to extract each page")
+    args = parser.parse_args()
+
+    # The puzzle pages aocd has cached, or a sample page if there are none.
+    pages = [path.read_text(encoding='utf-8') for path in sorted(AOCD_DATA_DIR.glob('**/*_prose.*.html'))]
+    source = f"{len(pages)} cached pages"
+    if not pages:
+        pages, source = [PAGE], "the sample page"
+    different = sum(prose.extract(page, puzzle_part) != beautiful_soup_prose(page, puzzle_part)
+                    for page in pages for puzzle_part in [1, 2])
+    print(f"Extracted {source}, {different} of {len(pages) * 2} parts differ from BeautifulSoup")
+
+    soup = measure(beautiful_soup_prose, pages, args.runs)
+    parsed = measure(uncached, pages, args.runs)
+    cached = measure(prose.extract, pages, args.runs)
+    print(f"BeautifulSoup {soup * 1e6:8.1f} us per call")
+    print(f"prose.extract {parsed * 1e6:8.1f} us per call, {soup / parsed:.1f}x faster")
+    print(f"cached        {cached * 1e6:8.1f} us per call, {soup / cached:.0f}x faster")
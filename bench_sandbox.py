@@ -0,0 +1,180 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import aoc_api
+from input_files import InputFiles
+import perform
+from result_cache import ResultCache
+from sandbox_pool import SandboxPool
+
+# A program that does about 50 ms of work, for measuring throughput.
+CPU_PROGRAM = "print(sum(i * i for i in range(300000)))"
+# Reads its input like a typical solution.
+SUM_PROGRAM = "import sys\nprint(sum(int(line) for line in sys.stdin))"
+# Only reads its input, so the time is spent delivering it.
+READ_PROGRAM = "import sys\nprint(len(sys.stdin.read()))"
+
+class BenchAoc:
+    """Replaces aoc in aoc_api, so run_program gets an input without fetching one."""
+
+    def __init__(self, input):
+        self._input = input
+
+    def input(self, puzzle_year, puzzle_day):
+        return self._input
+
+def lines(size):
+    """A puzzle input of about `size` bytes, one number per line."""
+    return ''.join(f"{i % 100000}\n" for i in range(size // 6))
+
+def timed(fn, count):
+    """Calls fn count times and returns the times in milliseconds."""
+    times = []
+    for _ in range(count):
+        started_at = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started_at) * 1000)
+    return times
+
+def summary(times):
+    times = sorted(times)
+    return {'median_ms': statistics.median(times), 'p90_ms': times[int(len(times) * 0.9)], 'min_ms': times[0]}
+
+def expect(result, status):
+    assert result[0] == status, result
+
+def bench_spawn(runs):
+    """The time to run a program that does nothing, which is mostly starting it."""
+    return summary(timed(lambda: expect(perform.run("pass", '', [], 10), 'success'), runs))
+
+def bench_throughput(runs, max_jobs):
+    """Programs per second on a SandboxPool with 1 to max_jobs jobs at once."""
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    results = {}
+    for jobs in range(1, max_jobs + 1):
+        # Past one job per core, jobs share cores.
+        pool = SandboxPool(jobs, pin=jobs <= cores)
+        started_at = time.perf_counter()
+        futures = [pool.submit(CPU_PROGRAM, '', [], 10) for _ in range(runs)]
+        for future in futures:
+            expect(future.result(), 'success')
+        results[str(jobs)] = {'programs_per_second': runs / (time.perf_counter() - started_at)}
+        pool.shutdown()
+    return results
+
+def bench_large_stdin(runs, size):
+    """A large input written through a pipe, and given to the program as an InputFile."""
+    input = lines(size)
+    files = InputFiles()
+    input_file = files.get('bench', lambda: input)
+    results = {}
+    for name, stdin in [('pipe', input), ('file', input_file)]:
+        run = lambda: expect(perform.run(READ_PROGRAM, stdin, [], 10), 'success')
+        cpu_started_at = time.process_time()
+        results[name] = summary(timed(run, runs))
+        # The CPU time the runner spends on each run, which is where delivering the input costs.
+        results[name]['runner_cpu_ms'] = (time.process_time() - cpu_started_at) * 1000 / runs
+    files.close()
+    return results
+
+def bench_large_stdout(runs, size):
+    program = f"import sys\nsys.stdout.write('x' * {size})"
+    limits = perform.Limits(stdout_bytes=size)
+    return summary(timed(lambda: expect(perform.run_measured(program, '', [], 10, limits), 'success'), runs))
+
+def bench_timeout(runs):
+    """How long after a program's limit the run returns, for a CPU bound and a sleeping program."""
+    def overhead(program, limit_seconds):
+        times = timed(lambda: expect(perform.run(program, '', [], 1), 'timeout'), runs)
+        return summary([t - limit_seconds * 1000 for t in times])
+    return {
+        'cpu': overhead("while True:\n    pass", 1),
+        'sleep': overhead("import time\ntime.sleep(100)", perform.WALL_CLOCK_FACTOR),
+    }
+
+def bench_run_program(runs, size):
+    """aoc_api.run_program end to end: preflight, input, sandbox and result, with and without a result cache."""
+    aoc_api.aoc = BenchAoc(lines(size))
+    run = lambda: expect(aoc_api.run_program(2024, 1, 1, SUM_PROGRAM, 10), 'answer')
+    results = {'uncached': summary(timed(run, runs))}
+    aoc_api.set_result_cache(ResultCache())
+    run()
+    results['cached'] = summary(timed(run, runs))
+    aoc_api.set_result_cache(None)
+    return results
+
+def flatten(results, prefix=''):
+    """Turns nested results into {'a.b.c': value}, for comparing two runs."""
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+def compare(baseline, current):
+    """Prints each metric of the baseline next to the current value."""
+    if baseline['settings'] != current['settings']:
+        print(f"Warning: the baseline was run with {baseline['settings']}")
+    old, new = flatten(baseline['results']), flatten(current['results'])
+    print(f"{'metric':45} {baseline['commit'][:10]:>12} {current['commit'][:10]:>12} {'change':>8}")
+    for metric, value in new.items():
+        if metric in old:
+            change = f"{(value - old[metric]) / old[metric]:+.0%}" if old[metric] else ''
+            print(f"{metric:45} {old[metric]:12.2f} {value:12.2f} {change:>8}")
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measures the sandbox and writes the results to a JSON file for comparing commits.")
+    parser.add_argument("--runs", type=int, default=20, help="Number of runs for each measurement")
+    parser.add_argument("--timeout-runs", type=int, default=3, help="Number of runs for the timeout measurements, which take seconds each")
+    parser.add_argument("--max-jobs", type=int, default=os.cpu_count(), help="Measure throughput with 1 to this many programs at once")
+    parser.add_argument("--input-bytes", type=int, default=8 * 1024 ** 2, help="Size of the large input")
+    parser.add_argument("--output-bytes", type=int, default=8 * 1024 ** 2, help="Size of the large output")
+    parser.add_argument("--warm-sandbox", action="store_true", help="Run programs in forks of a warm interpreter, see zygote.py")
+    parser.add_argument("--output", default="bench_sandbox.json", help="Where to write the results")
+    parser.add_argument("--compare", help="A results file from an earlier run to compare with")
+    args = parser.parse_args()
+
+    if args.warm_sandbox:
+        perform.start_warm_pool()
+    results = {}
+    for name, bench in [
+        ('spawn', lambda: bench_spawn(args.runs)),
+        ('throughput', lambda: bench_throughput(args.runs, args.max_jobs)),
+        ('large_stdin', lambda: bench_large_stdin(args.runs, args.input_bytes)),
+        ('large_stdout', lambda: bench_large_stdout(args.runs, args.output_bytes)),
+        ('timeout_overhead', lambda: bench_timeout(args.timeout_runs)),
+        ('run_program', lambda: bench_run_program(args.runs, 20000)),
+    ]:
+        results[name] = bench()
+        print(f"{name}: {json.dumps(results[name])}")
+    perform.stop_warm_pool()
+
+    report = {
+        'commit': git_commit(),
+        'date': datetime.datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'settings': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
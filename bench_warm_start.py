@@ -0,0 +1,31 @@
+import argparse
+import time
+import perform
+from zygote import Zygote
+
+PROGRAMS = {
+    'print': "print(42)",
+    'numpy': "import numpy\nprint(numpy.arange(10).sum())",
+    'networkx': "import networkx\nprint(networkx.path_graph(10).number_of_edges())",
+}
+
+def measure(run, program, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        status, _ = run(program, '', ['1'], 60)
+        assert status == 'success', status
+    return (time.perf_counter() - start) / count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares starting every program in a new interpreter with forking a warm one.")
+    parser.add_argument("--runs", type=int, default=20, help="Number of runs of each program")
+    args = parser.parse_args()
+
+    started_at = time.perf_counter()
+    zygote = Zygote()
+    print(f"Zygote startup: {(time.perf_counter() - started_at) * 1000:.0f} ms")
+    for name, program in PROGRAMS.items():
+        cold = measure(perform.run, program, args.runs)
+        warm = measure(zygote.run, program, args.runs)
+        print(f"{name:10} cold {cold * 1000:7.1f} ms, warm {warm * 1000:7.1f} ms, speedup {cold / warm:.1f}x")
+    zygote.close()
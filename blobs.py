@@ -0,0 +1,90 @@
+import hashlib
+import zlib
+
+# Columns whose text is kept in the Blobs table, with the column that references it.
+BLOB_COLUMNS = {'prompt': 'prompt_hash', 'program': 'program_hash'}
+
+# Rows moved to Blobs per statement when migrating a database.
+_MIGRATE_BATCH = 1000
+
+def blob_hash(text: str) -> str:
+    """The sha256 of the text, the same hash that result_cache uses for programs."""
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def put(cursor, text: str | None) -> str | None:
+    """
+    Stores text in the Blobs table if it isn't there yet and returns its hash, or None for None.
+
+    Every model gets the same prompt for a puzzle, and models often write the same program,
+    so Experiments and ProgramRuns refer to their prompt and program by hash and each text is
+    stored once, compressed. The caller commits.
+    """
+    if text is None:
+        return None
+    key = blob_hash(text)
+    cursor.execute("INSERT OR IGNORE INTO Blobs (blob_hash, data) VALUES (?, ?)", (key, zlib.compress(text.encode())))
+    return key
+
+def text(cursor, key: str | None) -> str | None:
+    """Returns the text stored under a prompt_hash or program_hash, or None for None."""
+    if key is None:
+        return None
+    cursor.execute("SELECT data FROM Blobs WHERE blob_hash = ?", (key,))
+    row = cursor.fetchone()
+    if row is None:
+        raise KeyError(f"No blob {key}")
+    return decompress(row[0])
+
+def decompress(data: bytes | None) -> str | None:
+    """Blobs.data as text. Registered as the SQL function blob_text(data), see register()."""
+    return None if data is None else zlib.decompress(data).decode()
+
+def register(conn):
+    """Lets queries on conn read the text of a blob with blob_text(Blobs.data)."""
+    conn.create_function('blob_text', 1, decompress, deterministic=True)
+
+def prune(cursor) -> int:
+    """Deletes the blobs that no experiment or program run refers to anymore. Returns how many."""
+    cursor.execute("""
+        DELETE FROM Blobs WHERE blob_hash NOT IN (
+            SELECT prompt_hash FROM Experiments WHERE prompt_hash IS NOT NULL
+            UNION SELECT program_hash FROM Experiments WHERE program_hash IS NOT NULL
+            UNION SELECT prompt_hash FROM ProgramRuns WHERE prompt_hash IS NOT NULL
+            UNION SELECT program_hash FROM ProgramRuns WHERE program_hash IS NOT NULL
+        )
+    """)
+    return cursor.rowcount
+
+def migrate(cursor, tables=('Experiments', 'ProgramRuns')) -> int:
+    """
+    Moves the prompt and program text of databases from before the Blobs table into it,
+    replacing the prompt and program columns with prompt_hash and program_hash.
+    Returns the number of rows moved. The caller commits.
+
+    The space the text used is only given back to the file system by VACUUM.
+    """
+    moved = 0
+    for table in tables:
+        cursor.execute(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in cursor.fetchall()}
+        old_columns = [column for column in BLOB_COLUMNS if column in existing]
+        if not old_columns:
+            continue
+        for column in old_columns:
+            if BLOB_COLUMNS[column] not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {BLOB_COLUMNS[column]} TEXT")
+        last_rowid = 0
+        while True:
+            cursor.execute(f"SELECT rowid, {', '.join(old_columns)} FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                           (last_rowid, _MIGRATE_BATCH))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_rowid = rows[-1][0]
+            updates = [(*(put(cursor, value) for value in row[1:]), row[0]) for row in rows]
+            assignments = ', '.join(f"{BLOB_COLUMNS[column]} = ?" for column in old_columns)
+            cursor.executemany(f"UPDATE {table} SET {assignments} WHERE rowid = ?", updates)
+            moved += len(rows)
+        for column in old_columns:
+            cursor.execute(f"ALTER TABLE {table} DROP COLUMN {column}")
+    return moved
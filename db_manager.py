@@ -1,7 +1,9 @@
 import sqlite3
 import argparse
 import os
+import blobs
 from db_util import create_or_open_puzzle_db
+from rank_tables import rebuild_ranking_tables
 
 def display_db_status(conn):
     """Displays the current status of the database."""
@@ -13,7 +15,10 @@ def display_db_status(conn):
     cursor.execute("SELECT COUNT(*) FROM Experiments WHERE answer_is_correct = 1")
     solved_experiments = cursor.fetchone()[0]
 
-    cursor.execute("SELECT * FROM Experiments ORDER BY experiment_id DESC LIMIT 10")
+    cursor.execute("""
+        SELECT experiment_id, model_family, model_name, puzzle_year, puzzle_day, puzzle_part, run_status, answer_is_correct
+        FROM Experiments ORDER BY experiment_id DESC LIMIT 10
+    """)
     recent_experiments = cursor.fetchall()
 
     print("Database Status:")
@@ -21,7 +26,7 @@ def display_db_status(conn):
     print(f"  Solved Experiments: {solved_experiments}")
     print("\nRecent Experiments (Last 10):")
     for row in recent_experiments:
-        print(f"    ID: {row[0]}, Model: {row[1]}/{row[2]}, Puzzle: {row[3]}/{row[4]}/{row[5]}, Status: {row[7]}, Correct: {row[10]}")
+        print(f"    ID: {row[0]}, Model: {row[1]}/{row[2]}, Puzzle: {row[3]}/{row[4]}/{row[5]}, Status: {row[6]}, Correct: {row[7]}")
 
 def delete_experiments(conn, args):
     """Deletes experiment records based on command line arguments."""
@@ -44,6 +49,8 @@ def delete_experiments(conn, args):
     else:
         print("No deletion criteria specified.")
 
+    pruned = blobs.prune(cursor)
+    print(f"Deleted {pruned} prompts and programs no experiment uses anymore")
     conn.commit()
 
 def init_db(db_name="puzzle.db"):
@@ -61,6 +68,7 @@ if __name__ == "__main__":
     parser.add_argument("--status", action="store_true", help="Display the current database status")
     parser.add_argument("--delete", action="store_true", help="Delete experiment records")
     parser.add_argument("--init", action="store_true", help="Initialize the database (deletes existing database if it exists)")
+    parser.add_argument("--rebuild-ranks", action="store_true", help="Recompute the model, model family and year rank tables from scratch")
     parser.add_argument("--experiment_id", type=int, help="Experiment ID to delete")
     parser.add_argument("--model_family", type=str, help="Model family to delete experiments for")
     parser.add_argument("--model_name", type=str, help="Model name to delete experiments for")
@@ -79,4 +87,8 @@ if __name__ == "__main__":
         if args.delete:
             delete_experiments(conn, args)
 
+        if args.rebuild_ranks:
+            rebuild_ranking_tables(conn)
+            print("Rebuilt rank tables.")
+
         conn.close()
@@ -2,11 +2,20 @@ import sqlite3
 from sqlite3 import Connection
 import datetime
 from aoc_api import model_families, models
+import blobs
+from rank_tables import rebuild_ranking_tables
 
-def create_or_open_puzzle_db(db_name: str = "puzzle.db") -> Connection:
-    """Creates the puzzle.db database if it doesn't exist, otherwise opens it.
+# Columns added to tables after they were first released, so older databases need them added.
+_ADDED_COLUMNS = {
+    'Experiments': [('run_user_seconds', 'REAL'), ('run_system_seconds', 'REAL'), ('run_max_rss_kb', 'INTEGER'), ('run_profile', 'TEXT')],
+    'ProgramRuns': [('run_user_seconds', 'REAL'), ('run_system_seconds', 'REAL'), ('run_max_rss_kb', 'INTEGER'), ('run_profile', 'TEXT')],
+}
+
+def open_puzzle_db(db_name: str = "puzzle.db") -> Connection:
+    """Opens the puzzle database without creating tables or initializing models.
 
-    Also registers the modern datetime adapter and initializes ModelFamilies and Models tables.
+    Use this for extra connections to a database that create_or_open_puzzle_db has already
+    set up in the same process.
 
     Args:
         db_name: The name of the database file.
@@ -14,17 +23,58 @@ def create_or_open_puzzle_db(db_name: str = "puzzle.db") -> Connection:
     Returns:
         A sqlite3.Connection object.
     """
-
     sqlite3.register_adapter(datetime.datetime, lambda val: val.isoformat())
     sqlite3.register_converter("TIMESTAMP", lambda val: datetime.datetime.fromisoformat(val.decode()))
 
-    conn = sqlite3.connect(db_name, detect_types=sqlite3.PARSE_DECLTYPES)
+    # Several runners may share the database, wait for each other's writes rather than failing.
+    conn = sqlite3.connect(db_name, detect_types=sqlite3.PARSE_DECLTYPES, timeout=30)
+    blobs.register(conn)
+    return conn
+
+def add_missing_columns(cursor):
+    """Adds columns that schema.sql has but a database created by an older version doesn't."""
+    for table, columns in _ADDED_COLUMNS.items():
+        cursor.execute(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in cursor.fetchall()}
+        for column, column_type in columns:
+            if column not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+def create_or_open_puzzle_db(db_name: str = "puzzle.db") -> Connection:
+    """Creates the puzzle.db database if it doesn't exist, otherwise opens it.
+
+    Also registers the modern datetime adapter, initializes ModelFamilies and Models tables,
+    and installs the triggers that maintain the rank tables.
+
+    Args:
+        db_name: The name of the database file.
+
+    Returns:
+        A sqlite3.Connection object.
+    """
+
+    conn = open_puzzle_db(db_name)
     cursor = conn.cursor()
 
+    # Write-ahead logging lets runners and the web server read while another runner writes.
+    cursor.execute("PRAGMA journal_mode=WAL")
+
+    # The rank tables are maintained by triggers. Databases created before the triggers
+    # existed need a full recompute once they're installed.
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'ExperimentsRankInsert'")
+    rank_triggers_installed = cursor.fetchone() is not None
+
     # Create tables if they don't exist
     with open("schema.sql", "r") as f:
         schema = f.read()
     cursor.executescript(schema)
+    add_missing_columns(cursor)
+    moved = blobs.migrate(cursor)
+    if moved:
+        print(f"Moved the prompts and programs of {moved} rows to the Blobs table, run VACUUM on {db_name} to reclaim the space.")
+
+    if not rank_triggers_installed:
+        rebuild_ranking_tables(conn)
 
     # Initialize ModelFamilies and Models tables
     for family in model_families():
@@ -0,0 +1,66 @@
+import concurrent.futures
+import queue
+import threading
+from sqlite3 import Connection
+from typing import Any, Callable
+
+class DBWriter:
+    """
+    Serializes database writes onto a single thread that owns the connection.
+
+    Concurrent experiment lanes submit their writes here instead of opening their own
+    connections, so SQLite only ever sees one writer and no lane waits on a database lock.
+    """
+
+    def __init__(self, connect: Callable[[], Connection]):
+        """
+        Args:
+            connect: Opens the connection. It's called on the writer thread because
+                sqlite3 connections can only be used by the thread that created them.
+        """
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, args=(connect,), name="db-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn: Callable[..., Any], *args) -> concurrent.futures.Future:
+        """Schedules fn(conn, *args) on the writer thread and returns a Future for its result."""
+        future = concurrent.futures.Future()
+        self._queue.put((future, fn, args))
+        return future
+
+    def execute(self, sql: str, params=()) -> None:
+        """Executes and commits a single statement, blocking until it has been applied."""
+        self.submit(_execute_and_commit, sql, params).result()
+
+    def close(self):
+        """Applies all pending writes, then closes the connection."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self, connect):
+        conn, connect_error = None, None
+        try:
+            conn = connect()
+        except Exception as e:
+            connect_error = e
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            future, fn, args = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            if connect_error is not None:
+                future.set_exception(connect_error)
+                continue
+            try:
+                future.set_result(fn(conn, *args))
+            except BaseException as e:
+                conn.rollback()
+                future.set_exception(e)
+        if conn is not None:
+            conn.close()
+
+def _execute_and_commit(conn, sql, params):
+    conn.execute(sql, params)
+    conn.commit()
@@ -0,0 +1,39 @@
+from typing import List, Tuple
+
+# One step of an escalation policy: ('generate' or 'rerun', run timeout in seconds).
+Step = Tuple[str, int]
+
+ACTIONS = ['generate', 'rerun']
+
+# Generate a program and run it for 10 seconds. If it times out, give the same program
+# 100 seconds before paying for a new generation, which also gets 100 seconds.
+DEFAULT_POLICY = 'generate:10,rerun:100,generate:100'
+
+def parse_policy(text: str) -> List[Step]:
+    """Parses an escalation policy such as 'generate:10,rerun:100,generate:100'.
+
+    Each step says what to do after the previous step's program timed out: 'generate' asks
+    the model for a new program, 'rerun' runs the current program again. The number is the
+    run timeout for that step. The first step must generate a program.
+
+    Raises:
+        ValueError: If the policy is malformed.
+    """
+    steps = []
+    for item in text.split(','):
+        action, _, timeout = item.strip().partition(':')
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown escalation action '{action}', expected one of {', '.join(ACTIONS)}")
+        try:
+            timeout = int(timeout)
+        except ValueError:
+            raise ValueError(f"Escalation step '{item}' needs a timeout in seconds, e.g. {action}:10")
+        if timeout <= 0:
+            raise ValueError(f"Escalation step '{item}' needs a positive timeout")
+        steps.append((action, timeout))
+    if steps[0][0] != 'generate':
+        raise ValueError("The first escalation step must generate a program")
+    return steps
+
+def format_policy(steps: List[Step]) -> str:
+    return ','.join(f"{action}:{timeout}" for action, timeout in steps)
@@ -8,419 +8,559 @@ import sqlite3
 import time
 import datetime
 from aoc_api import *
-from db_util import create_or_open_puzzle_db
+from db_util import create_or_open_puzzle_db, open_puzzle_db
 import concurrent.futures
 import argparse
-
-def get_next_puzzle_to_solve(cursor, timed_out_models):
-    """
-    Determines the next puzzle to solve based on the prioritization rules.
-    Returns a tuple: (next_puzzle, more_puzzles_available)
-      - next_puzzle: A tuple representing the next puzzle to solve, or None if no puzzles are available.
-      - more_puzzles_available: A boolean indicating if there are more puzzles to solve, even if
-        they are currently blocked by timeouts.
-    """
-    cursor.execute("""
-        SELECT
-            e.puzzle_year,
-            e.puzzle_day,
-            e.puzzle_part,
-            e.model_family,
-            e.model_name
-        FROM
-            Experiments e
-        WHERE
-            e.answer_is_correct = 1
-        ORDER BY
-            e.puzzle_year DESC,
-            e.puzzle_day DESC,
-            e.puzzle_part DESC
-        LIMIT 1
-    """)
-    latest_solved = cursor.fetchone()
-
-    if latest_solved:
-        latest_year, latest_day, latest_part, _, _ = latest_solved
-    else:
-        latest_year, latest_day, latest_part = 2024, 0, 0
-
-    # Construct the query with timed-out families excluded
-    timed_out_placeholders = ','.join(['?'] * len(timed_out_models))
-
-    # Use f-string to safely incorporate the placeholders into the query
-    query = f"""
-        WITH generate_series(value) AS (
-            SELECT 1 UNION ALL SELECT 2 UNION ALL SELECT 3 UNION ALL SELECT 4 UNION ALL
-            SELECT 5 UNION ALL SELECT 6 UNION ALL SELECT 7 UNION ALL SELECT 8 UNION ALL
-            SELECT 9 UNION ALL SELECT 10 UNION ALL SELECT 11 UNION ALL SELECT 12 UNION ALL
-            SELECT 13 UNION ALL SELECT 14 UNION ALL SELECT 15 UNION ALL SELECT 16 UNION ALL
-            SELECT 17 UNION ALL SELECT 18 UNION ALL SELECT 19 UNION ALL SELECT 20 UNION ALL
-            SELECT 21 UNION ALL SELECT 22 UNION ALL SELECT 23 UNION ALL SELECT 24 UNION ALL
-            SELECT 25
-        ), ValidExperiments AS (
-            SELECT DISTINCT
-                e.puzzle_year,
-                e.puzzle_day,
-                e.model_family,
-                e.model_name
-            FROM
-                Experiments e
-            WHERE
-                e.puzzle_part = 1 AND e.answer_is_correct = 1
-        )
-        SELECT
-            m.model_family, m.model_name, y.puzzle_year, d.puzzle_day, p.puzzle_part
-        FROM
-            Models m
-        CROSS JOIN (
-            SELECT DISTINCT puzzle_year FROM (
-                SELECT puzzle_year FROM Experiments
-                UNION ALL
-                SELECT 2015 AS puzzle_year
-                UNION ALL
-                SELECT 2016 AS puzzle_year
-                UNION ALL
-                SELECT 2017 AS puzzle_year
-                UNION ALL
-                SELECT 2018 AS puzzle_year
-                UNION ALL
-                SELECT 2019 AS puzzle_year
-                UNION ALL
-                SELECT 2020 AS puzzle_year
-                UNION ALL
-                SELECT 2021 AS puzzle_year
-                UNION ALL
-                SELECT 2022 AS puzzle_year
-                UNION ALL
-                SELECT 2023 AS puzzle_year
-                UNION ALL
-                SELECT 2024 AS puzzle_year
-            )
-        ) y
-        CROSS JOIN (
-            SELECT DISTINCT puzzle_day FROM (
-                SELECT puzzle_day FROM Experiments
-                UNION ALL
-                SELECT value AS puzzle_day FROM generate_series
-            )
-        ) d
-        CROSS JOIN (
-            SELECT DISTINCT puzzle_part FROM (
-                SELECT puzzle_part FROM Experiments
-                UNION
-                SELECT 1 AS puzzle_part
-                UNION
-                SELECT 2 AS puzzle_part
-            )
-        ) p
-        LEFT JOIN
-            Experiments e ON m.model_family = e.model_family
-            AND m.model_name = e.model_name
-            AND y.puzzle_year = e.puzzle_year
-            AND d.puzzle_day = e.puzzle_day
-            AND p.puzzle_part = e.puzzle_part
-        WHERE e.experiment_id IS NULL
-        AND NOT (d.puzzle_day = 25 AND p.puzzle_part = 2)
-        AND (p.puzzle_part = 1 OR EXISTS (
-            SELECT 1
-            FROM ValidExperiments ve
-            WHERE ve.model_family = m.model_family
-            AND ve.model_name = m.model_name
-            AND ve.puzzle_year = y.puzzle_year
-            AND ve.puzzle_day = d.puzzle_day
-        ))
-        AND m.model_name NOT IN ({timed_out_placeholders})
-        LIMIT 1
+import blobs
+import dataclasses
+import json
+from typing import Any, Dict, List
+from scheduler import ModelAffinity, WorkFrontier
+from db_writer import DBWriter
+from escalation import DEFAULT_POLICY, Step, parse_policy
+from pipeline import Pipeline
+from rate_limiter import RateLimiter
+from result_cache import ResultCache
+import perform
+import profiler
+from sandbox_pool import SandboxPool
+import simulation
+from work_claims import claim_cell, default_worker_id, release_cell, renew_leases
+
+# Model families whose models are loaded into local memory, and how many attempts to run with
+# one of their models before switching to the next.
+AFFINITY_FAMILIES = ['ollama']
+AFFINITY_BATCH_SIZE = 50
+
+def run_experiment(workers=1, lanes='model', pipelined=False, execute_workers=1, queue_size=2,
+                   worker_id=None, families=None, batch_size=AFFINITY_BATCH_SIZE, escalation=DEFAULT_POLICY,
+                   db_name="puzzle.db", result_cache=True):
+    """Runs the experiment.
+
+    Puzzles are attempted on up to `workers` lanes at once. Each lane is a model (or a model
+    family when lanes='family') with at most one attempt in flight, so a slow model or a long
+    sandbox run only holds up its own lane. All database writes go through one DBWriter.
+    With workers=1 puzzles are processed one at a time.
+
+    When pipelined is True the generate, execute and check stages of the attempts run on
+    separate thread pools connected by queues, so the next program is generated while the
+    current one executes. Stage stats are printed every STATS_INTERVAL_SECONDS.
+
+    Several runners can share the database, for example one per model family (see `families`).
+    Each puzzle is claimed in the WorkClaims table under `worker_id` before it's attempted, and
+    the claim is kept alive by renewing its lease while the attempt runs.
+
+    Models of the AFFINITY_FAMILIES run `batch_size` attempts in a row before the runner
+    switches to another model of the same family, so ollama doesn't reload weights for
+    every puzzle. Model switches and load times are printed with the stats.
+
+    `escalation` is the policy for programs that time out, see escalation.parse_policy.
+
+    With result_cache a program that has already run on the same input and part with the same
+    timeout isn't run again, see result_cache.ResultCache. Hits and misses are printed with
+    the stats.
+
+    Returns a RunStats with the number of attempts and the time the main loop spent scheduling.
     """
+    worker_id = worker_id or default_worker_id()
+    stats = RunStats()
+    conn = create_or_open_puzzle_db(db_name)
+    cursor = conn.cursor()
 
-    # Execute the query, passing in the timed_out_families list
-    cursor.execute(query, timed_out_models)
-
-    next_puzzle = cursor.fetchone()
-
-    # Check if there are any more puzzles left to solve, even if some are blocked by timeouts
-    cursor.execute(f"""
-        WITH generate_series(value) AS (
-            SELECT 1 UNION ALL SELECT 2 UNION ALL SELECT 3 UNION ALL SELECT 4 UNION ALL
-            SELECT 5 UNION ALL SELECT 6 UNION ALL SELECT 7 UNION ALL SELECT 8 UNION ALL
-            SELECT 9 UNION ALL SELECT 10 UNION ALL SELECT 11 UNION ALL SELECT 12 UNION ALL
-            SELECT 13 UNION ALL SELECT 14 UNION ALL SELECT 15 UNION ALL SELECT 16 UNION ALL
-            SELECT 17 UNION ALL SELECT 18 UNION ALL SELECT 19 UNION ALL SELECT 20 UNION ALL
-            SELECT 21 UNION ALL SELECT 22 UNION ALL SELECT 23 UNION ALL SELECT 24 UNION ALL
-            SELECT 25
-        ), ValidExperiments AS (
-            SELECT DISTINCT
-                e.puzzle_year,
-                e.puzzle_day,
-                e.model_family,
-                e.model_name
-            FROM
-                Experiments e
-            WHERE
-                e.puzzle_part = 1 AND e.answer_is_correct = 1
-        )
-        SELECT 1
-        FROM
-            Models m
-        CROSS JOIN (
-            SELECT DISTINCT puzzle_year FROM (
-                SELECT puzzle_year FROM Experiments
-                UNION ALL
-                SELECT 2015 AS puzzle_year
-                UNION ALL
-                SELECT 2016 AS puzzle_year
-                UNION ALL
-                SELECT 2017 AS puzzle_year
-                UNION ALL
-                SELECT 2018 AS puzzle_year
-                UNION ALL
-                SELECT 2019 AS puzzle_year
-                UNION ALL
-                SELECT 2020 AS puzzle_year
-                UNION ALL
-                SELECT 2021 AS puzzle_year
-                UNION ALL
-                SELECT 2022 AS puzzle_year
-                UNION ALL
-                SELECT 2023 AS puzzle_year
-                UNION ALL
-                SELECT 2024 AS puzzle_year
-            )
-        ) y
-        CROSS JOIN (
-            SELECT DISTINCT puzzle_day FROM (
-                SELECT puzzle_day FROM Experiments
-                UNION ALL
-                SELECT value AS puzzle_day FROM generate_series
-            )
-        ) d
-        CROSS JOIN (
-            SELECT DISTINCT puzzle_part FROM (
-                SELECT puzzle_part FROM Experiments
-                UNION
-                SELECT 1 AS puzzle_part
-                UNION
-                SELECT 2 AS puzzle_part
-            )
-        ) p
-        LEFT JOIN
-            Experiments e ON m.model_family = e.model_family
-            AND m.model_name = e.model_name
-            AND y.puzzle_year = e.puzzle_year
-            AND d.puzzle_day = e.puzzle_day
-            AND p.puzzle_part = e.puzzle_part
-        WHERE e.experiment_id IS NULL
-        AND NOT (d.puzzle_day = 25 AND p.puzzle_part = 2)
-        AND (p.puzzle_part = 1 OR EXISTS (
-            SELECT 1
-            FROM ValidExperiments ve
-            WHERE ve.model_family = m.model_family
-            AND ve.model_name = m.model_name
-            AND ve.puzzle_year = y.puzzle_year
-            AND ve.puzzle_day = d.puzzle_day
-        ))
-        LIMIT 1
-    """)
-    more_puzzles_available = cursor.fetchone() is not None
-
-    if next_puzzle:
-        model_family, model_name, puzzle_year, puzzle_day, puzzle_part = next_puzzle
-        return (puzzle_year, puzzle_day, puzzle_part, model_family, model_name), more_puzzles_available
+    # Build the set of pending puzzles once, then keep it up to date as attempts finish.
+    frontier = WorkFrontier(cursor, families)
+
+    cursor.execute("SELECT model_name, model_family FROM Models")
+    family_of = {model_name: model_family for model_name, model_family in cursor.fetchall()
+                 if families is None or model_family in families}
+    lane_of = {model_name: (model_name if lanes == 'model' else model_family) for model_name, model_family in family_of.items()}
+
+    # Stay on one local model for a batch of puzzles instead of reloading models all the time.
+    affinity = ModelAffinity({family: [m for m, f in family_of.items() if f == family]
+                              for family in AFFINITY_FAMILIES if family in family_of.values()}, batch_size)
+
+    # Only schedule a model when its quota has room for another request.
+    rate_limiter = create_rate_limiter(cursor)
+
+    # Reuse the outcomes of programs that have run before.
+    cache = None
+    if result_cache:
+        cache = ResultCache()
+        cache.load(cursor)
+        set_result_cache(cache)
+
+    # The schema and models were set up above, the writer's connection skips that.
+    ctx = RunContext(DBWriter(lambda: open_puzzle_db(db_name)), rate_limiter, worker_id, parse_policy(escalation), cache)
+    running = {}  # Future -> (puzzle, lane)
+    last_heartbeat_at = time.monotonic()
+    last_stats_at = time.monotonic()
+
+    def print_stats():
+        if pipelined:
+            print(f"Pipeline: {stages.format_stats()}")
+        for model_family, switches in affinity.switches.items():
+            load_seconds = sum(model_load_seconds(model_family).values())
+            print(f"{model_family}: {switches} model switches, {load_seconds:.1f} seconds loading models")
+        if cache is not None:
+            print(f"Result cache: {cache.format_stats()}")
+        print(f"Preflight: {preflight_stats()}")
+
+    if pipelined:
+        stages = create_pipeline(ctx, workers, execute_workers, queue_size)
+        start_attempt = stages.submit
     else:
-        return None, more_puzzles_available  # Indicates no more puzzles to solve right now
-
-def run_experiment():
-    """Runs the experiment, processing one puzzle at a time."""
-    conn = create_or_open_puzzle_db()
-    cursor = conn.cursor()
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lane")
+        start_attempt = lambda attempt: executor.submit(run_attempt, attempt, ctx)
 
     while True:
-        # Check for quota timeouts for all model families
-        cursor.execute("SELECT model_name FROM QuotaTimeouts WHERE timeout_until > ?", (datetime.datetime.now(),))
-        timed_out_models = [row[0] for row in cursor.fetchall()]
-
-        # Get the next puzzle to solve
-        next_puzzle, more_puzzles_available = get_next_puzzle_to_solve(cursor, timed_out_models)
-        if next_puzzle is None:
-            if more_puzzles_available:
-                # Find the earliest timeout expiry among timed-out models.
-                cursor.execute("SELECT MIN(timeout_until) FROM QuotaTimeouts WHERE timeout_until > ?", (datetime.datetime.now(),))
-                next_available_time_str = cursor.fetchone()[0]
-
-                if next_available_time_str is not None:
-                    # Convert the string to a datetime object.
-                    next_available_time = datetime.datetime.fromisoformat(next_available_time_str)
-
+        # Puzzles held by other runners may have been released or finished by now
+        frontier.release_deferred(datetime.datetime.now())
+
+        # Models that are out of quota for now
+        timed_out_models = [model_name for model_name in lane_of if not rate_limiter.available(model_name)]
+
+        # Fill free lanes with the next puzzles to solve
+        busy_lanes = {lane for _, lane in running.values()}
+        excluded_models = set(timed_out_models) | {m for m, lane in lane_of.items() if lane in busy_lanes}
+        excluded_models |= affinity.excluded_models(frontier, (puzzle[4] for puzzle, _ in running.values()))
+        while len(running) < workers:
+            next_puzzle = frontier.next_puzzle(excluded_models)
+            if next_puzzle is None:
+                break
+            puzzle_year, puzzle_day, puzzle_part, model_family, model_name = next_puzzle
+
+            # Make sure no other runner is working on the puzzle
+            status, info = ctx.writer.submit(claim_cell, next_puzzle, worker_id, LEASE_SECONDS).result()
+            if status == 'done':
+                frontier.record_attempt(next_puzzle, info)
+                continue
+            elif status == 'held':
+                frontier.defer(next_puzzle, info)
+                continue
+
+            lane = lane_of[model_name]
+            excluded_models |= {m for m, l in lane_of.items() if l == lane}
+            affinity.started(model_family, model_name)
+            excluded_models |= affinity.excluded_models(frontier, [model_name])
+
+            # Run the experiment for the selected puzzle
+            print(f"Attempting puzzle {puzzle_year}/{puzzle_day}/{puzzle_part} with model {model_family}/{model_name}")
+            future = start_attempt(Attempt(puzzle_year, puzzle_day, puzzle_part, model_family, model_name))
+            running[future] = (next_puzzle, lane)
+            stats.attempts_started += 1
+
+        # Find when the first timed-out model gets its quota back, or a deferred puzzle can be retried.
+        next_available_time = min(filter(None, [rate_limiter.next_available_time(timed_out_models), frontier.next_deferred_time()]), default=None)
+
+        if not running:
+            if frontier.more_puzzles_available():
+                if next_available_time is not None:
                     # Calculate sleep duration based on the earliest timeout.
                     sleep_duration = max(0, (next_available_time - datetime.datetime.now()).total_seconds())
                     print(f"All models are timed out. Sleeping for {sleep_duration:.0f} seconds (until {next_available_time}).")
                     time.sleep(sleep_duration)
+                    stats.waiting_seconds += sleep_duration
                     continue
                 else:
                     print("Warning: Could not determine the next available time. Retrying after a short delay.")
                     time.sleep(60)
+                    stats.waiting_seconds += 60
                     continue
             else:
                 print("All puzzles have been attempted.")
                 break  # Exit the loop if no more puzzles
 
-        puzzle_year, puzzle_day, puzzle_part, model_family, model_name = next_puzzle
-
-        # Run the experiment for the selected puzzle
-        print(f"Attempting puzzle {puzzle_year}/{puzzle_day}/{puzzle_part} with model {model_family}/{model_name}")
-        result = run_experiment_for_puzzle(puzzle_year, puzzle_day, puzzle_part, model_family, model_name)
-
-        # If a quota error occurred, handle it
-        if result == 'quota_error':
-            print(f"Quota exhausted for {model_name}. Recording timeout and skipping.")
-            cursor.execute("INSERT OR REPLACE INTO QuotaTimeouts (model_name, timeout_until) VALUES (?, ?)",
-                           (model_name, datetime.datetime.now() + datetime.timedelta(seconds=model_quota_timeout(model_family, model_name))))
-            conn.commit()
-            # Don't continue here, so we can update ranking tables
+        # Wait for a lane to finish, for a timed-out model to become available again, or until
+        # it's time to renew our leases.
+        wait_timeout = HEARTBEAT_SECONDS
+        if next_available_time is not None:
+            wait_timeout = min(wait_timeout, max(0, (next_available_time - datetime.datetime.now()).total_seconds()))
+        wait_started_at = time.perf_counter()
+        done, _ = concurrent.futures.wait(running, timeout=wait_timeout, return_when=concurrent.futures.FIRST_COMPLETED)
+        stats.waiting_seconds += time.perf_counter() - wait_started_at
+
+        if time.monotonic() - last_heartbeat_at >= HEARTBEAT_SECONDS:
+            ctx.writer.submit(renew_leases, worker_id, LEASE_SECONDS).result()
+            last_heartbeat_at = time.monotonic()
+
+        for future in done:
+            next_puzzle, _ = running.pop(future)
+            stats.attempts_finished += 1
+            puzzle_year, puzzle_day, puzzle_part, model_family, model_name = next_puzzle
+            try:
+                attempt = future.result()
+            except Exception as e:
+                print(f"Experiment for {model_family}/{model_name} on {puzzle_year}/{puzzle_day}/{puzzle_part} failed: {e}")
+                ctx.writer.submit(release_claim, next_puzzle, worker_id).result()
+                frontier.skip(next_puzzle)
+                continue
+            ctx.writer.submit(save_attempt, attempt, rate_limiter, worker_id, cache).result()
+
+            # A quota error leaves the puzzle pending, it's retried once the quota allows.
+            if attempt.result == 'quota_error':
+                print(f"Quota exhausted for {model_name}. Skipping until the quota refills.")
+            elif attempt.row:
+                frontier.record_attempt(next_puzzle, attempt.row.get('answer_is_correct'))
+            else:
+                frontier.skip(next_puzzle)
 
-        # Update the ranking tables after each puzzle attempt
-        update_ranking_tables(conn)
+        if time.monotonic() - last_stats_at >= STATS_INTERVAL_SECONDS:
+            print_stats()
+            last_stats_at = time.monotonic()
 
+    print_stats()
+    if pipelined:
+        stages.close()
+    else:
+        executor.shutdown()
+    ctx.writer.close()
     conn.close()
-    
-def run_experiment_for_puzzle(puzzle_year, puzzle_day, puzzle_part, model_family, model_name):
-    """Runs the experiment for a single puzzle."""
-    conn = create_or_open_puzzle_db()
-    cursor = conn.cursor()
-
-    for timeout in [10, 100]:
-        previous_attempt_timed_out = timeout > 10
-        instructions_result = puzzle_instructions(puzzle_year, puzzle_day, puzzle_part)
-
-        if instructions_result[0] == 'error':
-            print(f"Error getting instructions: {instructions_result[1]}")
-            break  # Exit timeout loop, move on to next puzzle
-        elif instructions_result[0] == 'sequence':
-            print(f"Need to solve {instructions_result[1]} first")
-            break  # Exit timeout loop, move on to next puzzle
-        elif instructions_result[0] == 'success':
-            instructions = instructions_result[1]
-
-        prompt_result = create_prompt(
-            model_family, model_name, puzzle_year, puzzle_day, puzzle_part,
-            previous_attempt_timed_out, instructions
-        )
-
-        if prompt_result[0] == 'error':
-            print(f"Error creating prompt: {prompt_result[1]}")
-            break  # Exit timeout loop, move on to next puzzle
-        elif prompt_result[0] == 'success':
-            full_prompt = prompt_result[1]
-
-        print(f"Running experiment for {model_family}/{model_name} on {puzzle_year}/{puzzle_day}/{puzzle_part} with timeout {timeout}")
-
-        generate_result = generate_program(
-            model_family, model_name, full_prompt, puzzle_year, puzzle_day, puzzle_part
-        )
-
-        if generate_result[0] == 'quota':
-            print(f"Quota exhausted for {model_name}: {generate_result[1]}")
-            timeout_seconds = model_quota_timeout(model_family, model_name)
-            cursor.execute("INSERT OR REPLACE INTO QuotaTimeouts (model_name, timeout_until) VALUES (?, ?)",
-                           (model_name, datetime.datetime.now() + datetime.timedelta(seconds=timeout_seconds)))
-            conn.commit()
-            conn.close()
-            return 'quota_error'
-        elif generate_result[0] == 'error':
-            print(f"Error generating program: {generate_result[1]}")
-            break  # Exit timeout loop, move on to next puzzle
-        elif generate_result[0] == 'success':
-            program = generate_result[1]
-
-        # Use INSERT OR IGNORE to avoid uniqueness constraint violation on timeout retries
-        cursor.execute("""
-            INSERT OR IGNORE INTO Experiments (
-                model_family, model_name, puzzle_year, puzzle_day, puzzle_part,
-                prompt, program, experiment_started_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (model_family, model_name, puzzle_year, puzzle_day, puzzle_part, full_prompt, program, datetime.datetime.now()))
-        conn.commit()
-
-        run_result = run_program(puzzle_year, puzzle_day, puzzle_part, program, timeout)
+    if cache is not None:
+        set_result_cache(None)
+    stats.elapsed_seconds = time.perf_counter() - stats.started_at
+    return stats
+
+def create_rate_limiter(cursor):
+    """Creates a RateLimiter with the quotas declared by the drivers and the budgets left from earlier runs."""
+    limits = {model_name: rate_limits(model_family, model_name)
+              for model_family in model_families() for model_name in models(model_family)}
+    rate_limiter = RateLimiter(limits)
+    rate_limiter.load(cursor)
+    return rate_limiter
+
+@dataclasses.dataclass
+class RunStats:
+    """Counters for a run of the experiment. The main loop's scheduling time is the time it
+    spent neither waiting for attempts to finish nor sleeping until a model is available."""
+    attempts_started: int = 0
+    attempts_finished: int = 0
+    waiting_seconds: float = 0.0
+    elapsed_seconds: float = 0.0
+    started_at: float = dataclasses.field(default_factory=time.perf_counter)
+
+    @property
+    def scheduling_seconds(self) -> float:
+        return self.elapsed_seconds - self.waiting_seconds
+
+@dataclasses.dataclass
+class RunContext:
+    """State shared by the stages of all attempts."""
+    writer: DBWriter
+    rate_limiter: RateLimiter
+    worker_id: str | None = None
+    # What to do when a program times out, see escalation.parse_policy.
+    escalation: List[Step] = dataclasses.field(default_factory=lambda: parse_policy(DEFAULT_POLICY))
+    result_cache: ResultCache | None = None
+
+# How long a claim on a puzzle lasts without being renewed, and how often running claims are renewed.
+LEASE_SECONDS = 300
+HEARTBEAT_SECONDS = 60
+
+# How often the runner prints its stats.
+STATS_INTERVAL_SECONDS = 60
+
+@dataclasses.dataclass
+class Attempt:
+    """The state of one attempt at a puzzle as it moves through the generate, execute and check stages."""
+    puzzle_year: int
+    puzzle_day: int
+    puzzle_part: int
+    model_family: str
+    model_name: str
+    # The current step of the escalation policy, and the run timeout it allows.
+    step: int = 0
+    timeout: int | None = None
+    # How many programs have been generated, and the latest prompt and program.
+    generation: int = 0
+    prompt: str | None = None
+    program: str | None = None
+    answer: str | None = None
+    result: str = 'success'
+    # Experiments columns to record once the attempt is over, see save_attempt.
+    row: Dict[str, Any] = dataclasses.field(default_factory=dict)
+    # A ProgramRuns row for every time a program was run.
+    runs: List[Dict[str, Any]] = dataclasses.field(default_factory=list)
+    quota_timeout_until: datetime.datetime | None = None
+
+    def key(self):
+        return (self.model_family, self.model_name, self.puzzle_year, self.puzzle_day, self.puzzle_part)
+
+_INSERT_EXPERIMENT = """
+    INSERT OR IGNORE INTO Experiments (
+        model_family, model_name, puzzle_year, puzzle_day, puzzle_part,
+        prompt_hash, program_hash, run_status, run_error_message, run_timeout_seconds,
+        answer, answer_is_correct, experiment_started_at, experiment_finished_at,
+        run_user_seconds, run_system_seconds, run_max_rss_kb, run_profile
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_EXPERIMENT_COLUMNS = [
+    'prompt', 'program', 'run_status', 'run_error_message', 'run_timeout_seconds',
+    'answer', 'answer_is_correct', 'experiment_started_at', 'experiment_finished_at',
+    'run_user_seconds', 'run_system_seconds', 'run_max_rss_kb', 'run_profile'
+]
+
+_INSERT_PROGRAM_RUN = """
+    INSERT INTO ProgramRuns (
+        model_family, model_name, puzzle_year, puzzle_day, puzzle_part,
+        generation, prompt_hash, program_hash, run_status, run_error_message, run_timeout_seconds,
+        run_seconds, answer, answer_is_correct, run_started_at, run_finished_at,
+        run_user_seconds, run_system_seconds, run_max_rss_kb, run_profile
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_PROGRAM_RUN_COLUMNS = [
+    'generation', 'prompt', 'program', 'run_status', 'run_error_message', 'run_timeout_seconds',
+    'run_seconds', 'answer', 'answer_is_correct', 'run_started_at', 'run_finished_at',
+    'run_user_seconds', 'run_system_seconds', 'run_max_rss_kb', 'run_profile'
+]
+
+def save_attempt(conn, attempt, rate_limiter, worker_id=None, result_cache=None):
+    """Records everything an attempt changed in a single transaction, releasing its claim.
+
+    The stages collect the attempt's Experiments row in attempt.row instead of inserting it and
+    then updating it after every step. The SQL strings are constants so that sqlite3 reuses
+    their prepared statements on the long-lived writer connection.
+    """
+    def values(row, columns):
+        # The prompt and program go in the Blobs table, the rows refer to them by hash.
+        return [blobs.put(conn, row.get(column)) if column in blobs.BLOB_COLUMNS else row.get(column) for column in columns]
+
+    with conn:
+        if attempt.row:
+            conn.execute(_INSERT_EXPERIMENT, (*attempt.key(), *values(attempt.row, _EXPERIMENT_COLUMNS)))
+        conn.executemany(_INSERT_PROGRAM_RUN, [(*attempt.key(), *values(run, _PROGRAM_RUN_COLUMNS)) for run in attempt.runs])
+        if attempt.quota_timeout_until is not None:
+            conn.execute("INSERT OR REPLACE INTO QuotaTimeouts (model_name, timeout_until) VALUES (?, ?)",
+                         (attempt.model_name, attempt.quota_timeout_until))
+        rate_limiter.save(conn)
+        if result_cache is not None:
+            result_cache.save(conn)
+        if worker_id is not None:
+            release_cell(conn, (attempt.puzzle_year, attempt.puzzle_day, attempt.puzzle_part, attempt.model_family, attempt.model_name), worker_id)
+
+def release_claim(conn, cell, worker_id):
+    with conn:
+        release_cell(conn, cell, worker_id)
+
+def generate_stage(attempt, ctx):
+    """Builds the prompt and generates a program. Returns the next stage, or None when the attempt is over."""
+    puzzle_year, puzzle_day, puzzle_part = attempt.puzzle_year, attempt.puzzle_day, attempt.puzzle_part
+    model_family, model_name = attempt.model_family, attempt.model_name
+    previous_attempt_timed_out = attempt.step > 0
+    attempt.timeout = ctx.escalation[attempt.step][1]
+    instructions_result = puzzle_instructions(puzzle_year, puzzle_day, puzzle_part)
+
+    if instructions_result[0] == 'error':
+        print(f"Error getting instructions: {instructions_result[1]}")
+        return None  # Move on to next puzzle
+    elif instructions_result[0] == 'sequence':
+        print(f"Need to solve {instructions_result[1]} first")
+        return None  # Move on to next puzzle
+    elif instructions_result[0] == 'success':
+        instructions = instructions_result[1]
+
+    prompt_result = create_prompt(
+        model_family, model_name, puzzle_year, puzzle_day, puzzle_part,
+        previous_attempt_timed_out, instructions
+    )
+
+    if prompt_result[0] == 'error':
+        print(f"Error creating prompt: {prompt_result[1]}")
+        return None  # Move on to next puzzle
+    elif prompt_result[0] == 'success':
+        full_prompt = prompt_result[1]
+
+    print(f"Running experiment for {model_family}/{model_name} on {puzzle_year}/{puzzle_day}/{puzzle_part} with timeout {attempt.timeout}")
+
+    ctx.rate_limiter.acquire(model_name)
+    generate_result = generate_program(
+        model_family, model_name, full_prompt, puzzle_year, puzzle_day, puzzle_part
+    )
+
+    if generate_result[0] == 'quota':
+        print(f"Quota exhausted for {model_name}: {generate_result[1]}")
+        ctx.rate_limiter.exhausted(model_name)
+        timeout_seconds = ctx.rate_limiter.wait_time(model_name)
+        attempt.quota_timeout_until = datetime.datetime.now() + datetime.timedelta(seconds=timeout_seconds)
+        attempt.result = 'quota_error'
+        return None
+    elif generate_result[0] == 'error':
+        print(f"Error generating program: {generate_result[1]}")
+        return None  # Move on to next puzzle
+    elif generate_result[0] == 'success':
+        attempt.program = generate_result[1]
+
+    attempt.generation += 1
+    attempt.prompt = full_prompt
+    attempt.row.setdefault('experiment_started_at', datetime.datetime.now())
+    return 'execute'
+
+def execute_stage(attempt, ctx):
+    """Runs the generated program in the sandbox. Returns the next stage, or None when the attempt is over.
+
+    A program that times out is handled by the next step of the escalation policy: a
+    'rerun' step runs the same program again here with a longer timeout, a 'generate'
+    step sends the attempt back to the generate stage for a new program.
+    """
+    while True:
+        started_at = datetime.datetime.now()
+        run_result = run_program(attempt.puzzle_year, attempt.puzzle_day, attempt.puzzle_part, attempt.program, attempt.timeout)
 
         if run_result[0] == 'error':
             print(f"Error running program: {run_result[1]}")
-            cursor.execute("""
-                UPDATE Experiments
-                SET run_status = 'error', run_error_message = ?, experiment_finished_at = ?
-                WHERE model_family = ? AND model_name = ? AND puzzle_year = ? AND puzzle_day = ? AND puzzle_part = ?
-            """, (run_result[1], datetime.datetime.now(), model_family, model_name, puzzle_year, puzzle_day, puzzle_part))
-            conn.commit()
-            break  # Exit timeout loop, move on to next puzzle with this model
+            record_run(attempt, started_at, run_result[2], run_status='error', run_error_message=run_result[1])
+            return None  # Move on to next puzzle with this model
+        elif run_result[0] == 'output_limit':
+            # run_status only allows error, timeout and answer; the message tells these runs apart.
+            print(f"Program stopped: {run_result[1]}")
+            record_run(attempt, started_at, run_result[2], run_status='error', run_error_message=f"output_limit: {run_result[1]}")
+            return None
         elif run_result[0] == 'timeout':
             print(f"Program timed out after {run_result[1]} seconds")
-            cursor.execute("""
-                UPDATE Experiments
-                SET run_status = 'timeout', run_timeout_seconds = ?, experiment_finished_at = ?
-                WHERE model_family = ? AND model_name = ? AND puzzle_year = ? AND puzzle_day = ? AND puzzle_part = ?
-            """, (run_result[1], datetime.datetime.now(), model_family, model_name, puzzle_year, puzzle_day, puzzle_part))
-            conn.commit()
-            if timeout == 100:
-                break  # Give up on this model/puzzle combination after the longest timeout
-            else:
-                continue  # Try again with a longer timeout
+            if run_result[2] is not None and run_result[2].profile:
+                print(f"Hot spots: {profiler.format_hot_spots(run_result[2].profile)}")
+            record_run(attempt, started_at, run_result[2], run_status='timeout', run_timeout_seconds=run_result[1])
+            if attempt.step + 1 == len(ctx.escalation):
+                return None  # Give up on this model/puzzle combination after the last step
+            attempt.step += 1
+            action, attempt.timeout = ctx.escalation[attempt.step]
+            if action == 'generate':
+                return 'generate'  # Try again with a new program
+            print(f"Rerunning the program with timeout {attempt.timeout}")
         elif run_result[0] == 'answer':
-            answer = run_result[1]
-            is_correct = check_answer(puzzle_year, puzzle_day, puzzle_part, answer)
-            print(f"Answer: {answer}, Correct: {is_correct}")
-            cursor.execute("""
-                UPDATE Experiments
-                SET run_status = 'answer', answer = ?, answer_is_correct = ?, experiment_finished_at = ?
-                WHERE model_family = ? AND model_name = ? AND puzzle_year = ? AND puzzle_day = ? AND puzzle_part = ?
-            """, (answer, is_correct, datetime.datetime.now(), model_family, model_name, puzzle_year, puzzle_day, puzzle_part))
-            conn.commit()
-            break  # Move on to the next model after getting an answer
-
-    conn.close()
-    return 'success' # Indicate that the experiment completed (or was skipped)
-            
-def update_ranking_tables(conn):
-    """Updates the ModelRank, ModelFamilyRank, and YearRank tables based on experiment results."""
+            attempt.answer = run_result[1]
+            record_run(attempt, started_at, run_result[2], run_status='answer', answer=attempt.answer)
+            return 'check'
+
+def record_run(attempt, started_at, usage, run_status, **columns):
+    """Adds a ProgramRuns row for the program just run, and makes it the outcome of the experiment."""
+    finished_at = datetime.datetime.now()
+    if usage is not None:
+        columns.update(run_user_seconds=usage.user_seconds, run_system_seconds=usage.system_seconds, run_max_rss_kb=usage.max_rss_kb)
+        if usage.profile is not None:
+            columns.update(run_profile=json.dumps(usage.profile))
+    attempt.runs.append(dict(
+        columns, generation=attempt.generation, prompt=attempt.prompt, program=attempt.program,
+        run_status=run_status, run_timeout_seconds=attempt.timeout, run_seconds=(finished_at - started_at).total_seconds(),
+        run_started_at=started_at, run_finished_at=finished_at))
+    attempt.row.update(columns, prompt=attempt.prompt, program=attempt.program, run_status=run_status, experiment_finished_at=finished_at)
+
+def check_stage(attempt, ctx):
+    """Checks the program's answer. The attempt is over afterwards."""
+    is_correct = check_answer(attempt.puzzle_year, attempt.puzzle_day, attempt.puzzle_part, attempt.answer)
+    print(f"Answer: {attempt.answer}, Correct: {is_correct}")
+    attempt.row.update(run_status='answer', answer=attempt.answer, answer_is_correct=is_correct, experiment_finished_at=datetime.datetime.now())
+    attempt.runs[-1]['answer_is_correct'] = is_correct
+    return None  # Move on to the next model after getting an answer
+
+STAGES = {'generate': generate_stage, 'execute': execute_stage, 'check': check_stage}
+
+def run_attempt(attempt, ctx):
+    """Runs all the stages of an attempt one after another on the calling thread."""
+    stage = 'generate'
+    while stage is not None:
+        stage = STAGES[stage](attempt, ctx)
+    return attempt
+
+def run_experiment_for_puzzle(puzzle_year, puzzle_day, puzzle_part, model_family, model_name, ctx):
+    """Runs the experiment for a single puzzle, recording results through the context's DBWriter."""
+    attempt = run_attempt(Attempt(puzzle_year, puzzle_day, puzzle_part, model_family, model_name), ctx)
+    ctx.writer.submit(save_attempt, attempt, ctx.rate_limiter, ctx.worker_id, ctx.result_cache).result()
+    return attempt.result # 'quota_error', or 'success' if the experiment completed (or was skipped)
+
+def create_pipeline(ctx, generate_workers, execute_workers, queue_size):
+    """Creates a pipeline that runs the stages of different attempts concurrently.
+
+    Generation has an unbounded queue because timed out attempts loop back to it. The execute
+    and check queues are bounded, so generation can only run queue_size programs ahead.
+    """
+    return Pipeline([
+        ('generate', lambda attempt: generate_stage(attempt, ctx), generate_workers, 0),
+        ('execute', lambda attempt: execute_stage(attempt, ctx), execute_workers, queue_size),
+        ('check', lambda attempt: check_stage(attempt, ctx), 1, queue_size),
+    ])
+
+def check_frontier(db_name="puzzle.db"):
+    """Compares the in-memory work frontier with the reference SQL scheduler query."""
+    conn = create_or_open_puzzle_db(db_name)
     cursor = conn.cursor()
-
-    # Update ModelRank
-    cursor.execute("""
-        INSERT OR REPLACE INTO ModelRank (model_family, model_name, solved_count, total_attempted, success_rate)
-        SELECT
-            model_family,
-            model_name,
-            SUM(CASE WHEN answer_is_correct = 1 THEN 1 ELSE 0 END) as solved_count,
-            COUNT(*) as total_attempted,
-            CAST(SUM(CASE WHEN answer_is_correct = 1 THEN 1 ELSE 0 END) AS REAL) / COUNT(*) as success_rate
-        FROM Experiments
-        GROUP BY model_family, model_name
-    """)
-
-    # Update ModelFamilyRank
-    cursor.execute("""
-        INSERT OR REPLACE INTO ModelFamilyRank (model_family, solved_count, total_attempted, success_rate)
-        SELECT
-            model_family,
-            SUM(CASE WHEN answer_is_correct = 1 THEN 1 ELSE 0 END) as solved_count,
-            COUNT(*) as total_attempted,
-            CAST(SUM(CASE WHEN answer_is_correct = 1 THEN 1 ELSE 0 END) AS REAL) / COUNT(*) as success_rate
-        FROM Experiments
-        GROUP BY model_family
-    """)
-
-    # Update YearRank
-    cursor.execute("""
-        INSERT OR REPLACE INTO YearRank (puzzle_year, solved_count, total_attempted, success_rate)
-        SELECT
-            puzzle_year,
-            SUM(CASE WHEN answer_is_correct = 1 THEN 1 ELSE 0 END) as solved_count,
-            COUNT(*) as total_attempted,
-            CAST(SUM(CASE WHEN answer_is_correct = 1 THEN 1 ELSE 0 END) AS REAL) / COUNT(*) as success_rate
-        FROM Experiments
-        GROUP BY puzzle_year
-    """)
-
-    conn.commit()
+    frontier = WorkFrontier(cursor)
+    missing, extra = frontier.verify_against_sql(cursor)
+    conn.close()
+    print(f"Pending puzzles: {len(frontier.pending_cells())}")
+    for cell in sorted(missing):
+        print(f"  Missing from frontier: {cell}")
+    for cell in sorted(extra):
+        print(f"  Not pending according to SQL: {cell}")
+    if missing or extra:
+        print("Frontier is inconsistent with the SQL scheduler.")
+    else:
+        print("Frontier matches the SQL scheduler.")
 
 if __name__ == "__main__":
-    run_experiment()
+    parser = argparse.ArgumentParser(description="Runs LLM experiments on Advent of Code puzzles.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of puzzle attempts to run concurrently")
+    parser.add_argument("--lanes", choices=["model", "family"], default="model", help="Run at most one attempt at a time per model or per model family")
+    parser.add_argument("--pipeline", action="store_true", help="Run the generate, execute and check stages of attempts concurrently")
+    parser.add_argument("--execute-workers", type=int, default=1, help="Number of programs to run at once in pipeline mode")
+    parser.add_argument("--queue-size", type=int, default=2, help="Maximum number of attempts waiting between pipeline stages")
+    parser.add_argument("--worker-id", help="Name of this runner in the WorkClaims table, defaults to host:pid")
+    parser.add_argument("--model-family", action="append", dest="families", help="Only run models from this family, can be repeated")
+    parser.add_argument("--batch-size", type=int, default=AFFINITY_BATCH_SIZE, help="Attempts to run with one ollama model before switching to another, 0 to finish each model first")
+    parser.add_argument("--escalation", default=DEFAULT_POLICY, help="What to do when a program times out, as comma separated generate:<seconds> or rerun:<seconds> steps")
+    parser.add_argument("--warm-sandbox", action="store_true", help="Run programs in forks of an interpreter with numpy and networkx already imported")
+    parser.add_argument("--sandbox-jobs", type=int, default=0, help="Run up to this many programs at once, each pinned to its own CPU core")
+    parser.add_argument("--profile", type=int, nargs="?", const=10, default=0, metavar="TOP",
+                        help="Profile programs and store their TOP hot functions and lines in run_profile, default 10")
+    parser.add_argument("--result-cache", action=argparse.BooleanOptionalAction,
+                        help="Reuse the outcome of a program that has already run on the same input, on by default except with --simulate")
+    parser.add_argument("--fixtures", help="Read the puzzles from this puzzle_fixtures directory or zip file instead of adventofcode.com")
+    parser.add_argument("--db", help="The database file, defaults to puzzle.db, or simulation.db with --simulate")
+    parser.add_argument("--simulate", action="store_true", help="Use simulated models, puzzles and sandbox on a scratch database")
+    parser.add_argument("--check-frontier", action="store_true", help="Compare the work frontier with the SQL scheduler query and exit")
+    simulation.add_arguments(parser)
+    args = parser.parse_args()
+    try:
+        parse_policy(args.escalation)
+    except ValueError as e:
+        parser.error(str(e))
+
+    db_name = args.db or ("simulation.db" if args.simulate else "puzzle.db")
+    if args.simulate:
+        if db_name == "puzzle.db":
+            parser.error("--simulate needs a scratch database, not puzzle.db")
+        simulation.install(simulation.config_from_args(args))
+        simulation.reset_db(db_name)
+
+    if args.fixtures:
+        try:
+            set_puzzle_fixtures(args.fixtures)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.check_frontier:
+        check_frontier(db_name)
+    else:
+        if args.sandbox_jobs:
+            try:
+                sandbox_pool = SandboxPool(args.sandbox_jobs)
+            except ValueError as e:
+                parser.error(str(e))
+            set_sandbox_pool(sandbox_pool)
+        if args.warm_sandbox:
+            perform.start_warm_pool()
+        if args.profile:
+            perform.start_profiling(args.profile)
+        stats = run_experiment(workers=args.workers, lanes=args.lanes, pipelined=args.pipeline,
+                               execute_workers=args.execute_workers, queue_size=args.queue_size,
+                               worker_id=args.worker_id, families=args.families, batch_size=args.batch_size or None,
+                               escalation=args.escalation, db_name=db_name, result_cache=args.result_cache if args.result_cache is not None else not args.simulate)
+        if args.sandbox_jobs:
+            set_sandbox_pool(None)
+            sandbox_pool.shutdown()
+        perform.stop_warm_pool()
+        if args.simulate:
+            conn = open_puzzle_db(db_name)
+            print(simulation.report(conn, db_name, stats))
+            conn.close()
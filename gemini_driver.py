@@ -1,7 +1,7 @@
 import google.generativeai as genai
 import keyring
 import markdown_util
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 
 def models() -> List[str]:
     return [
@@ -43,14 +43,14 @@ def generate(model_name : str, prompt: str) -> Tuple[str, str]:
     return ('failure', text)
 
 
-def model_quota_timeout(model_name: str) -> int:
+def rate_limits(model_name: str) -> Dict[str, int]:
+    """Returns the free tier quotas of the model, as requests per 'minute' and per 'day'."""
     if model_name in ['gemini-exp-1206', 'gemini-1.5-pro']:
-        # The quota is 50 calls per day
-        return 24*3600/50
+        # The quota is 2 calls per minute and 50 calls per day
+        return {'minute': 2, 'day': 50}
     else:
-        # 1500 calls per day but 10 RPM. We don't know which quota we exhausted,
-        # assume it's the longer one.
-        return max(24*3600/1500, 60/10)
+        # 10 calls per minute and 1500 calls per day
+        return {'minute': 10, 'day': 1500}
 
 if __name__ == "__main__":
     for m in genai.list_models():
@@ -0,0 +1,52 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from typing import Callable, Dict, Hashable
+import perform
+
+# Memory-backed storage on Linux. Elsewhere the files go in the temporary directory, where the
+# page cache keeps inputs this small in memory anyway.
+SHARED_MEMORY = '/dev/shm'
+
+class InputFiles:
+    """
+    Writes each puzzle input to a file once and hands out perform.InputFiles for it.
+
+    Every program run for a puzzle, for both parts and all models and retries, gets the same
+    file as its stdin instead of having the input encoded and copied through a pipe. The files
+    are removed by close().
+    """
+
+    def __init__(self, directory: str | None = None):
+        """
+        Args:
+            directory: Where to create the files' directory. Defaults to SHARED_MEMORY if it exists.
+        """
+        if directory is None and os.path.isdir(SHARED_MEMORY):
+            directory = SHARED_MEMORY
+        self._dir = tempfile.mkdtemp(prefix='aoc-inputs-', dir=directory)
+        self._lock = threading.Lock()
+        self._files: Dict[Hashable, perform.InputFile] = {}
+
+    def get(self, key: Hashable, load: Callable[[], str]) -> perform.InputFile:
+        """Returns the file for the input with this key, such as (year, day). The first time, load() returns the input to write."""
+        with self._lock:
+            input_file = self._files.get(key)
+        if input_file is not None:
+            return input_file
+        # Loading may fetch the input, don't hold up the other puzzles meanwhile.
+        input = load()
+        with self._lock:
+            if key not in self._files:
+                path = os.path.join(self._dir, f"input-{len(self._files)}")
+                with open(path, 'wb') as f:
+                    f.write(input.encode(perform.ENCODING))
+                # Programs only need to read their input, and mustn't change it for the next one.
+                os.chmod(path, 0o444)
+                self._files[key] = perform.InputFile(path, hashlib.sha256(input.encode()).hexdigest())
+            return self._files[key]
+
+    def close(self):
+        shutil.rmtree(self._dir, ignore_errors=True)
@@ -0,0 +1,52 @@
+"""
+Applies a program's resource limits and then execs it:
+
+    python -I -S launcher.py <cpu_seconds> <memory_bytes> <processes> <cores> command...
+
+A limit or the cores is '-' to leave it unchanged, cores are comma separated. perform.py
+starts programs through this instead of a preexec_fn, which isn't safe in a process that
+starts programs from several threads. Only the standard library is imported, with -S to skip
+site, so the launcher adds as little as possible to the program's start-up time.
+"""
+import math
+import os
+import resource
+import sys
+from typing import Iterable, List
+
+def set_limits(cpu_seconds: float, memory_bytes: int | None, processes: int | None, cores: Iterable[int] | None):
+    """Sets the limits on the current process and pins it to the given cores. None leaves a limit unchanged."""
+    # The kernel sends SIGXCPU at the soft limit and SIGKILL at the hard limit.
+    cpu_seconds = math.ceil(cpu_seconds)
+    _setrlimit(resource.RLIMIT_CPU, cpu_seconds, cpu_seconds + 1)
+    if memory_bytes is not None:
+        _setrlimit(resource.RLIMIT_AS, memory_bytes, memory_bytes)
+    if processes is not None:
+        _setrlimit(resource.RLIMIT_NPROC, processes, processes)
+    if cores and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cores)
+
+def _setrlimit(limit, soft, hard):
+    current_soft, current_hard = resource.getrlimit(limit)
+    if current_hard != resource.RLIM_INFINITY:
+        soft, hard = min(soft, current_hard), min(hard, current_hard)
+    try:
+        resource.setrlimit(limit, (soft, hard))
+    except (ValueError, OSError):
+        pass  # Not every platform supports every limit, e.g. RLIMIT_AS on macOS.
+
+def command(cpu_seconds: float, memory_bytes: int | None, processes: int | None, cores: Iterable[int] | None,
+            program_command: List[str]) -> List[str]:
+    """The command that runs program_command with the given limits."""
+    def arg(value):
+        return '-' if value is None else str(value)
+    cores_arg = ','.join(str(core) for core in cores) if cores else '-'
+    return [sys.executable, '-I', '-S', os.path.abspath(__file__),
+            arg(cpu_seconds), arg(memory_bytes), arg(processes), cores_arg, *program_command]
+
+if __name__ == "__main__":
+    def parse(value, type):
+        return None if value == '-' else type(value)
+    cores = parse(sys.argv[4], lambda value: [int(core) for core in value.split(',')])
+    set_limits(parse(sys.argv[1], float), parse(sys.argv[2], int), parse(sys.argv[3], int), cores)
+    os.execv(sys.argv[5], sys.argv[5:])
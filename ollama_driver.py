@@ -1,6 +1,15 @@
 import markdown_util
 import ollama
-from typing import List, Tuple
+import threading
+from typing import Dict, List, Tuple
+
+# How long ollama keeps a model in memory after a request. The runner attempts a batch of
+# puzzles with one model before switching, so keep it loaded between those requests.
+KEEP_ALIVE = '30m'
+
+# Time ollama reported spending on loading models, per model, in seconds.
+_load_seconds: Dict[str, float] = {}
+_load_seconds_lock = threading.Lock()
 
 def models() -> List[str]:
     return [
@@ -16,8 +25,12 @@ def generate(model_name : str, prompt: str) -> Tuple[str, str]:
         model_name, 
         messages=[
             {"role": "user", "content": prompt}
-        ]
+        ],
+        keep_alive=KEEP_ALIVE,
     )
+    if response.load_duration:
+        with _load_seconds_lock:
+            _load_seconds[model_name] = _load_seconds.get(model_name, 0.0) + response.load_duration / 1e9
 
     text = response.message.content
     result = markdown_util.extract_solve_function(text)
@@ -25,8 +38,14 @@ def generate(model_name : str, prompt: str) -> Tuple[str, str]:
         return ('success', result)
     return ('failure', text)
 
-def model_quota_timeout(model_name: str) -> int:
-    return 10
+def load_seconds() -> Dict[str, float]:
+    """Returns the time spent loading each model into memory so far."""
+    with _load_seconds_lock:
+        return dict(_load_seconds)
+
+def rate_limits(model_name: str) -> Dict[str, int]:
+    # Local models have no quotas.
+    return {}
 
 if __name__ == "__main__":
     for model in models():
@@ -1,6 +1,116 @@
+import dataclasses
+import io
+import launcher
+import locale
+import os
+import selectors
+import signal
 import subprocess
 import sys
-from typing import List, Tuple
+import tempfile
+import time
+from typing import Dict, Iterable, List, Tuple
+import profiler
+
+# Set by start_warm_pool(), runs programs in forks of a preloaded interpreter.
+_zygote = None
+
+# Set by start_profiling(), the number of hot functions and lines to keep from each program's profile.
+_profile_top = None
+
+# Programs that sleep or wait use no CPU time. They're stopped once they have taken this many
+# times their timeout in wall-clock time.
+WALL_CLOCK_FACTOR = 3
+
+@dataclasses.dataclass
+class Limits:
+    """Resource limits for a program, on top of the CPU time limit set by the timeout. None leaves a limit unchanged."""
+    memory_bytes: int | None = 4 * 1024 ** 3
+    # RLIMIT_NPROC counts every process of the user running the program, not just the program's.
+    processes: int | None = 1024
+    # The program is stopped if it writes more than this to stdout or stderr.
+    stdout_bytes: int | None = 1024 ** 2
+    stderr_bytes: int | None = 1024 ** 2
+
+LIMITS = Limits()
+
+# How much of the end of stderr to return as the error message.
+ERROR_TAIL_BYTES = 4096
+
+def prepare_child(limits: Limits, timeout: float, cores: Iterable[int] | None):
+    """Applies the limits and pins the process to the given cores. Called in the child before the program starts."""
+    launcher.set_limits(timeout, limits.memory_bytes, limits.processes, cores)
+
+@dataclasses.dataclass
+class Usage:
+    """The resources a program used, as reported by wait4, and where it spent its CPU time if it was profiled."""
+    user_seconds: float
+    system_seconds: float
+    max_rss_kb: int
+    # See profiler.summarize.
+    profile: Dict | None = None
+
+    @staticmethod
+    def from_rusage(rusage) -> 'Usage':
+        max_rss = rusage.ru_maxrss
+        if sys.platform == 'darwin':
+            max_rss //= 1024  # macOS reports bytes, Linux kilobytes.
+        return Usage(rusage.ru_utime, rusage.ru_stime, max_rss)
+
+    @property
+    def cpu_seconds(self) -> float:
+        return self.user_seconds + self.system_seconds
+
+@dataclasses.dataclass(frozen=True)
+class InputFile:
+    """
+    An input already written to a file, encoded as ENCODING.
+
+    The program gets the file itself as its stdin, so the input isn't encoded and copied
+    through a pipe on every run. Programs read it from sys.stdin as usual. See input_files.py.
+    """
+    path: str
+    # The hash result_cache uses for the input's text.
+    sha256: str
+
+def open_stdin(input: 'str | InputFile') -> Tuple[int, int | None, bytes]:
+    """Returns the program's end of its stdin, our end or None, and the bytes to write to ours."""
+    if isinstance(input, InputFile):
+        return os.open(input.path, os.O_RDONLY), None, b''
+    stdin_r, stdin_w = os.pipe()
+    return stdin_r, stdin_w, input.encode(ENCODING)
+
+def start_warm_pool():
+    """Runs programs in forks of a warm interpreter from now on, see zygote.Zygote."""
+    global _zygote
+    if _zygote is None:
+        from zygote import Zygote
+        _zygote = Zygote()
+
+def stop_warm_pool():
+    global _zygote
+    if _zygote is not None:
+        _zygote.close()
+        _zygote = None
+
+def warm_pool_running() -> bool:
+    return _zygote is not None
+
+def start_profiling(top: int = 10):
+    """Profiles programs from now on, keeping their `top` hot functions and lines in Usage.profile.
+
+    The profile is taken by sampling the program's stack, see profiler.py. A program that
+    times out keeps the profile of the time it ran.
+    """
+    global _profile_top
+    _profile_top = top
+
+def stop_profiling():
+    global _profile_top
+    _profile_top = None
+
+def profiling() -> bool:
+    return _profile_top is not None
 
 def run(program: str, input: str, args: List[str], timeout: int) -> Tuple[str, str | None]:
     """
@@ -10,30 +120,189 @@ def run(program: str, input: str, args: List[str], timeout: int) -> Tuple[str, s
         program: A string containing the Python program to execute.
         input: Text to pass on stdin to the program.
         args: A list of strings representing the command-line arguments.
-        timeout: The number of seconds to allow the program to run before stopping it.
+        timeout: The number of seconds of CPU time to allow the program before stopping it.
 
     Returns:
         A tuple containing:
-            - A string indicating the outcome ('success', 'error', or 'timeout').
+            - A string indicating the outcome ('success', 'error', 'timeout' or 'output_limit').
             - For 'success', the stdout of the program.
-            - For 'error', the stderr of the program.
+            - For 'error', the end of the stderr of the program.
             - For 'timeout', None.
+            - For 'output_limit', a message saying which output was too long.
     """
+    status, output, _ = run_measured(program, input, args, timeout)
+    return status, output
+
+def run_measured(program: str, input: str | InputFile, args: List[str], timeout: int, limits: Limits = LIMITS,
+                 cores: Iterable[int] | None = None) -> Tuple[str, str | None, Usage | None]:
+    """
+    Like run(), but applies the resource limits and also returns the resources the program used.
+
+    Timeouts are judged on the CPU time the program used, so a program isn't penalised for
+    sharing the machine with other runs. The program runs in a session of its own, and when
+    it ends every process left in its process group is killed. If cores are given the program
+    only runs on those, see sandbox_pool.SandboxPool. The input may be an InputFile instead of
+    text.
+
+    Returns:
+        (outcome, output, usage) where outcome and output are as for run(), and usage is a Usage,
+        or None if the program couldn't be started.
+    """
+    if _zygote is not None:
+        return _zygote.run_measured(program, input, args, timeout, limits, cores, _profile_top)
+    pipes = []
+    process = None
+    profile_top = _profile_top
+    profile_file = tempfile.TemporaryFile() if profile_top else None
+    command = [sys.executable, '-c', program, *args]
+    if profile_file is not None:
+        command = [sys.executable, os.path.abspath(profiler.__file__), str(profile_file.fileno()), program, *args]
+    # The launcher applies the limits and then execs the program. A preexec_fn would run Python
+    # in the forked child, which can deadlock when other threads are starting programs too.
+    command = launcher.command(timeout, limits.memory_bytes, limits.processes, cores, command)
     try:
-        process = subprocess.Popen(
-            [sys.executable, '-c', program, *args],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        stdout, stderr = process.communicate(input=input, timeout=timeout)
-        if process.returncode == 0:
-            return 'success', stdout
-        else:
-            return 'error', stderr
-    except subprocess.TimeoutExpired:
-        process.kill()
-        return 'timeout', None
+        stdin_r, stdin_w, data = open_stdin(input)
+        pipes = [fd for fd in [stdin_r, stdin_w] if fd is not None]
+        stdout_r, stdout_w = os.pipe()
+        stderr_r, stderr_w = os.pipe()
+        pipes += [stdout_r, stdout_w, stderr_r, stderr_w]
+        try:
+            process = subprocess.Popen(
+                command,
+                stdin=stdin_r,
+                stdout=stdout_w,
+                stderr=stderr_w,
+                pass_fds=[profile_file.fileno()] if profile_file else [],
+                # The program leads its own process group, so we can kill anything it starts.
+                start_new_session=True,
+            )
+        finally:
+            for fd in [stdin_r, stdout_w, stderr_w]:
+                os.close(fd)
+                pipes.remove(fd)
+        deadline = time.monotonic() + timeout * WALL_CLOCK_FACTOR
+        ended, stdout, stderr = communicate(stdin_w, stdout_r, stderr_r, data, deadline, limits)
+        pipes = []
+        returncode, usage = _wait(process.pid, deadline if ended == 'closed' else 0)
+        # We reaped the process, don't let Popen try.
+        process.returncode = returncode
+        if profile_file is not None:
+            usage.profile = profiler.read(profile_file, profile_top)
+        return judge(returncode, usage, stdout, stderr, timeout, ended, limits)
     except Exception as e:
-        return 'error', str(e)
+        if process is not None and process.returncode is None:
+            process.returncode, _ = _wait(process.pid, 0)
+        return 'error', str(e), None
+    finally:
+        for fd in pipes:
+            os.close(fd)
+        if profile_file is not None:
+            profile_file.close()
+
+def _wait(pid, deadline):
+    """Waits for the process to exit or the deadline to pass, kills its process group and reaps it.
+
+    Returns (returncode, usage).
+    """
+    # WNOWAIT leaves the process a zombie, which keeps its process group id from being reused
+    # until we've killed the rest of the group.
+    while os.waitid(os.P_PID, pid, os.WEXITED | os.WNOHANG | os.WNOWAIT) is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    kill_group(pid)
+    _, status, rusage = os.wait4(pid, 0)
+    return os.waitstatus_to_exitcode(status), Usage.from_rusage(rusage)
+
+def kill_group(pgid: int):
+    """Kills every process in a program's process group, such as multiprocessing workers it left behind."""
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+def judge(returncode: int, usage: Usage, stdout: bytes, stderr: bytes, timeout: int, ended: str,
+          limits: Limits = LIMITS) -> Tuple[str, str | None, Usage]:
+    """Turns the way a program ended into the (outcome, output, usage) of run_measured().
+
+    Args:
+        ended: How communicate() ended, 'closed', 'timeout' or 'output_limit'.
+    """
+    if ended == 'output_limit':
+        if limits.stdout_bytes is not None and len(stdout) > limits.stdout_bytes:
+            return 'output_limit', f"The program wrote more than {limits.stdout_bytes} bytes to stdout", usage
+        return 'output_limit', f"The program wrote more than {limits.stderr_bytes} bytes to stderr:\n{_tail(stderr)}", usage
+    # SIGXCPU comes at the CPU time limit, SIGKILL if the program ignored it until the hard limit.
+    ran_out_of_cpu = returncode == -signal.SIGXCPU or (returncode == -signal.SIGKILL and usage.cpu_seconds >= timeout)
+    if ended == 'timeout' or ran_out_of_cpu:
+        return 'timeout', None, usage
+    if returncode == 0:
+        return 'success', decode(stdout), usage
+    return 'error', _tail(stderr), usage
+
+def _tail(stderr: bytes) -> str:
+    """Returns the end of stderr, which is where Python puts the exception."""
+    if len(stderr) <= ERROR_TAIL_BYTES:
+        return decode(stderr)
+    return f"[{len(stderr) - ERROR_TAIL_BYTES} bytes omitted]\n" + decode(stderr[-ERROR_TAIL_BYTES:], errors='replace')
+
+# Text mode pipes of subprocess.Popen use the locale's encoding and universal newlines.
+ENCODING = locale.getpreferredencoding(False)
+
+def decode(data: bytes, errors: str = 'strict') -> str:
+    return io.TextIOWrapper(io.BytesIO(data), encoding=ENCODING, errors=errors).read()
+
+def communicate(stdin_w, stdout_r, stderr_r, input: bytes, deadline: float, limits: Limits = LIMITS):
+    """Writes input to a program and reads its output until both pipes close or the deadline passes.
+
+    Output is read as it's written, and reading stops as soon as stdout or stderr grows past
+    its limit, so a program printing in a loop can't fill up the runner's memory.
+
+    Returns (ended, stdout, stderr) where ended is 'closed' if the program closed both pipes,
+    'timeout' if the deadline passed or 'output_limit' if it wrote too much. Closes the
+    three file descriptors. stdin_w is None when the program's stdin is a file.
+    """
+    output = {stdout_r: [], stderr_r: []}
+    sizes = {stdout_r: 0, stderr_r: 0}
+    caps = {stdout_r: limits.stdout_bytes, stderr_r: limits.stderr_bytes}
+    ended = 'timeout'
+    open_fds = {fd for fd in [stdin_w, stdout_r, stderr_r] if fd is not None}
+    with selectors.DefaultSelector() as selector:
+        def close(fd):
+            selector.unregister(fd)
+            os.close(fd)
+            open_fds.discard(fd)
+
+        if input:
+            os.set_blocking(stdin_w, False)
+            selector.register(stdin_w, selectors.EVENT_WRITE)
+        elif stdin_w is not None:
+            os.close(stdin_w)
+            open_fds.discard(stdin_w)
+        for fd in output:
+            selector.register(fd, selectors.EVENT_READ)
+        view = memoryview(input)
+        while stdout_r in open_fds or stderr_r in open_fds:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or ended == 'output_limit':
+                break
+            for key, _ in selector.select(remaining):
+                if key.fd == stdin_w:
+                    try:
+                        view = view[os.write(stdin_w, view[:65536]):]
+                    except BrokenPipeError:
+                        view = view[:0]
+                    if not view:
+                        close(stdin_w)
+                else:
+                    data = os.read(key.fd, 65536)
+                    if data:
+                        output[key.fd].append(data)
+                        sizes[key.fd] += len(data)
+                        if caps[key.fd] is not None and sizes[key.fd] > caps[key.fd]:
+                            ended = 'output_limit'
+                    else:
+                        close(key.fd)
+        if stdout_r not in open_fds and stderr_r not in open_fds:
+            ended = 'closed'
+        for fd in list(open_fds):
+            close(fd)
+    return ended, b''.join(output[stdout_r]), b''.join(output[stderr_r])
@@ -0,0 +1,129 @@
+import concurrent.futures
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+_STOP = object()
+
+class Stage:
+    """
+    A pool of worker threads that applies one step of work to items taken from a queue.
+
+    The stage keeps track of how deep its queue is and how much of the time its workers
+    spend busy, which shows whether it is the bottleneck of the pipeline.
+    """
+
+    def __init__(self, name: str, fn: Callable[[Any], None], workers: int = 1, max_queue: int = 0):
+        """
+        Args:
+            name: The name of the stage, used in stats and thread names.
+            fn: Called with each item on one of the stage's worker threads.
+            workers: The number of worker threads.
+            max_queue: The maximum number of items waiting for a worker, 0 for unbounded.
+                put() blocks while the queue is full, which slows down the upstream stage.
+        """
+        self.name = name
+        self.workers = workers
+        self._fn = fn
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._busy = 0
+        self._busy_seconds = 0.0
+        self._processed = 0
+        self._started_at = time.monotonic()
+        self._threads = [threading.Thread(target=self._run, name=f"{name}-{i}", daemon=True) for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def put(self, item):
+        self._queue.put(item)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the queue depth, busy workers, items processed and utilisation (0..1) of the stage."""
+        with self._lock:
+            busy_seconds = self._busy_seconds
+            elapsed = max(time.monotonic() - self._started_at, 1e-9)
+            return {
+                'stage': self.name,
+                'queue_depth': self._queue.qsize(),
+                'busy': self._busy,
+                'workers': self.workers,
+                'processed': self._processed,
+                'utilisation': busy_seconds / (elapsed * self.workers),
+            }
+
+    def close(self):
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            with self._lock:
+                self._busy += 1
+            started_at = time.monotonic()
+            try:
+                self._fn(item)
+            finally:
+                with self._lock:
+                    self._busy -= 1
+                    self._busy_seconds += time.monotonic() - started_at
+                    self._processed += 1
+
+class Pipeline:
+    """
+    Moves items through a set of named stages connected by queues.
+
+    Each stage function takes an item and returns the name of the stage the item should go to
+    next, or None when the item is finished. Items may go back to an earlier stage; give that
+    stage an unbounded queue so the loop can't deadlock.
+    """
+
+    def __init__(self, stages: List[Tuple[str, Callable[[Any], Optional[str]], int, int]]):
+        """
+        Args:
+            stages: (name, fn, workers, max_queue) for each stage. Items start in the first stage.
+        """
+        self._first = stages[0][0]
+        self._stages = {}
+        for name, fn, workers, max_queue in stages:
+            self._stages[name] = Stage(name, self._wrap(fn), workers, max_queue)
+
+    def submit(self, item) -> concurrent.futures.Future:
+        """Starts an item at the first stage. The returned Future resolves to the item once it's finished."""
+        future = concurrent.futures.Future()
+        future.set_running_or_notify_cancel()
+        self._stages[self._first].put((item, future))
+        return future
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [stage.stats() for stage in self._stages.values()]
+
+    def format_stats(self) -> str:
+        return ', '.join(
+            f"{s['stage']}: queue {s['queue_depth']}, busy {s['busy']}/{s['workers']}, "
+            f"utilisation {s['utilisation']:.0%}, processed {s['processed']}"
+            for s in self.stats())
+
+    def close(self):
+        for stage in self._stages.values():
+            stage.close()
+
+    def _wrap(self, fn):
+        def run(entry):
+            item, future = entry
+            try:
+                next_stage = fn(item)
+            except Exception as e:
+                future.set_exception(e)
+                return
+            if next_stage is None:
+                future.set_result(item)
+            else:
+                self._stages[next_stage].put(entry)
+        return run
@@ -0,0 +1,105 @@
+import ast
+import importlib.util
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import Dict, Tuple
+import perform
+
+def check_program(program: str, installed=None) -> Tuple[str, str] | None:
+    """Looks for reasons the program can't run without running it.
+
+    Args:
+        program: The program code.
+        installed: Returns whether a top level module can be imported, defaults to is_installed.
+
+    Returns:
+        None if the program may run, otherwise (reason, message) where reason is 'syntax',
+        'missing_module' or 'no_calls' and message is what the run would have printed to
+        stderr, or a description of the problem for 'no_calls'.
+    """
+    installed = installed or is_installed
+    try:
+        tree = ast.parse(program, '<string>')
+        compile(tree, '<string>', 'exec')
+    except (SyntaxError, ValueError) as e:
+        # Python 3.11 raises ValueError for null bytes, later versions SyntaxError.
+        return 'syntax', ''.join(traceback.format_exception_only(type(e), e))
+
+    # Only imports at the top level of the module are certain to run. Imports in functions
+    # may never run, and imports in try statements usually have a fallback.
+    for statement in tree.body:
+        if isinstance(statement, ast.Import):
+            names = [alias.name for alias in statement.names]
+        elif isinstance(statement, ast.ImportFrom) and statement.level == 0:
+            names = [statement.module]
+        else:
+            continue
+        for name in names:
+            top_level = name.split('.')[0]
+            if not installed(top_level):
+                return 'missing_module', ("Traceback (most recent call last):\n"
+                                          f'  File "<string>", line {statement.lineno}, in <module>\n'
+                                          f"ModuleNotFoundError: No module named '{top_level}'\n")
+
+    # Prose that happens to parse, like a lone number or a sentence in quotes, is a module
+    # of bare expressions. Without a call the program can't print an answer.
+    if not any(isinstance(node, ast.Call) for node in ast.walk(tree)):
+        return 'no_calls', "preflight: The program doesn't call anything, so it can't print an answer"
+    return None
+
+_installed: Dict[str, bool] = {}
+
+def is_installed(module: str) -> bool:
+    """Returns whether the sandbox's interpreter can import the top level module. The sandbox runs the same interpreter as we do."""
+    if module not in _installed:
+        try:
+            _installed[module] = importlib.util.find_spec(module) is not None
+        except (ImportError, ValueError):
+            _installed[module] = False
+    return _installed[module]
+
+class Preflight:
+    """
+    Rejects programs that can't run before a sandbox process is started for them.
+
+    When a model's response has no code block, markdown_util returns the whole response as the
+    program, and starting an interpreter just to print a SyntaxError costs far more than
+    parsing it here. The CPU time saved is estimated from the programs that failed in the sandbox.
+    """
+
+    def __init__(self):
+        self.checked = 0
+        self.rejected: Counter = Counter()
+        self.check_seconds = 0.0
+        self._lock = threading.Lock()
+        self._failed_runs = 0
+        self._failed_cpu_seconds = 0.0
+
+    def check(self, program: str) -> str | None:
+        """Returns the error message for a program that can't run, or None if it should be run."""
+        started_at = time.perf_counter()
+        problem = check_program(program)
+        with self._lock:
+            self.checked += 1
+            self.check_seconds += time.perf_counter() - started_at
+            if problem is None:
+                return None
+            self.rejected[problem[0]] += 1
+            return problem[1]
+
+    def observe_failure(self, usage: perform.Usage | None):
+        """Records the usage of a program that passed the check but failed in the sandbox."""
+        if usage is not None:
+            with self._lock:
+                self._failed_runs += 1
+                self._failed_cpu_seconds += usage.cpu_seconds
+
+    def format_stats(self) -> str:
+        with self._lock:
+            rejected = sum(self.rejected.values())
+            saved = rejected * self._failed_cpu_seconds / self._failed_runs if self._failed_runs else 0.0
+            reasons = ', '.join(f"{count} {reason}" for reason, count in self.rejected.most_common())
+            return (f"checked {self.checked} programs in {self.check_seconds:.2f} seconds, rejected {rejected}"
+                    f"{f' ({reasons})' if reasons else ''}, about {saved:.1f} CPU seconds saved")
@@ -0,0 +1,111 @@
+import collections
+import dis
+import os
+import signal
+import sys
+from typing import Dict
+
+# Seconds of CPU time between samples.
+INTERVAL_SECONDS = 0.005
+# Stop sampling after this many samples, about 8 minutes of CPU time, to bound the profile's size.
+MAX_SAMPLES = 100000
+
+def start(fd: int, interval: float = INTERVAL_SECONDS):
+    """
+    Samples the program's stack every `interval` seconds of CPU time. Called in the child before the program starts.
+
+    Each sample is written to fd as soon as it's taken, as one line of function:line frames
+    of the program's code from the outermost to the innermost. A program killed at its
+    timeout still leaves the samples up to that point.
+    """
+    samples = 0
+
+    def sample(signum, frame):
+        nonlocal samples
+        samples += 1
+        if samples > MAX_SAMPLES:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            return
+        stack = []
+        while frame is not None:
+            # The program is compiled as '<string>', like `python -c` does.
+            if frame.f_code.co_filename == '<string>':
+                stack.append(f"{frame.f_code.co_name}:{_line(frame)}")
+            frame = frame.f_back
+        os.write(fd, (';'.join(reversed(stack)) or '<startup>').encode() + b'\n')
+
+    signal.signal(signal.SIGPROF, sample)
+    signal.setitimer(signal.ITIMER_PROF, interval, interval)
+
+def stop():
+    """Stops sampling. Called when the program is done, so a late sample doesn't kill the exiting process."""
+    signal.setitimer(signal.ITIMER_PROF, 0)
+    signal.signal(signal.SIGPROF, signal.SIG_IGN)
+
+# code object -> {offset of a jump back to the start of a loop: line of the loop}
+_loop_lines: Dict = {}
+
+def _line(frame):
+    if frame.f_lineno is not None:
+        return frame.f_lineno
+    # Python only runs signal handlers at calls and at the jumps back to the start of loops,
+    # and those jumps have no line of their own. Count them for the loop statement, so a slow
+    # loop body shows up as the loop.
+    code = frame.f_code
+    if code not in _loop_lines:
+        lines = {instruction.offset: instruction.positions.lineno for instruction in dis.get_instructions(code)}
+        _loop_lines[code] = {instruction.offset: lines.get(instruction.argval)
+                             for instruction in dis.get_instructions(code) if instruction.opname.startswith('JUMP_BACKWARD')}
+    return _loop_lines[code].get(frame.f_lasti) or code.co_firstlineno
+
+def summarize(samples: bytes, top: int, interval: float = INTERVAL_SECONDS) -> Dict:
+    """
+    Turns the samples written by start() into the program's hot spots.
+
+    Returns:
+        A dict with the number of samples, the CPU seconds they cover, and the `top`
+        functions and lines with the most samples. A function counts every sample taken
+        while it was on the stack, a line only the samples taken while it was running.
+    """
+    functions = collections.Counter()
+    lines = collections.Counter()
+    count = 0
+    for line in samples.decode(errors='replace').splitlines():
+        try:
+            stack = [_parse_frame(frame) for frame in line.split(';')]
+        except ValueError:
+            continue  # The last line is cut short if the program was killed while writing it.
+        count += 1
+        functions.update({function for function, _ in stack})
+        lines[stack[-1]] += 1
+    return {
+        'samples': count,
+        'cpu_seconds': round(count * interval, 3),
+        'functions': [{'function': function, 'samples': n} for function, n in functions.most_common(top)],
+        'lines': [{'function': function, 'line': line, 'samples': n} for (function, line), n in lines.most_common(top)],
+    }
+
+def _parse_frame(frame):
+    if frame == '<startup>':
+        return frame, 0
+    function, _, line = frame.rpartition(':')
+    return function, int(line)
+
+def read(file, top: int) -> Dict:
+    """Summarizes the samples written to a file that was passed to start()."""
+    file.seek(0)
+    return summarize(file.read(), top)
+
+def format_hot_spots(profile: Dict, count: int = 3) -> str:
+    """The hottest lines of a profile, for printing."""
+    samples = max(profile['samples'], 1)
+    return ', '.join(f"line {line['line']} in {line['function']} {line['samples'] / samples:.0%}"
+                     for line in profile['lines'][:count])
+
+if __name__ == "__main__":
+    # Runs `python profiler.py fd program *args` like `python -c program *args`, profiled.
+    from zygote import run_as_main
+    start(int(sys.argv[1]))
+    code = run_as_main(sys.argv[2], sys.argv[3:])
+    stop()
+    sys.exit(code)
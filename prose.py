@@ -0,0 +1,61 @@
+import functools
+import html.parser
+from typing import List, Tuple
+
+# The text of these elements isn't prose, BeautifulSoup leaves it out of .text as well.
+_NOT_TEXT = {'script', 'style', 'template'}
+
+class _ArticleParser(html.parser.HTMLParser):
+    """Collects the text of every <article class="day-desc">, and of the whole page in case there are none."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.articles: List[List[str]] = []
+        self.page: List[str] = []
+        self._article_depth = 0
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _NOT_TEXT:
+            self._skip_depth += 1
+        elif tag == 'article':
+            if self._article_depth:
+                self._article_depth += 1
+            elif 'day-desc' in (dict(attrs).get('class') or '').split():
+                self._article_depth = 1
+                self.articles.append([])
+
+    def handle_endtag(self, tag):
+        if tag in _NOT_TEXT:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+        elif tag == 'article' and self._article_depth:
+            self._article_depth -= 1
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        self.page.append(data)
+        if self._article_depth:
+            self.articles[-1].append(data)
+
+@functools.lru_cache(maxsize=64)
+def _parse(page: str) -> Tuple[Tuple[str, ...], str]:
+    parser = _ArticleParser()
+    parser.feed(page)
+    parser.close()
+    return tuple(''.join(article) for article in parser.articles), ''.join(parser.page)
+
+def extract(page: str, puzzle_part: int) -> str:
+    """
+    Returns the prose of a part from the HTML of its puzzle page: the text of the first
+    day-desc article for part 1, of all of them for part 2, or of the whole page if it has none.
+
+    Gives the same text as BeautifulSoup's .text, without building a tree. Pages are parsed
+    once, so both parts of a puzzle and repeated calls for the same page cost a lookup.
+    """
+    articles, text = _parse(page)
+    if not articles:
+        return text
+    if puzzle_part == 1:
+        return articles[0]
+    return '\n'.join(articles)
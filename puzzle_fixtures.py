@@ -0,0 +1,121 @@
+import argparse
+import os
+import pathlib
+import threading
+import zipfile
+from typing import Dict, Iterable, List, Tuple
+from puzzle_store import STORE_PATH, normalize, parse_range
+
+class PuzzleFixtures:
+    """
+    Puzzles read from files instead of adventofcode.com, with the same functions as PuzzleStore.
+
+    For benchmarks and tests that must run offline on the same data every time. The fixtures
+    are a directory, or a zip file of one, laid out as <year>/<day>/ with these files:
+
+        input.txt    the puzzle input
+        prose1.txt   the prose of part 1
+        prose2.txt   the prose of parts 1 and 2, as shown once part 1 is solved
+        answer1.txt  the answer of part 1, if it's known
+        answer2.txt  the answer of part 2, if it's known
+
+    A part is solved if its answer is known. Nothing is ever submitted, so an answer to a part
+    without an answer file is never correct.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._root = zipfile.Path(path) if zipfile.is_zipfile(path) else pathlib.Path(path)
+        if not self._root.is_dir():
+            raise ValueError(f"{path} is neither a directory nor a zip file")
+        self._lock = threading.Lock()
+        self._files: Dict[Tuple[int, int, str], str | None] = {}
+
+    def puzzle_solved(self, puzzle_year: int, puzzle_day: int, puzzle_part: int) -> bool:
+        return self.answer(puzzle_year, puzzle_day, puzzle_part) is not None
+
+    def answer(self, puzzle_year: int, puzzle_day: int, puzzle_part: int) -> str | None:
+        answer = self._read(puzzle_year, puzzle_day, f"answer{puzzle_part}.txt")
+        return None if answer is None else normalize(answer)
+
+    def puzzle_prose(self, puzzle_year: int, puzzle_day: int, puzzle_part: int) -> str:
+        return self._require(puzzle_year, puzzle_day, f"prose{puzzle_part}.txt")
+
+    def input(self, puzzle_year: int, puzzle_day: int) -> str:
+        return self._require(puzzle_year, puzzle_day, "input.txt")
+
+    def check_answer(self, puzzle_year: int, puzzle_day: int, puzzle_part: int, answer: str) -> bool:
+        return bool(self.verify(puzzle_year, puzzle_day, puzzle_part, answer))
+
+    def verify(self, puzzle_year: int, puzzle_day: int, puzzle_part: int, answer: str) -> bool | None:
+        known = self.answer(puzzle_year, puzzle_day, puzzle_part)
+        return None if known is None else known == normalize(answer)
+
+    def verify_many(self, answers: Iterable[Tuple[int, int, int, str]]) -> List[bool | None]:
+        return [self.verify(*answer) for answer in answers]
+
+    def _require(self, puzzle_year: int, puzzle_day: int, name: str) -> str:
+        text = self._read(puzzle_year, puzzle_day, name)
+        if text is None:
+            raise FileNotFoundError(f"No {puzzle_year}/{puzzle_day}/{name} in {self.path}")
+        return text
+
+    def _read(self, puzzle_year: int, puzzle_day: int, name: str) -> str | None:
+        """Returns the contents of a fixture file, or None if there isn't one. Files are read once."""
+        key = (puzzle_year, puzzle_day, name)
+        with self._lock:
+            if key not in self._files:
+                file = self._root / str(puzzle_year) / str(puzzle_day) / name
+                self._files[key] = file.read_text(encoding='utf-8') if file.is_file() else None
+            return self._files[key]
+
+def write_fixtures(source, path: str, years: Iterable[int], days: Iterable[int] = range(1, 26)) -> List[str]:
+    """
+    Writes the given puzzles from source, such as a PuzzleStore, as fixtures in a directory,
+    or in a zip file if path ends with .zip. Returns the errors, one per puzzle that failed.
+    """
+    files = {}
+    errors = []
+    for puzzle_year in years:
+        for puzzle_day in days:
+            puzzle = {}
+            try:
+                puzzle["input.txt"] = source.input(puzzle_year, puzzle_day)
+                for puzzle_part in [1, 2] if puzzle_day < 25 else [1]:
+                    if puzzle_part == 2 and "answer1.txt" not in puzzle:
+                        break  # Part 2 isn't shown yet.
+                    puzzle[f"prose{puzzle_part}.txt"] = source.puzzle_prose(puzzle_year, puzzle_day, puzzle_part)
+                    answer = source.answer(puzzle_year, puzzle_day, puzzle_part)
+                    if answer is not None:
+                        puzzle[f"answer{puzzle_part}.txt"] = f"{answer}\n"
+            except Exception as e:
+                errors.append(f"{puzzle_year}/{puzzle_day}: {e}")
+                continue
+            for name, text in puzzle.items():
+                files[f"{puzzle_year}/{puzzle_day}/{name}"] = text
+    if path.endswith('.zip'):
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for name, text in files.items():
+                archive.writestr(name, text.encode('utf-8'))
+    else:
+        for name, text in files.items():
+            file = os.path.join(path, name)
+            os.makedirs(os.path.dirname(file), exist_ok=True)
+            with open(file, 'w', encoding='utf-8', newline='') as f:
+                f.write(text)
+    return errors
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Writes puzzles as fixtures for offline runs.")
+    parser.add_argument("path", help="The directory to write, or a .zip file")
+    parser.add_argument("--years", type=parse_range, required=True, help="The years to write, like 2015-2024")
+    parser.add_argument("--days", type=parse_range, default=range(1, 26), help="The days to write, like 1-25")
+    parser.add_argument("--store", default=STORE_PATH, help="The puzzle store to read them from, puzzles that aren't stored yet are fetched")
+    args = parser.parse_args()
+
+    import aoc
+    from puzzle_store import PuzzleStore
+    errors = write_fixtures(PuzzleStore(aoc, args.store), args.path, args.years, args.days)
+    for error in errors:
+        print(error)
+    print(f"Wrote {len(args.years) * len(args.days) - len(errors)} puzzles to {args.path}, {len(errors)} failed.")
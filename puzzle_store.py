@@ -0,0 +1,172 @@
+import argparse
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Set, Tuple
+
+STORE_PATH = "puzzle_store.db"
+
+class PuzzleStore:
+    """
+    A local copy of the puzzles' prose, inputs and answers, with the same functions as aoc.py.
+
+    aocd builds a Puzzle, reads its file cache and the prose is parsed out of the puzzle page
+    on every call, several times per attempt and again for every model. The store asks its
+    source (the aoc module, or anything with the same functions) once per puzzle, keeps the
+    result in a SQLite file shared by all runs and serves it from memory from then on.
+
+    Only what can't change is stored: the prose of part 2 once part 1 is solved, since the
+    page only shows part 2 after that, and answers once they are known.
+
+    Answers are checked locally whenever possible. Once a part's answer is known, checking is
+    a comparison of normalized strings, and answers the site rejected are remembered, so only
+    answers nobody has tried yet are submitted.
+    """
+
+    def __init__(self, source, path: str = STORE_PATH):
+        self.source = source
+        self.path = path
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._conn = None
+        self._prose: Dict[Tuple[int, int, int], str] = {}
+        self._inputs: Dict[Tuple[int, int], str] = {}
+        self._answers: Dict[Tuple[int, int, int], str] = {}
+        self._wrong_answers: Set[Tuple[int, int, int, str]] = set()
+
+    def puzzle_solved(self, puzzle_year: int, puzzle_day: int, puzzle_part: int) -> bool:
+        if self.answer(puzzle_year, puzzle_day, puzzle_part) is not None:
+            return True
+        return self.source.puzzle_solved(puzzle_year, puzzle_day, puzzle_part)
+
+    def answer(self, puzzle_year: int, puzzle_day: int, puzzle_part: int) -> str | None:
+        """Returns the correct answer of a solved part, or None."""
+        key = (puzzle_year, puzzle_day, puzzle_part)
+        self._load()
+        if key not in self._answers:
+            answer = self.source.answer(*key)
+            if answer is None:
+                return None
+            self._save(self._answers, key, str(answer), "INSERT OR REPLACE INTO PuzzleAnswers VALUES (?, ?, ?, ?)")
+        return self._answers[key]
+
+    def puzzle_prose(self, puzzle_year: int, puzzle_day: int, puzzle_part: int) -> str:
+        key = (puzzle_year, puzzle_day, puzzle_part)
+        self._load()
+        if key not in self._prose:
+            prose = self.source.puzzle_prose(*key)
+            if puzzle_part > 1 and self.answer(puzzle_year, puzzle_day, puzzle_part - 1) is None:
+                return prose  # Not final yet.
+            self._save(self._prose, key, prose, "INSERT OR REPLACE INTO PuzzleProse VALUES (?, ?, ?, ?)")
+        return self._prose[key]
+
+    def input(self, puzzle_year: int, puzzle_day: int) -> str:
+        key = (puzzle_year, puzzle_day)
+        self._load()
+        if key not in self._inputs:
+            input = self.source.input(*key)
+            self._save(self._inputs, key, input, "INSERT OR REPLACE INTO PuzzleInputs VALUES (?, ?, ?)", input.encode())
+        return self._inputs[key]
+
+    def check_answer(self, puzzle_year: int, puzzle_day: int, puzzle_part: int, answer: str) -> bool:
+        """
+        Checks an answer locally if we can, otherwise submits it and remembers the verdict.
+        An answer the site didn't judge counts as wrong, but is submitted again next time.
+        """
+        answer = normalize(answer)
+        self.answer(puzzle_year, puzzle_day, puzzle_part)
+        correct = self.verify(puzzle_year, puzzle_day, puzzle_part, answer)
+        if correct is not None:
+            return correct
+        correct = self.source.check_answer(puzzle_year, puzzle_day, puzzle_part, answer)
+        if correct:
+            self._save(self._answers, (puzzle_year, puzzle_day, puzzle_part), answer,
+                       "INSERT OR REPLACE INTO PuzzleAnswers VALUES (?, ?, ?, ?)")
+        elif correct is False:
+            with self._lock:
+                self._wrong_answers.add((puzzle_year, puzzle_day, puzzle_part, answer))
+            self._execute("INSERT OR IGNORE INTO PuzzleWrongAnswers VALUES (?, ?, ?, ?)", (puzzle_year, puzzle_day, puzzle_part, answer))
+        return bool(correct)
+
+    def verify(self, puzzle_year: int, puzzle_day: int, puzzle_part: int, answer: str) -> bool | None:
+        """Checks an answer against the stored answers only. Returns None if we can't tell."""
+        self._load()
+        answer = normalize(answer)
+        known = self._answers.get((puzzle_year, puzzle_day, puzzle_part))
+        if known is not None:
+            return normalize(known) == answer
+        if (puzzle_year, puzzle_day, puzzle_part, answer) in self._wrong_answers:
+            return False
+        return None
+
+    def verify_many(self, answers: Iterable[Tuple[int, int, int, str]]) -> List[bool | None]:
+        """verify() for each (puzzle_year, puzzle_day, puzzle_part, answer). Never submits anything."""
+        return [self.verify(*answer) for answer in answers]
+
+    def prefetch(self, years: Iterable[int], days: Iterable[int] = range(1, 26)) -> List[str]:
+        """Stores every part of the given puzzles that isn't stored yet. Returns the errors, one per puzzle that failed."""
+        errors = []
+        for puzzle_year in years:
+            for puzzle_day in days:
+                try:
+                    self.input(puzzle_year, puzzle_day)
+                    for puzzle_part in [1, 2] if puzzle_day < 25 else [1]:
+                        self.answer(puzzle_year, puzzle_day, puzzle_part)
+                        if puzzle_part == 1 or self.answer(puzzle_year, puzzle_day, 1) is not None:
+                            self.puzzle_prose(puzzle_year, puzzle_day, puzzle_part)
+                except Exception as e:
+                    errors.append(f"{puzzle_year}/{puzzle_day}: {e}")
+        return errors
+
+    def _load(self):
+        """Creates the tables if needed and reads everything stored, once. The connection is kept for writing."""
+        with self._lock:
+            if self._loaded:
+                return
+            # Threads share the connection, self._lock keeps them from using it at the same time.
+            conn = self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            with open("puzzle_store.sql", "r") as f:
+                conn.executescript(f.read())
+            for puzzle_year, puzzle_day, puzzle_part, prose in conn.execute("SELECT * FROM PuzzleProse"):
+                self._prose[puzzle_year, puzzle_day, puzzle_part] = prose
+            for puzzle_year, puzzle_day, input in conn.execute("SELECT * FROM PuzzleInputs"):
+                self._inputs[puzzle_year, puzzle_day] = input.decode()
+            for puzzle_year, puzzle_day, puzzle_part, answer in conn.execute("SELECT * FROM PuzzleAnswers"):
+                self._answers[puzzle_year, puzzle_day, puzzle_part] = answer
+            self._wrong_answers.update(conn.execute("SELECT * FROM PuzzleWrongAnswers"))
+            self._loaded = True
+
+    def _save(self, table: Dict, key: Tuple, value: str, sql: str, stored_value=None):
+        with self._lock:
+            table[key] = value
+        self._execute(sql, (*key, value if stored_value is None else stored_value))
+
+    def _execute(self, sql: str, params: Tuple):
+        self._load()
+        with self._lock:
+            with self._conn:
+                self._conn.execute(sql, params)
+
+def normalize(answer) -> str:
+    """Answers are compared as strings without surrounding whitespace, like the site does."""
+    return str(answer).strip()
+
+def parse_range(text: str) -> range:
+    """Parses '2015-2024' or '2024' into a range of integers."""
+    first, _, last = text.partition('-')
+    return range(int(first), int(last or first) + 1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manages the local copy of the Advent of Code puzzles.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    prefetch_parser = subparsers.add_parser("prefetch", help="Fetch and store puzzles, so runs don't need to")
+    prefetch_parser.add_argument("--years", type=parse_range, required=True, help="The years to fetch, like 2015-2024")
+    prefetch_parser.add_argument("--days", type=parse_range, default=range(1, 26), help="The days to fetch, like 1-25")
+    prefetch_parser.add_argument("--store", default=STORE_PATH, help="The store file")
+    args = parser.parse_args()
+
+    import aoc
+    store = PuzzleStore(aoc, args.store)
+    errors = store.prefetch(args.years, args.days)
+    for error in errors:
+        print(error)
+    print(f"Stored {len(args.years) * len(args.days) - len(errors)} puzzles in {args.store}, {len(errors)} failed.")
@@ -0,0 +1,35 @@
+-- The local copy of the puzzles kept by puzzle_store.PuzzleStore, in its own file so that
+-- every experiment database can share it.
+
+CREATE TABLE IF NOT EXISTS PuzzleProse (
+    puzzle_year INTEGER NOT NULL,
+    puzzle_day INTEGER NOT NULL,
+    puzzle_part INTEGER NOT NULL,
+    prose TEXT NOT NULL,
+    PRIMARY KEY (puzzle_year, puzzle_day, puzzle_part)
+);
+
+CREATE TABLE IF NOT EXISTS PuzzleInputs (
+    puzzle_year INTEGER NOT NULL,
+    puzzle_day INTEGER NOT NULL,
+    input BLOB NOT NULL,
+    PRIMARY KEY (puzzle_year, puzzle_day)
+);
+
+-- Only parts we have solved have an answer.
+CREATE TABLE IF NOT EXISTS PuzzleAnswers (
+    puzzle_year INTEGER NOT NULL,
+    puzzle_day INTEGER NOT NULL,
+    puzzle_part INTEGER NOT NULL,
+    answer TEXT NOT NULL,
+    PRIMARY KEY (puzzle_year, puzzle_day, puzzle_part)
+);
+
+-- Answers the site said were wrong, so they're never submitted twice.
+CREATE TABLE IF NOT EXISTS PuzzleWrongAnswers (
+    puzzle_year INTEGER NOT NULL,
+    puzzle_day INTEGER NOT NULL,
+    puzzle_part INTEGER NOT NULL,
+    answer TEXT NOT NULL,
+    PRIMARY KEY (puzzle_year, puzzle_day, puzzle_part, answer)
+);
@@ -0,0 +1,50 @@
+def rebuild_ranking_tables(conn):
+    """Recomputes the ModelRank, ModelFamilyRank, and YearRank tables from all experiment results.
+
+    The triggers in schema.sql keep these tables up to date as experiments are recorded, so this
+    is only needed to repair them, or when the triggers are first installed in an older database.
+    """
+    cursor = conn.cursor()
+
+    cursor.execute("DELETE FROM ModelRank")
+    cursor.execute("DELETE FROM ModelFamilyRank")
+    cursor.execute("DELETE FROM YearRank")
+
+    # Update ModelRank
+    cursor.execute("""
+        INSERT OR REPLACE INTO ModelRank (model_family, model_name, solved_count, total_attempted, success_rate)
+        SELECT
+            model_family,
+            model_name,
+            SUM(CASE WHEN answer_is_correct = 1 THEN 1 ELSE 0 END) as solved_count,
+            COUNT(*) as total_attempted,
+            CAST(SUM(CASE WHEN answer_is_correct = 1 THEN 1 ELSE 0 END) AS REAL) / COUNT(*) as success_rate
+        FROM Experiments
+        GROUP BY model_family, model_name
+    """)
+
+    # Update ModelFamilyRank
+    cursor.execute("""
+        INSERT OR REPLACE INTO ModelFamilyRank (model_family, solved_count, total_attempted, success_rate)
+        SELECT
+            model_family,
+            SUM(CASE WHEN answer_is_correct = 1 THEN 1 ELSE 0 END) as solved_count,
+            COUNT(*) as total_attempted,
+            CAST(SUM(CASE WHEN answer_is_correct = 1 THEN 1 ELSE 0 END) AS REAL) / COUNT(*) as success_rate
+        FROM Experiments
+        GROUP BY model_family
+    """)
+
+    # Update YearRank
+    cursor.execute("""
+        INSERT OR REPLACE INTO YearRank (puzzle_year, solved_count, total_attempted, success_rate)
+        SELECT
+            puzzle_year,
+            SUM(CASE WHEN answer_is_correct = 1 THEN 1 ELSE 0 END) as solved_count,
+            COUNT(*) as total_attempted,
+            CAST(SUM(CASE WHEN answer_is_correct = 1 THEN 1 ELSE 0 END) AS REAL) / COUNT(*) as success_rate
+        FROM Experiments
+        GROUP BY puzzle_year
+    """)
+
+    conn.commit()
@@ -0,0 +1,125 @@
+import datetime
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+# Length in seconds of each kind of quota window.
+WINDOWS = {
+    'minute': 60,
+    'day': 24 * 3600,
+}
+
+class TokenBucket:
+    """A bucket of `capacity` tokens that refills evenly over `window_seconds`."""
+
+    def __init__(self, capacity: int, window_seconds: float, tokens: float | None = None, updated_at: float | None = None):
+        self.capacity = capacity
+        self.refill_per_second = capacity / window_seconds
+        self.tokens = capacity if tokens is None else min(tokens, capacity)
+        self.updated_at = updated_at
+
+    def refill(self, now: float):
+        if self.updated_at is not None and now > self.updated_at:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    def wait_time(self, now: float) -> float:
+        """Returns the number of seconds until a token is available."""
+        self.refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.refill_per_second
+
+    def take(self, now: float):
+        self.refill(now)
+        self.tokens -= 1
+
+    def drain(self, now: float):
+        self.refill(now)
+        self.tokens = min(self.tokens, 0)
+
+class RateLimiter:
+    """
+    Per-model request budgets, one token bucket per declared quota window.
+
+    The runner only schedules a model when all of its buckets have a token, so it stays
+    within the quotas instead of finding out about them from 429 errors. Bucket levels are
+    saved in the RateLimitBuckets table so restarting the runner doesn't reset the budgets.
+    """
+
+    def __init__(self, limits: Dict[str, Dict[str, int]], clock: Callable[[], float] = time.time):
+        """
+        Args:
+            limits: model_name -> {window name: requests allowed per window}. Models
+                without limits are never throttled.
+            clock: Returns the current time in seconds since the epoch.
+        """
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Dict[str, TokenBucket]] = {
+            model_name: {window: TokenBucket(limit, WINDOWS[window]) for window, limit in model_limits.items()}
+            for model_name, model_limits in limits.items()
+        }
+
+    def load(self, cursor):
+        """Restores bucket levels saved by a previous run."""
+        cursor.execute("SELECT model_name, quota_window, tokens, updated_at FROM RateLimitBuckets")
+        with self._lock:
+            for model_name, window, tokens, updated_at in cursor.fetchall():
+                bucket = self._buckets.get(model_name, {}).get(window)
+                if bucket is not None:
+                    if isinstance(updated_at, str):
+                        updated_at = datetime.datetime.fromisoformat(updated_at)
+                    bucket.tokens = min(tokens, bucket.capacity)
+                    bucket.updated_at = updated_at.timestamp()
+
+    def save(self, conn):
+        """Writes the current bucket levels to the RateLimitBuckets table. The caller commits."""
+        with self._lock:
+            rows = [
+                (model_name, window, bucket.tokens, datetime.datetime.fromtimestamp(bucket.updated_at))
+                for model_name, buckets in self._buckets.items()
+                for window, bucket in buckets.items()
+                if bucket.updated_at is not None
+            ]
+        conn.executemany("INSERT OR REPLACE INTO RateLimitBuckets (model_name, quota_window, tokens, updated_at) VALUES (?, ?, ?, ?)", rows)
+
+    def wait_time(self, model_name: str) -> float:
+        """Returns the number of seconds until the model may be called again."""
+        with self._lock:
+            return self._wait_time(model_name, self._clock())
+
+    def available(self, model_name: str) -> bool:
+        return self.wait_time(model_name) == 0
+
+    def next_available_time(self, model_names: Iterable[str]) -> Optional[datetime.datetime]:
+        """Returns when the first of the given models that is out of tokens gets one back, or None."""
+        waits = [wait for wait in map(self.wait_time, model_names) if wait > 0]
+        if not waits:
+            return None
+        return datetime.datetime.now() + datetime.timedelta(seconds=min(waits))
+
+    def acquire(self, model_name: str):
+        """Takes a token from each of the model's buckets, sleeping until they have one."""
+        while True:
+            with self._lock:
+                now = self._clock()
+                wait = self._wait_time(model_name, now)
+                if wait == 0:
+                    for bucket in self._buckets.get(model_name, {}).values():
+                        bucket.take(now)
+                    return
+            time.sleep(wait)
+
+    def exhausted(self, model_name: str):
+        """Records that the model reported a quota error anyway.
+
+        We don't know which quota ran out, so assume it's all of them.
+        """
+        with self._lock:
+            now = self._clock()
+            for bucket in self._buckets.get(model_name, {}).values():
+                bucket.drain(now)
+
+    def _wait_time(self, model_name, now):
+        return max((bucket.wait_time(now) for bucket in self._buckets.get(model_name, {}).values()), default=0.0)
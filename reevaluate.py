@@ -0,0 +1,88 @@
+import argparse
+import blobs
+import concurrent.futures
+from aoc_api import set_puzzle_fixtures, set_sandbox_pool, submit_program, verify_answers
+from db_util import create_or_open_puzzle_db
+from sandbox_pool import SandboxPool
+
+def reevaluate(conn, jobs, timeout, model_name=None, puzzle_year=None, fill_usage=False):
+    """Runs the stored programs again on a SandboxPool and reports which outcomes changed.
+
+    With fill_usage, experiments recorded before CPU time and memory were measured get the
+    usage of the new run, if it had the same outcome.
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT experiment_id, puzzle_year, puzzle_day, puzzle_part, program_hash, run_status, answer, run_user_seconds
+        FROM Experiments
+        WHERE program_hash IS NOT NULL AND run_status IS NOT NULL
+        AND (? IS NULL OR model_name = ?) AND (? IS NULL OR puzzle_year = ?)
+    """, (model_name, model_name, puzzle_year, puzzle_year))
+    experiments = cursor.fetchall()
+
+    pool = SandboxPool(jobs)
+    set_sandbox_pool(pool)
+    futures = {}
+    for experiment in experiments:
+        _, puzzle_year, puzzle_day, puzzle_part, program_hash = experiment[:5]
+        program = blobs.text(cursor, program_hash)
+        futures[submit_program(puzzle_year, puzzle_day, puzzle_part, program, timeout)] = experiment
+
+    changed = 0
+    for future in concurrent.futures.as_completed(futures):
+        experiment_id, puzzle_year, puzzle_day, puzzle_part, _, run_status, answer, run_user_seconds = futures[future]
+        status, value, usage = future.result()
+        same = status == run_status and (status != 'answer' or value == answer)
+        if not same:
+            changed += 1
+            print(f"Experiment {experiment_id} ({puzzle_year}/{puzzle_day}/{puzzle_part}): was {run_status} {answer!r}, now {status} {value!r}")
+        elif fill_usage and run_user_seconds is None and usage is not None:
+            with conn:
+                conn.execute("""
+                    UPDATE Experiments SET run_user_seconds = ?, run_system_seconds = ?, run_max_rss_kb = ?
+                    WHERE experiment_id = ?
+                """, (usage.user_seconds, usage.system_seconds, usage.max_rss_kb, experiment_id))
+    set_sandbox_pool(None)
+    pool.shutdown()
+    print(f"Reran {len(experiments)} programs, {changed} had a different outcome.")
+
+def recheck_answers(conn, model_name=None, puzzle_year=None):
+    """Checks the stored answers against the known correct answers and fixes answer_is_correct where it disagrees.
+
+    Nothing is submitted, answers that aren't known yet are left as they are.
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT experiment_id, puzzle_year, puzzle_day, puzzle_part, answer, answer_is_correct
+        FROM Experiments
+        WHERE run_status = 'answer'
+        AND (? IS NULL OR model_name = ?) AND (? IS NULL OR puzzle_year = ?)
+    """, (model_name, model_name, puzzle_year, puzzle_year))
+    experiments = cursor.fetchall()
+    verdicts = verify_answers([experiment[1:5] for experiment in experiments])
+    updates = [(correct, experiment[0]) for experiment, correct in zip(experiments, verdicts)
+               if correct is not None and correct != bool(experiment[5])]
+    with conn:
+        conn.executemany("UPDATE Experiments SET answer_is_correct = ? WHERE experiment_id = ?", updates)
+    unknown = verdicts.count(None)
+    print(f"Checked {len(experiments)} answers, {unknown} couldn't be checked offline, {len(updates)} corrected.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs the stored programs again and compares the outcomes.")
+    parser.add_argument("--jobs", type=int, help="Number of programs to run at once, defaults to the number of CPU cores")
+    parser.add_argument("--timeout", type=int, default=10, help="CPU seconds to allow each program")
+    parser.add_argument("--model-name", help="Only rerun this model's programs")
+    parser.add_argument("--year", type=int, help="Only rerun programs for this year")
+    parser.add_argument("--fill-usage", action="store_true", help="Record CPU time and memory for experiments that don't have them")
+    parser.add_argument("--recheck-answers", action="store_true", help="Only check the stored answers against the known answers, without running or submitting anything")
+    parser.add_argument("--fixtures", help="Read the puzzles from this puzzle_fixtures directory or zip file instead of adventofcode.com")
+    args = parser.parse_args()
+    if args.fixtures:
+        set_puzzle_fixtures(args.fixtures)
+
+    conn = create_or_open_puzzle_db()
+    if args.recheck_answers:
+        recheck_answers(conn, args.model_name, args.year)
+    else:
+        reevaluate(conn, args.jobs, args.timeout, args.model_name, args.year, args.fill_usage)
+    conn.close()
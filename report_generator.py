@@ -148,7 +148,13 @@ def generate_csv_reports(cursor, args):
         print("Generated year_ranking.csv")
 
     if args.csv_all or args.csv_experiments:
-        cursor.execute("SELECT * FROM Experiments")
+        # The prompt and program text are in the Blobs table, see blobs.py.
+        cursor.execute("""
+            SELECT Experiments.*, blob_text(prompts.data) AS prompt, blob_text(programs.data) AS program
+            FROM Experiments
+            LEFT JOIN Blobs AS prompts ON prompts.blob_hash = Experiments.prompt_hash
+            LEFT JOIN Blobs AS programs ON programs.blob_hash = Experiments.program_hash
+        """)
         with open("experiments.csv", "w", newline="") as csvfile:
             writer = csv.writer(csvfile)
             writer.writerow([description[0] for description in cursor.description])  # Write header row
@@ -0,0 +1,91 @@
+import dataclasses
+import hashlib
+import json
+import threading
+from typing import Dict, List, Tuple
+import perform
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+class ResultCache:
+    """
+    Remembers the outcome of every program run, keyed by the program and input that produced it.
+
+    Models often generate byte-identical programs, for the same puzzle or for another model's
+    attempt, and an interrupted run repeats the attempts it didn't save. Running the same program
+    on the same input and part with the same limits gives the same outcome, so the sandbox only
+    needs to run it once. Results are saved in the ProgramResults table so they survive restarts.
+
+    Warm and cold runs are cached apart, since their usage differs. Programs stopped by the
+    wall-clock deadline rather than the CPU time limit aren't cached: whether they make it
+    depends on how busy the machine was.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.cpu_seconds_saved = 0.0
+        self._lock = threading.Lock()
+        self._results: Dict[Tuple, Tuple[str, str | None, perform.Usage]] = {}
+        self._unsaved: List[Tuple] = []
+
+    @staticmethod
+    def key(program: str, input: str | perform.InputFile, puzzle_part: int, timeout: int, limits: perform.Limits = perform.LIMITS,
+            warm: bool = False) -> Tuple:
+        """The key for running program on input with the given timeout and limits, in the warm pool if warm."""
+        input_hash = input.sha256 if isinstance(input, perform.InputFile) else _hash(input)
+        settings = [timeout, dataclasses.asdict(limits), 'warm' if warm else 'cold']
+        return (_hash(program), input_hash, puzzle_part, json.dumps(settings, sort_keys=True))
+
+    def get(self, key: Tuple) -> Tuple[str, str | None, perform.Usage] | None:
+        """Returns the (outcome, output, usage) of perform.run_measured for the key, or None if it hasn't run yet."""
+        with self._lock:
+            result = self._results.get(key)
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.cpu_seconds_saved += result[2].cpu_seconds
+            return result
+
+    def put(self, key: Tuple, result: Tuple[str, str | None, perform.Usage | None]):
+        """Records the result of a run. Runs that couldn't start have no usage and aren't cached."""
+        outcome, _, usage = result
+        if usage is None:
+            return
+        timeout = json.loads(key[3])[0]
+        if outcome == 'timeout' and usage.cpu_seconds < timeout:
+            return  # Stopped by the wall-clock deadline.
+        with self._lock:
+            if key not in self._results:
+                self._results[key] = result
+                self._unsaved.append(key)
+
+    def load(self, cursor):
+        """Restores the results saved by previous runs."""
+        cursor.execute("""
+            SELECT program_hash, input_hash, puzzle_part, limits, outcome, output, run_user_seconds, run_system_seconds, run_max_rss_kb
+            FROM ProgramResults
+        """)
+        with self._lock:
+            for row in cursor.fetchall():
+                self._results[tuple(row[:4])] = (row[4], row[5], perform.Usage(*row[6:]))
+
+    def save(self, conn):
+        """Writes the results recorded since the last save to the ProgramResults table. The caller commits."""
+        with self._lock:
+            rows = [(*key, outcome, output, usage.user_seconds, usage.system_seconds, usage.max_rss_kb)
+                    for key in self._unsaved
+                    for outcome, output, usage in [self._results[key]]]
+            self._unsaved = []
+        conn.executemany("""
+            INSERT OR IGNORE INTO ProgramResults (
+                program_hash, input_hash, puzzle_part, limits, outcome, output, run_user_seconds, run_system_seconds, run_max_rss_kb
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+
+    def format_stats(self) -> str:
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups if lookups else 0.0
+        return f"{self.hits} hits, {self.misses} misses ({hit_rate:.0%} hit rate), {self.cpu_seconds_saved:.1f} CPU seconds saved"
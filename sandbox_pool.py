@@ -0,0 +1,50 @@
+import concurrent.futures
+import os
+import queue
+from typing import Iterable, List
+import perform
+
+class SandboxPool:
+    """
+    Runs sandboxed programs concurrently, each pinned to a CPU core of its own.
+
+    Every job is a separate process started by perform.run_measured. At most `max_jobs` run at
+    once, and each one is pinned with sched_setaffinity to a core that no other job is using,
+    so a program's CPU time doesn't depend on how many others are running.
+    """
+
+    def __init__(self, max_jobs: int | None = None, cores: Iterable[int] | None = None, pin: bool = True):
+        """
+        Args:
+            max_jobs: The most jobs to run at once. Defaults to the number of cores.
+            cores: The cores to run jobs on. Defaults to the cores this process may use.
+            pin: Pin each job to its own core. Without pinning, max_jobs may exceed the number of cores.
+        """
+        if cores is None:
+            cores = os.sched_getaffinity(0) if hasattr(os, 'sched_getaffinity') else range(os.cpu_count() or 1)
+        cores = sorted(cores)
+        self.pin = pin and hasattr(os, 'sched_setaffinity')
+        self.max_jobs = max_jobs or len(cores)
+        if self.pin and self.max_jobs > len(cores):
+            raise ValueError(f"Can't pin {self.max_jobs} jobs to {len(cores)} cores")
+        self._cores = queue.Queue()
+        for core in cores[:self.max_jobs]:
+            self._cores.put(core)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_jobs, thread_name_prefix="sandbox")
+
+    def submit(self, program: str, input: str | perform.InputFile, args: List[str], timeout: int,
+               limits: perform.Limits = perform.LIMITS) -> concurrent.futures.Future:
+        """Queues a program to run. The Future resolves to the (outcome, output, usage) of perform.run_measured."""
+        return self._executor.submit(self._run, program, input, args, timeout, limits)
+
+    def shutdown(self):
+        self._executor.shutdown()
+
+    def _run(self, program, input, args, timeout, limits):
+        if not self.pin:
+            return perform.run_measured(program, input, args, timeout, limits)
+        core = self._cores.get()
+        try:
+            return perform.run_measured(program, input, args, timeout, limits, cores={core})
+        finally:
+            self._cores.put(core)
@@ -0,0 +1,328 @@
+import datetime
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+# A unit of work: (puzzle_year, puzzle_day, puzzle_part, model_family, model_name)
+Cell = Tuple[int, int, int, str, str]
+
+YEARS = list(range(2015, 2025))
+DAYS = list(range(1, 26))
+PARTS = [1, 2]
+
+_PENDING_CELLS_QUERY = """
+    WITH generate_series(value) AS (
+        SELECT 1 UNION ALL SELECT 2 UNION ALL SELECT 3 UNION ALL SELECT 4 UNION ALL
+        SELECT 5 UNION ALL SELECT 6 UNION ALL SELECT 7 UNION ALL SELECT 8 UNION ALL
+        SELECT 9 UNION ALL SELECT 10 UNION ALL SELECT 11 UNION ALL SELECT 12 UNION ALL
+        SELECT 13 UNION ALL SELECT 14 UNION ALL SELECT 15 UNION ALL SELECT 16 UNION ALL
+        SELECT 17 UNION ALL SELECT 18 UNION ALL SELECT 19 UNION ALL SELECT 20 UNION ALL
+        SELECT 21 UNION ALL SELECT 22 UNION ALL SELECT 23 UNION ALL SELECT 24 UNION ALL
+        SELECT 25
+    ), ValidExperiments AS (
+        SELECT DISTINCT
+            e.puzzle_year,
+            e.puzzle_day,
+            e.model_family,
+            e.model_name
+        FROM
+            Experiments e
+        WHERE
+            e.puzzle_part = 1 AND e.answer_is_correct = 1
+    )
+    SELECT
+        {columns}
+    FROM
+        Models m
+    CROSS JOIN (
+        SELECT DISTINCT puzzle_year FROM (
+            SELECT puzzle_year FROM Experiments
+            UNION ALL
+            SELECT 2015 AS puzzle_year
+            UNION ALL
+            SELECT 2016 AS puzzle_year
+            UNION ALL
+            SELECT 2017 AS puzzle_year
+            UNION ALL
+            SELECT 2018 AS puzzle_year
+            UNION ALL
+            SELECT 2019 AS puzzle_year
+            UNION ALL
+            SELECT 2020 AS puzzle_year
+            UNION ALL
+            SELECT 2021 AS puzzle_year
+            UNION ALL
+            SELECT 2022 AS puzzle_year
+            UNION ALL
+            SELECT 2023 AS puzzle_year
+            UNION ALL
+            SELECT 2024 AS puzzle_year
+        )
+    ) y
+    CROSS JOIN (
+        SELECT DISTINCT puzzle_day FROM (
+            SELECT puzzle_day FROM Experiments
+            UNION ALL
+            SELECT value AS puzzle_day FROM generate_series
+        )
+    ) d
+    CROSS JOIN (
+        SELECT DISTINCT puzzle_part FROM (
+            SELECT puzzle_part FROM Experiments
+            UNION
+            SELECT 1 AS puzzle_part
+            UNION
+            SELECT 2 AS puzzle_part
+        )
+    ) p
+    LEFT JOIN
+        Experiments e ON m.model_family = e.model_family
+        AND m.model_name = e.model_name
+        AND y.puzzle_year = e.puzzle_year
+        AND d.puzzle_day = e.puzzle_day
+        AND p.puzzle_part = e.puzzle_part
+    WHERE e.experiment_id IS NULL
+    AND NOT (d.puzzle_day = 25 AND p.puzzle_part = 2)
+    AND (p.puzzle_part = 1 OR EXISTS (
+        SELECT 1
+        FROM ValidExperiments ve
+        WHERE ve.model_family = m.model_family
+        AND ve.model_name = m.model_name
+        AND ve.puzzle_year = y.puzzle_year
+        AND ve.puzzle_day = d.puzzle_day
+    ))
+    {extra_where}
+"""
+
+def get_next_puzzle_to_solve(cursor, timed_out_models):
+    """
+    Determines the next puzzle to solve by querying the whole puzzle grid.
+
+    This is the original SQL scheduler. The runner uses WorkFrontier instead, this
+    query is kept as the reference implementation that WorkFrontier is checked against.
+
+    Returns a tuple: (next_puzzle, more_puzzles_available)
+      - next_puzzle: A tuple representing the next puzzle to solve, or None if no puzzles are available.
+      - more_puzzles_available: A boolean indicating if there are more puzzles to solve, even if
+        they are currently blocked by timeouts.
+    """
+    timed_out_placeholders = ','.join(['?'] * len(timed_out_models))
+    cursor.execute(_PENDING_CELLS_QUERY.format(
+        columns="m.model_family, m.model_name, y.puzzle_year, d.puzzle_day, p.puzzle_part",
+        extra_where=f"AND m.model_name NOT IN ({timed_out_placeholders}) LIMIT 1"),
+        list(timed_out_models))
+    next_puzzle = cursor.fetchone()
+
+    # Check if there are any more puzzles left to solve, even if some are blocked by timeouts
+    cursor.execute(_PENDING_CELLS_QUERY.format(columns="1", extra_where="LIMIT 1"))
+    more_puzzles_available = cursor.fetchone() is not None
+
+    if next_puzzle:
+        model_family, model_name, puzzle_year, puzzle_day, puzzle_part = next_puzzle
+        return (puzzle_year, puzzle_day, puzzle_part, model_family, model_name), more_puzzles_available
+    else:
+        return None, more_puzzles_available  # Indicates no more puzzles to solve right now
+
+def pending_cells_sql(cursor) -> Set[Cell]:
+    """Returns every pending cell according to the reference SQL query."""
+    cursor.execute(_PENDING_CELLS_QUERY.format(
+        columns="y.puzzle_year, d.puzzle_day, p.puzzle_part, m.model_family, m.model_name",
+        extra_where=""))
+    return set(cursor.fetchall())
+
+class WorkFrontier:
+    """
+    The set of (model, year, day, part) cells that still need an attempt.
+
+    The frontier is built from the database once, then kept up to date in memory as
+    attempts finish, so picking the next puzzle no longer scans the Experiments table.
+    Pending cells are grouped by model, which makes next_puzzle() cost proportional to
+    the number of models rather than the size of the puzzle grid.
+    """
+
+    def __init__(self, cursor, model_families: Iterable[str] | None = None):
+        """
+        Args:
+            cursor: A cursor on the puzzle database.
+            model_families: Only schedule models from these families. None for all models.
+        """
+        # model_name -> insertion ordered set of pending cells for that model.
+        self._pending: Dict[str, Dict[Cell, None]] = {}
+        # Pending cells that another runner is working on, and when to look at them again.
+        self._deferred: Dict[Cell, datetime.datetime] = {}
+        self._attempted: Set[Cell] = set()
+        self._count = 0
+        self._load(cursor, None if model_families is None else set(model_families))
+
+    def _load(self, cursor, model_families):
+        cursor.execute("SELECT model_family, model_name FROM Models ORDER BY rowid")
+        model_list = [(model_family, model_name) for model_family, model_name in cursor.fetchall()
+                      if model_families is None or model_family in model_families]
+
+        cursor.execute("""
+            SELECT puzzle_year, puzzle_day, puzzle_part, model_family, model_name, answer_is_correct
+            FROM Experiments
+        """)
+        solved_part_1 = set()
+        years, days, parts = set(YEARS), set(DAYS), set(PARTS)
+        for puzzle_year, puzzle_day, puzzle_part, model_family, model_name, answer_is_correct in cursor.fetchall():
+            self._attempted.add((puzzle_year, puzzle_day, puzzle_part, model_family, model_name))
+            if puzzle_part == 1 and answer_is_correct == 1:
+                solved_part_1.add((puzzle_year, puzzle_day, model_family, model_name))
+            years.add(puzzle_year)
+            days.add(puzzle_day)
+            parts.add(puzzle_part)
+
+        for model_family, model_name in model_list:
+            cells = self._pending.setdefault(model_name, {})
+            for puzzle_year in sorted(years):
+                for puzzle_day in sorted(days):
+                    for puzzle_part in sorted(parts):
+                        cell = (puzzle_year, puzzle_day, puzzle_part, model_family, model_name)
+                        if cell in self._attempted or (puzzle_day == 25 and puzzle_part == 2):
+                            continue
+                        if puzzle_part != 1 and (puzzle_year, puzzle_day, model_family, model_name) not in solved_part_1:
+                            continue
+                        cells[cell] = None
+            self._count += len(cells)
+
+    def next_puzzle(self, excluded_models: Iterable[str] = ()) -> Optional[Cell]:
+        """Returns a pending cell for a model that isn't excluded, or None."""
+        excluded = set(excluded_models)
+        for model_name, cells in self._pending.items():
+            if cells and model_name not in excluded:
+                return next(iter(cells))
+        return None
+
+    def pending_count(self, model_name: str) -> int:
+        """Returns the number of cells pending for a model, not counting deferred ones."""
+        return len(self._pending.get(model_name, ()))
+
+    def more_puzzles_available(self) -> bool:
+        """True if any cell is pending, even if its model is currently excluded or it's deferred."""
+        return self._count > 0 or bool(self._deferred)
+
+    def next_puzzle_to_solve(self, timed_out_models: Iterable[str]) -> Tuple[Optional[Cell], bool]:
+        """Same contract as get_next_puzzle_to_solve, answered from memory."""
+        return self.next_puzzle(timed_out_models), self.more_puzzles_available()
+
+    def pending_cells(self) -> Set[Cell]:
+        return {cell for cells in self._pending.values() for cell in cells} | set(self._deferred)
+
+    def record_attempt(self, cell: Cell, answer_is_correct: bool | None):
+        """Marks a cell as attempted, unlocking part 2 when part 1 was answered correctly."""
+        self._discard(cell)
+        self._attempted.add(cell)
+        puzzle_year, puzzle_day, puzzle_part, model_family, model_name = cell
+        if puzzle_part == 1 and answer_is_correct and puzzle_day != 25:
+            part_2 = (puzzle_year, puzzle_day, 2, model_family, model_name)
+            if part_2 not in self._attempted and part_2 not in self._deferred:
+                cells = self._pending.setdefault(model_name, {})
+                if part_2 not in cells:
+                    cells[part_2] = None
+                    self._count += 1
+
+    def skip(self, cell: Cell):
+        """Drops a cell for the rest of this run without recording an attempt."""
+        self._discard(cell)
+
+    def defer(self, cell: Cell, until: datetime.datetime):
+        """Sets a pending cell aside until the given time, e.g. while another runner holds it."""
+        self._discard(cell)
+        self._deferred[cell] = until
+
+    def release_deferred(self, now: datetime.datetime):
+        """Makes deferred cells whose time has come pending again."""
+        for cell, until in list(self._deferred.items()):
+            if until <= now:
+                del self._deferred[cell]
+                self._pending.setdefault(cell[4], {})[cell] = None
+                self._count += 1
+
+    def next_deferred_time(self) -> Optional[datetime.datetime]:
+        return min(self._deferred.values(), default=None)
+
+    def refresh_cell(self, cursor, cell: Cell):
+        """Updates the frontier from the Experiments row for a cell that was just attempted.
+
+        If the attempt didn't produce a row (for example the LLM call failed) the cell is
+        skipped for the rest of this run; it will be retried the next time the runner starts.
+        """
+        puzzle_year, puzzle_day, puzzle_part, model_family, model_name = cell
+        cursor.execute("""
+            SELECT answer_is_correct FROM Experiments
+            WHERE model_family = ? AND model_name = ? AND puzzle_year = ? AND puzzle_day = ? AND puzzle_part = ?
+        """, (model_family, model_name, puzzle_year, puzzle_day, puzzle_part))
+        row = cursor.fetchone()
+        if row is None:
+            self.skip(cell)
+        else:
+            self.record_attempt(cell, row[0] == 1)
+
+    def _discard(self, cell: Cell):
+        self._deferred.pop(cell, None)
+        cells = self._pending.get(cell[4])
+        if cells is not None and cell in cells:
+            del cells[cell]
+            self._count -= 1
+
+    def verify_against_sql(self, cursor) -> Tuple[Set[Cell], Set[Cell]]:
+        """Compares the frontier with the reference SQL query.
+
+        Returns:
+            A tuple (missing, extra): cells the SQL reports as pending but the frontier doesn't,
+            and cells the frontier holds that the SQL doesn't.
+        """
+        expected = pending_cells_sql(cursor)
+        actual = self.pending_cells()
+        return expected - actual, actual - expected
+
+class ModelAffinity:
+    """
+    Keeps a model family on one model for a batch of attempts before switching to another.
+
+    Local ollama models share one machine, and switching between them makes ollama unload
+    one model's weights and load the next. The policy sticks to the most recently used model
+    of each affinity family until it has run `batch_size` attempts or has nothing pending,
+    and only switches once its attempts in flight have finished.
+    """
+
+    def __init__(self, family_models: Dict[str, Iterable[str]], batch_size: int | None = None):
+        """
+        Args:
+            family_models: model_family -> model names, for the families to batch.
+            batch_size: Attempts to run with a model before switching to another one that
+                has work pending. None to stay on a model until it has nothing left to do.
+        """
+        self.batch_size = batch_size
+        self._models = {family: set(models) for family, models in family_models.items()}
+        self._loaded: Dict[str, str] = {}
+        self._batch: Dict[str, int] = {}
+        self.switches: Dict[str, int] = {family: 0 for family in family_models}
+
+    def excluded_models(self, frontier: WorkFrontier, running_models: Iterable[str]) -> Set[str]:
+        """Returns the models that must not be started now to keep their family on one model."""
+        running = set(running_models)
+        excluded = set()
+        for family, models in self._models.items():
+            loaded = self._loaded.get(family)
+            busy = models & running
+            if busy:
+                # Don't load another model while this one is still working.
+                excluded |= models - busy
+            elif loaded is not None and frontier.pending_count(loaded) > 0:
+                if self.batch_size is None or self._batch[family] < self.batch_size:
+                    excluded |= models - {loaded}
+                elif any(frontier.pending_count(model) > 0 for model in models - {loaded}):
+                    # The batch is over, give the other models a turn.
+                    excluded.add(loaded)
+        return excluded
+
+    def started(self, model_family: str, model_name: str):
+        """Records that an attempt with the model was started."""
+        if model_family not in self._models:
+            return
+        if self._loaded.get(model_family) != model_name:
+            if model_family in self._loaded:
+                self.switches[model_family] += 1
+            self._loaded[model_family] = model_name
+            self._batch[model_family] = 0
+        self._batch[model_family] += 1
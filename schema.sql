@@ -5,8 +5,9 @@ CREATE TABLE IF NOT EXISTS Experiments (
     puzzle_year INTEGER NOT NULL,
     puzzle_day INTEGER NOT NULL,
     puzzle_part INTEGER NOT NULL,
-    prompt TEXT,
-    program TEXT,
+    -- The prompt and program are stored in Blobs, see blobs.py.
+    prompt_hash TEXT,
+    program_hash TEXT,
     run_status TEXT CHECK( run_status IN ('error', 'timeout', 'answer') ),
     run_error_message TEXT,
     run_timeout_seconds INTEGER,
@@ -14,9 +15,57 @@ CREATE TABLE IF NOT EXISTS Experiments (
     answer_is_correct BOOLEAN,
     experiment_started_at TIMESTAMP,
     experiment_finished_at TIMESTAMP,
+    run_user_seconds REAL,
+    run_system_seconds REAL,
+    run_max_rss_kb INTEGER,
+    run_profile TEXT,
     UNIQUE(model_family, model_name, puzzle_year, puzzle_day, puzzle_part)
 );
 
+-- Every program run of an experiment. A program that times out may be rerun with a longer
+-- timeout or replaced by a newly generated one; Experiments holds the outcome of the last run.
+CREATE TABLE IF NOT EXISTS ProgramRuns (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    model_family TEXT NOT NULL,
+    model_name TEXT NOT NULL,
+    puzzle_year INTEGER NOT NULL,
+    puzzle_day INTEGER NOT NULL,
+    puzzle_part INTEGER NOT NULL,
+    generation INTEGER NOT NULL,
+    prompt_hash TEXT,
+    program_hash TEXT,
+    run_status TEXT CHECK( run_status IN ('error', 'timeout', 'answer') ),
+    run_error_message TEXT,
+    run_timeout_seconds INTEGER,
+    run_seconds REAL,
+    answer TEXT,
+    answer_is_correct BOOLEAN,
+    run_started_at TIMESTAMP,
+    run_finished_at TIMESTAMP,
+    run_user_seconds REAL,
+    run_system_seconds REAL,
+    run_max_rss_kb INTEGER,
+    -- Hot functions and lines as JSON when the runner was started with --profile, see profiler.summarize.
+    run_profile TEXT
+);
+
+-- Prompts and programs, zlib compressed and keyed by the sha256 of their text, so a prompt
+-- that every model gets or a program that several models write is stored once.
+CREATE TABLE IF NOT EXISTS Blobs (
+    blob_hash TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ProgramRunsByPuzzle ON ProgramRuns (model_family, model_name, puzzle_year, puzzle_day, puzzle_part);
+
+-- Deleting an experiment so that it's attempted again also deletes its program runs.
+CREATE TRIGGER IF NOT EXISTS ExperimentsDeleteRuns AFTER DELETE ON Experiments
+BEGIN
+    DELETE FROM ProgramRuns
+    WHERE model_family = OLD.model_family AND model_name = OLD.model_name
+    AND puzzle_year = OLD.puzzle_year AND puzzle_day = OLD.puzzle_day AND puzzle_part = OLD.puzzle_part;
+END;
+
 CREATE TABLE IF NOT EXISTS QuotaTimeouts (
     model_name TEXT PRIMARY KEY,
     timeout_until TIMESTAMP NOT NULL
@@ -54,3 +103,140 @@ CREATE TABLE IF NOT EXISTS Models (
     model_family TEXT,
     FOREIGN KEY (model_family) REFERENCES ModelFamilies(model_family)
 );
+
+CREATE TABLE IF NOT EXISTS RateLimitBuckets (
+    model_name TEXT NOT NULL,
+    quota_window TEXT NOT NULL,
+    tokens REAL NOT NULL,
+    updated_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (model_name, quota_window)
+);
+
+-- Keep ModelRank, ModelFamilyRank and YearRank up to date as experiments are recorded.
+-- rank_tables.rebuild_ranking_tables() recomputes them from scratch.
+CREATE TRIGGER IF NOT EXISTS ExperimentsRankInsert AFTER INSERT ON Experiments
+BEGIN
+    INSERT OR IGNORE INTO ModelRank (model_family, model_name, solved_count, total_attempted, success_rate)
+    VALUES (NEW.model_family, NEW.model_name, 0, 0, 0);
+    UPDATE ModelRank SET
+        solved_count = solved_count + (CASE WHEN NEW.answer_is_correct = 1 THEN 1 ELSE 0 END),
+        total_attempted = total_attempted + 1,
+        success_rate = CAST(solved_count + (CASE WHEN NEW.answer_is_correct = 1 THEN 1 ELSE 0 END) AS REAL) / (total_attempted + 1)
+    WHERE model_family = NEW.model_family AND model_name = NEW.model_name;
+
+    INSERT OR IGNORE INTO ModelFamilyRank (model_family, solved_count, total_attempted, success_rate)
+    VALUES (NEW.model_family, 0, 0, 0);
+    UPDATE ModelFamilyRank SET
+        solved_count = solved_count + (CASE WHEN NEW.answer_is_correct = 1 THEN 1 ELSE 0 END),
+        total_attempted = total_attempted + 1,
+        success_rate = CAST(solved_count + (CASE WHEN NEW.answer_is_correct = 1 THEN 1 ELSE 0 END) AS REAL) / (total_attempted + 1)
+    WHERE model_family = NEW.model_family;
+
+    INSERT OR IGNORE INTO YearRank (puzzle_year, solved_count, total_attempted, success_rate)
+    VALUES (NEW.puzzle_year, 0, 0, 0);
+    UPDATE YearRank SET
+        solved_count = solved_count + (CASE WHEN NEW.answer_is_correct = 1 THEN 1 ELSE 0 END),
+        total_attempted = total_attempted + 1,
+        success_rate = CAST(solved_count + (CASE WHEN NEW.answer_is_correct = 1 THEN 1 ELSE 0 END) AS REAL) / (total_attempted + 1)
+    WHERE puzzle_year = NEW.puzzle_year;
+END;
+
+CREATE TRIGGER IF NOT EXISTS ExperimentsRankDelete AFTER DELETE ON Experiments
+BEGIN
+    UPDATE ModelRank SET
+        solved_count = solved_count - (CASE WHEN OLD.answer_is_correct = 1 THEN 1 ELSE 0 END),
+        total_attempted = total_attempted - 1,
+        success_rate = COALESCE(CAST(solved_count - (CASE WHEN OLD.answer_is_correct = 1 THEN 1 ELSE 0 END) AS REAL) / NULLIF(total_attempted - 1, 0), 0)
+    WHERE model_family = OLD.model_family AND model_name = OLD.model_name;
+    DELETE FROM ModelRank WHERE model_family = OLD.model_family AND model_name = OLD.model_name AND total_attempted <= 0;
+
+    UPDATE ModelFamilyRank SET
+        solved_count = solved_count - (CASE WHEN OLD.answer_is_correct = 1 THEN 1 ELSE 0 END),
+        total_attempted = total_attempted - 1,
+        success_rate = COALESCE(CAST(solved_count - (CASE WHEN OLD.answer_is_correct = 1 THEN 1 ELSE 0 END) AS REAL) / NULLIF(total_attempted - 1, 0), 0)
+    WHERE model_family = OLD.model_family;
+    DELETE FROM ModelFamilyRank WHERE model_family = OLD.model_family AND total_attempted <= 0;
+
+    UPDATE YearRank SET
+        solved_count = solved_count - (CASE WHEN OLD.answer_is_correct = 1 THEN 1 ELSE 0 END),
+        total_attempted = total_attempted - 1,
+        success_rate = COALESCE(CAST(solved_count - (CASE WHEN OLD.answer_is_correct = 1 THEN 1 ELSE 0 END) AS REAL) / NULLIF(total_attempted - 1, 0), 0)
+    WHERE puzzle_year = OLD.puzzle_year;
+    DELETE FROM YearRank WHERE puzzle_year = OLD.puzzle_year AND total_attempted <= 0;
+END;
+
+-- Only answer_is_correct changes in practice, moving a row to another model or year is handled too.
+CREATE TRIGGER IF NOT EXISTS ExperimentsRankUpdate AFTER UPDATE OF model_family, model_name, puzzle_year, answer_is_correct ON Experiments
+BEGIN
+    UPDATE ModelRank SET
+        solved_count = solved_count - (CASE WHEN OLD.answer_is_correct = 1 THEN 1 ELSE 0 END),
+        total_attempted = total_attempted - 1,
+        success_rate = COALESCE(CAST(solved_count - (CASE WHEN OLD.answer_is_correct = 1 THEN 1 ELSE 0 END) AS REAL) / NULLIF(total_attempted - 1, 0), 0)
+    WHERE model_family = OLD.model_family AND model_name = OLD.model_name;
+    DELETE FROM ModelRank WHERE model_family = OLD.model_family AND model_name = OLD.model_name AND total_attempted <= 0;
+    INSERT OR IGNORE INTO ModelRank (model_family, model_name, solved_count, total_attempted, success_rate)
+    VALUES (NEW.model_family, NEW.model_name, 0, 0, 0);
+    UPDATE ModelRank SET
+        solved_count = solved_count + (CASE WHEN NEW.answer_is_correct = 1 THEN 1 ELSE 0 END),
+        total_attempted = total_attempted + 1,
+        success_rate = CAST(solved_count + (CASE WHEN NEW.answer_is_correct = 1 THEN 1 ELSE 0 END) AS REAL) / (total_attempted + 1)
+    WHERE model_family = NEW.model_family AND model_name = NEW.model_name;
+
+    UPDATE ModelFamilyRank SET
+        solved_count = solved_count - (CASE WHEN OLD.answer_is_correct = 1 THEN 1 ELSE 0 END),
+        total_attempted = total_attempted - 1,
+        success_rate = COALESCE(CAST(solved_count - (CASE WHEN OLD.answer_is_correct = 1 THEN 1 ELSE 0 END) AS REAL) / NULLIF(total_attempted - 1, 0), 0)
+    WHERE model_family = OLD.model_family;
+    DELETE FROM ModelFamilyRank WHERE model_family = OLD.model_family AND total_attempted <= 0;
+    INSERT OR IGNORE INTO ModelFamilyRank (model_family, solved_count, total_attempted, success_rate)
+    VALUES (NEW.model_family, 0, 0, 0);
+    UPDATE ModelFamilyRank SET
+        solved_count = solved_count + (CASE WHEN NEW.answer_is_correct = 1 THEN 1 ELSE 0 END),
+        total_attempted = total_attempted + 1,
+        success_rate = CAST(solved_count + (CASE WHEN NEW.answer_is_correct = 1 THEN 1 ELSE 0 END) AS REAL) / (total_attempted + 1)
+    WHERE model_family = NEW.model_family;
+
+    UPDATE YearRank SET
+        solved_count = solved_count - (CASE WHEN OLD.answer_is_correct = 1 THEN 1 ELSE 0 END),
+        total_attempted = total_attempted - 1,
+        success_rate = COALESCE(CAST(solved_count - (CASE WHEN OLD.answer_is_correct = 1 THEN 1 ELSE 0 END) AS REAL) / NULLIF(total_attempted - 1, 0), 0)
+    WHERE puzzle_year = OLD.puzzle_year;
+    DELETE FROM YearRank WHERE puzzle_year = OLD.puzzle_year AND total_attempted <= 0;
+    INSERT OR IGNORE INTO YearRank (puzzle_year, solved_count, total_attempted, success_rate)
+    VALUES (NEW.puzzle_year, 0, 0, 0);
+    UPDATE YearRank SET
+        solved_count = solved_count + (CASE WHEN NEW.answer_is_correct = 1 THEN 1 ELSE 0 END),
+        total_attempted = total_attempted + 1,
+        success_rate = CAST(solved_count + (CASE WHEN NEW.answer_is_correct = 1 THEN 1 ELSE 0 END) AS REAL) / (total_attempted + 1)
+    WHERE puzzle_year = NEW.puzzle_year;
+END;
+
+-- Cells that a runner is working on, so several runners can share one database.
+-- A runner renews its leases while it works; a lease that expires can be claimed by another runner.
+CREATE TABLE IF NOT EXISTS WorkClaims (
+    model_family TEXT NOT NULL,
+    model_name TEXT NOT NULL,
+    puzzle_year INTEGER NOT NULL,
+    puzzle_day INTEGER NOT NULL,
+    puzzle_part INTEGER NOT NULL,
+    worker_id TEXT NOT NULL,
+    claimed_at TIMESTAMP NOT NULL,
+    heartbeat_at TIMESTAMP NOT NULL,
+    lease_expires_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (model_family, model_name, puzzle_year, puzzle_day, puzzle_part)
+);
+
+-- Outcomes of program runs, keyed by sha256 hashes of the program and its input, the part and
+-- the timeout and limits. See result_cache.ResultCache.
+CREATE TABLE IF NOT EXISTS ProgramResults (
+    program_hash TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    puzzle_part INTEGER NOT NULL,
+    limits TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    output TEXT,
+    run_user_seconds REAL NOT NULL,
+    run_system_seconds REAL NOT NULL,
+    run_max_rss_kb INTEGER NOT NULL,
+    PRIMARY KEY (program_hash, input_hash, puzzle_part, limits)
+);
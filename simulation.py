@@ -0,0 +1,159 @@
+import argparse
+import dataclasses
+import os
+import random
+import re
+import time
+from typing import Dict, List, Tuple
+
+import aoc_api
+import perform
+
+# Stand-ins for the model drivers, the Advent of Code site and the sandbox, for load testing
+# the runner without calling Gemini or ollama or fetching puzzles. install() swaps them into
+# aoc_api, so the runner and the database code work unchanged.
+
+@dataclasses.dataclass
+class SimulationConfig:
+    """The behaviour of the simulated models, puzzles and sandbox.
+
+    Latencies are means in seconds; each call sleeps for an exponentially distributed time
+    with that mean. Rates are probabilities per call.
+    """
+    models_per_family: int = 25
+    generate_latency: float = 0.0
+    run_latency: float = 0.0
+    generate_error_rate: float = 0.05
+    quota_error_rate: float = 0.01
+    run_error_rate: float = 0.1
+    timeout_rate: float = 0.1
+    correct_rate: float = 0.5
+    # Requests per minute allowed for each simulated Gemini model, 0 for no limit.
+    requests_per_minute: int = 0
+    seed: int = 0
+
+class SimulatedDriver:
+    """Replaces gemini_driver or ollama_driver."""
+
+    def __init__(self, family: str, config: SimulationConfig, rng: random.Random):
+        self.family = family
+        self._config = config
+        self._rng = rng
+
+    def models(self) -> List[str]:
+        return [f'sim-{self.family.lower()}-{i}' for i in range(self._config.models_per_family)]
+
+    def generate(self, model_name: str, prompt: str) -> Tuple[str, str]:
+        config = self._config
+        _sleep(self._rng, config.generate_latency)
+        roll = self._rng.random()
+        if roll < config.quota_error_rate:
+            return ('quota', '429 Resource has been exhausted (simulated)')
+        if roll < config.quota_error_rate + config.generate_error_rate:
+            return ('error', 'simulated generation error')
+        answer = _PUZZLE_RE.search(prompt).group(1)
+        if self._rng.random() >= config.correct_rate:
+            answer += '-wrong'
+        return ('success', f"print('{answer}')\n")
+
+    def rate_limits(self, model_name: str) -> Dict[str, int]:
+        if self.family == 'ollama' or not self._config.requests_per_minute:
+            return {}
+        return {'minute': self._config.requests_per_minute}
+
+    def load_seconds(self) -> Dict[str, float]:
+        return {}
+
+class SimulatedAoc:
+    """Replaces aoc. Every puzzle is available and its answer is 'year-day-part'."""
+
+    def puzzle_solved(self, puzzle_year, puzzle_day, puzzle_part):
+        return True
+
+    def puzzle_prose(self, puzzle_year, puzzle_day, puzzle_part):
+        return f"Simulated puzzle {puzzle_year}-{puzzle_day}-{puzzle_part}.\n"
+
+    def input(self, puzzle_year, puzzle_day):
+        return "1\n2\n3\n"
+
+    def check_answer(self, puzzle_year, puzzle_day, puzzle_part, answer):
+        return answer == f"{puzzle_year}-{puzzle_day}-{puzzle_part}"
+
+class SimulatedPerform:
+    """Replaces perform. Programs aren't run, their outcome is drawn at random."""
+
+    def __init__(self, config: SimulationConfig, rng: random.Random):
+        self._config = config
+        self._rng = rng
+
+    def run_measured(self, program: str, input: str, args: List[str], timeout: int) -> Tuple[str, str | None, perform.Usage]:
+        config = self._config
+        started_at = time.monotonic()
+        _sleep(self._rng, config.run_latency)
+        roll = self._rng.random()
+        if roll < config.timeout_rate:
+            return 'timeout', None, perform.Usage(timeout, 0.0, 20000)
+        usage = perform.Usage(time.monotonic() - started_at, 0.0, 20000)
+        if roll < config.timeout_rate + config.run_error_rate:
+            return 'error', 'Traceback (most recent call last):\nSimulatedError\n', usage
+        return 'success', _ANSWER_RE.search(program).group(1) + '\n', usage
+
+    def profiling(self) -> bool:
+        return False  # Simulated programs aren't run, so there's nothing to profile.
+
+    def warm_pool_running(self) -> bool:
+        return False
+
+# The simulated prompt contains the puzzle prose, and the simulated program prints the answer.
+_PUZZLE_RE = re.compile(r"Simulated puzzle (\d+-\d+-\d+)")
+_ANSWER_RE = re.compile(r"print\('([^']*)'\)")
+
+def _sleep(rng, mean):
+    if mean > 0:
+        time.sleep(rng.expovariate(1 / mean))
+
+def install(config: SimulationConfig):
+    """Replaces the drivers, aoc and perform used by aoc_api with simulated ones."""
+    rng = random.Random(config.seed)
+    aoc_api.gemini_driver = SimulatedDriver('Gemini', config, rng)
+    aoc_api.ollama_driver = SimulatedDriver('ollama', config, rng)
+    aoc_api.aoc = SimulatedAoc()
+    aoc_api.perform = SimulatedPerform(config, rng)
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Adds the --sim-* options that configure the simulation."""
+    defaults = SimulationConfig()
+    group = parser.add_argument_group("simulation", "Options for --simulate")
+    for field in dataclasses.fields(SimulationConfig):
+        group.add_argument(f"--sim-{field.name.replace('_', '-')}", dest=f"sim_{field.name}", type=field.type,
+                           default=getattr(defaults, field.name), help=f"default {getattr(defaults, field.name)}")
+
+def config_from_args(args) -> SimulationConfig:
+    return SimulationConfig(**{field.name: getattr(args, f"sim_{field.name}") for field in dataclasses.fields(SimulationConfig)})
+
+def reset_db(db_name: str):
+    """Deletes a scratch database left by an earlier simulation."""
+    for suffix in ['', '-wal', '-shm']:
+        if os.path.exists(db_name + suffix):
+            os.remove(db_name + suffix)
+
+def db_size(db_name: str) -> int:
+    return sum(os.path.getsize(db_name + suffix) for suffix in ['', '-wal'] if os.path.exists(db_name + suffix))
+
+def report(conn, db_name: str, stats) -> str:
+    """Summarises throughput, scheduler overhead and database growth of a simulated run."""
+    cursor = conn.cursor()
+    rows = {table: cursor.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ['Experiments', 'ProgramRuns', 'Blobs', 'WorkClaims']}
+    cursor.execute("SELECT COUNT(*) FROM Models")
+    model_count = cursor.fetchone()[0]
+    finished = max(stats.attempts_finished, 1)
+    size = db_size(db_name)
+    return '\n'.join([
+        f"Simulated {stats.attempts_finished} attempts with {model_count} models in {stats.elapsed_seconds:.1f} seconds: "
+        f"{stats.attempts_finished / max(stats.elapsed_seconds, 1e-9):.1f} attempts/sec",
+        f"Scheduler: {stats.scheduling_seconds:.2f} seconds in the main loop, "
+        f"{stats.scheduling_seconds / finished * 1000:.2f} ms per attempt",
+        f"Database: {size / 1e6:.1f} MB, {size / finished / 1e3:.2f} KB per attempt, "
+        + ', '.join(f"{table} {count} rows" for table, count in rows.items()),
+    ])
@@ -0,0 +1,96 @@
+import sqlite3
+import unittest
+import blobs
+
+PROMPT = "Solve this puzzle.\n" * 100
+PROGRAM = "print(42)\n"
+
+def create_db(old=False):
+    """Creates an in-memory puzzle database, with the prompt and program columns of before the Blobs table if old."""
+    conn = sqlite3.connect(':memory:')
+    blobs.register(conn)
+    with open('schema.sql', 'r') as f:
+        schema = f.read()
+    if old:
+        schema = schema.replace("prompt_hash TEXT,", "prompt TEXT,").replace("program_hash TEXT,", "program TEXT,")
+    conn.executescript(schema)
+    return conn
+
+def insert_experiment(cursor, model_name, prompt, program, old=False):
+    columns = "prompt, program" if old else "prompt_hash, program_hash"
+    values = (prompt, program) if old else (blobs.put(cursor, prompt), blobs.put(cursor, program))
+    for table, extra in [('Experiments', ''), ('ProgramRuns', ', generation')]:
+        cursor.execute(f"""
+            INSERT INTO {table} (model_family, model_name, puzzle_year, puzzle_day, puzzle_part, {columns}{extra})
+            VALUES ('Gemini', ?, 2024, 1, 1, ?, ?{', 1' if extra else ''})
+        """, (model_name, *values))
+
+class TestBlobs(unittest.TestCase):
+
+    def test_stored_once(self):
+        conn = create_db()
+        cursor = conn.cursor()
+        for model_name in ['a', 'b', 'c']:
+            insert_experiment(cursor, model_name, PROMPT, PROGRAM)
+        insert_experiment(cursor, 'd', PROMPT, None)
+        cursor.execute("SELECT COUNT(*), SUM(LENGTH(data)) FROM Blobs")
+        count, size = cursor.fetchone()
+        self.assertEqual(count, 2)
+        self.assertLess(size, len(PROMPT) / 10)
+        cursor.execute("SELECT prompt_hash, program_hash FROM Experiments WHERE model_name = 'd'")
+        prompt_hash, program_hash = cursor.fetchone()
+        self.assertEqual(blobs.text(cursor, prompt_hash), PROMPT)
+        self.assertIsNone(blobs.text(cursor, program_hash))
+        with self.assertRaises(KeyError):
+            blobs.text(cursor, blobs.blob_hash("never stored"))
+
+    def test_blob_text_in_sql(self):
+        conn = create_db()
+        insert_experiment(conn.cursor(), 'a', PROMPT, PROGRAM)
+        row = conn.execute("""
+            SELECT blob_text(data) FROM Experiments JOIN Blobs ON blob_hash = program_hash
+        """).fetchone()
+        self.assertEqual(row, (PROGRAM,))
+
+    def test_migrate(self):
+        conn = create_db(old=True)
+        cursor = conn.cursor()
+        for model_name in ['a', 'b']:
+            insert_experiment(cursor, model_name, PROMPT, PROGRAM, old=True)
+        insert_experiment(cursor, 'c', PROMPT, None, old=True)
+        conn.commit()
+        self.assertEqual(blobs.migrate(cursor), 6)
+        conn.commit()
+        for table in ['Experiments', 'ProgramRuns']:
+            cursor.execute(f"PRAGMA table_info({table})")
+            columns = [row[1] for row in cursor.fetchall()]
+            self.assertNotIn('prompt', columns)
+            self.assertNotIn('program', columns)
+            cursor.execute(f"SELECT model_name, prompt_hash, program_hash FROM {table} ORDER BY model_name")
+            texts = [(model_name, blobs.text(cursor, prompt_hash), blobs.text(cursor, program_hash))
+                     for model_name, prompt_hash, program_hash in cursor.fetchall()]
+            self.assertEqual(texts, [('a', PROMPT, PROGRAM), ('b', PROMPT, PROGRAM), ('c', PROMPT, None)])
+        self.assertEqual(blobs.migrate(cursor), 0)
+        # The rank triggers and the delete trigger still work on the rebuilt tables.
+        cursor.execute("UPDATE Experiments SET answer_is_correct = 1 WHERE model_name = 'b'")
+        insert_experiment(cursor, 'd', PROMPT, PROGRAM)
+        cursor.execute("DELETE FROM Experiments WHERE model_name = 'a'")
+        cursor.execute("SELECT model_name, solved_count, total_attempted FROM ModelRank ORDER BY model_name")
+        self.assertEqual(cursor.fetchall(), [('b', 1, 1), ('c', 0, 1), ('d', 0, 1)])
+        cursor.execute("SELECT solved_count, total_attempted FROM YearRank")
+        self.assertEqual(cursor.fetchall(), [(1, 3)])
+        cursor.execute("SELECT COUNT(*) FROM ProgramRuns WHERE model_name = 'a'")
+        self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_prune(self):
+        conn = create_db()
+        cursor = conn.cursor()
+        insert_experiment(cursor, 'a', PROMPT, PROGRAM)
+        insert_experiment(cursor, 'b', PROMPT, "print(43)\n")
+        cursor.execute("DELETE FROM Experiments WHERE model_name = 'b'")
+        self.assertEqual(blobs.prune(cursor), 1)
+        cursor.execute("SELECT COUNT(*) FROM Blobs")
+        self.assertEqual(cursor.fetchone()[0], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,22 @@
+import unittest
+from escalation import DEFAULT_POLICY, format_policy, parse_policy
+
+class TestEscalationPolicy(unittest.TestCase):
+
+    def test_default_policy(self):
+        self.assertEqual(parse_policy(DEFAULT_POLICY), [('generate', 10), ('rerun', 100), ('generate', 100)])
+
+    def test_round_trip(self):
+        steps = [('generate', 5), ('rerun', 50), ('rerun', 500)]
+        self.assertEqual(parse_policy(format_policy(steps)), steps)
+
+    def test_original_policy_regenerates(self):
+        self.assertEqual(parse_policy('generate:10, generate:100'), [('generate', 10), ('generate', 100)])
+
+    def test_invalid_policies(self):
+        for text in ['rerun:10', 'generate', 'generate:ten', 'generate:0', 'compile:10', '']:
+            with self.assertRaises(ValueError):
+                parse_policy(text)
+
+if __name__ == '__main__':
+    unittest.main()
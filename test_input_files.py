@@ -0,0 +1,51 @@
+import os
+import unittest
+import perform
+from input_files import InputFiles
+from result_cache import ResultCache
+
+INPUT = "1\n2\n3\n" * 100000
+
+class TestInputFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.files = InputFiles()
+
+    def tearDown(self):
+        self.files.close()
+
+    def test_written_once_per_key(self):
+        loads = []
+        def load():
+            loads.append(1)
+            return INPUT
+        first = self.files.get((2024, 1), load)
+        self.assertEqual(self.files.get((2024, 1), load), first)
+        self.assertEqual(len(loads), 1)
+        self.assertNotEqual(self.files.get((2024, 2), lambda: "other"), first)
+
+    def test_programs_read_stdin_unchanged(self):
+        input_file = self.files.get((2024, 1), lambda: INPUT)
+        for program in ["import sys\nprint(sum(int(line) for line in sys.stdin))",
+                        "print(len(open(0).read()))",
+                        "import sys\nprint(len(sys.stdin.buffer.read()), sys.stdin.readline() == '')"]:
+            self.assertEqual(perform.run(program, input_file, [], 5), perform.run(program, INPUT, [], 5))
+
+    def test_programs_cannot_change_the_input(self):
+        input_file = self.files.get((2024, 1), lambda: INPUT)
+        status, _ = perform.run("import os\nos.write(0, b'x')", input_file, [], 5)
+        self.assertEqual(status, 'error')
+        with open(input_file.path) as f:
+            self.assertEqual(f.read(), INPUT)
+
+    def test_same_cache_key_as_text(self):
+        input_file = self.files.get((2024, 1), lambda: INPUT)
+        self.assertEqual(ResultCache.key("print(1)", input_file, 1, 10), ResultCache.key("print(1)", INPUT, 1, 10))
+
+    def test_close_removes_the_files(self):
+        input_file = self.files.get((2024, 1), lambda: INPUT)
+        self.files.close()
+        self.assertFalse(os.path.exists(input_file.path))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,55 @@
+import os
+import tempfile
 import unittest
-from perform import run
+import time
+from perform import Limits, run, run_measured
+
+# Forks workers that sleep forever, writes their pids to the file in argv[1], then runs the
+# code in argv[2]. The workers don't hold the output pipes open, so the program ends normally.
+FORK_WORKERS = """
+import os, sys, time
+pids = []
+for _ in range(3):
+    pid = os.fork()
+    if pid == 0:
+        devnull = os.open(os.devnull, os.O_RDWR)
+        for fd in range(3):
+            os.dup2(devnull, fd)
+        while True:
+            time.sleep(1)
+    pids.append(pid)
+with open(sys.argv[1], 'w') as f:
+    f.write(' '.join(map(str, pids)))
+exec(sys.argv[2])
+"""
+
+def surviving_workers(run, then, timeout=5):
+    """Runs FORK_WORKERS and returns the workers that are still alive after it ends."""
+    with tempfile.NamedTemporaryFile('r') as pids_file:
+        status, _ = run(FORK_WORKERS, '', [pids_file.name, then], timeout)
+        pids = [int(pid) for pid in pids_file.read().split()]
+    assert len(pids) == 3, status
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline:
+        alive = [pid for pid in pids if _is_alive(pid)]
+        if not alive:
+            break
+        time.sleep(0.05)
+    return status, alive
+
+def _is_alive(pid):
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            # Killed workers are reparented and may stay zombies until init reaps them.
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+    except OSError:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        return True
 
 class TestPerform(unittest.TestCase):
 
@@ -38,5 +88,55 @@ class TestPerform(unittest.TestCase):
         self.assertEqual(status, 'success')
         self.assertEqual(output.strip(), 'abc')
 
+    def test_timeout_is_cpu_time(self):
+        started_at = time.monotonic()
+        status, output, usage = run_measured("while True:\n    pass", '', [], 1)
+        self.assertEqual(status, 'timeout')
+        self.assertGreaterEqual(usage.cpu_seconds, 0.9)
+        self.assertLess(time.monotonic() - started_at, 2.5)
+
+    def test_usage_is_measured(self):
+        status, output, usage = run_measured("x = bytearray(200 * 1024 * 1024)\nprint(len(x))", '', [], 5)
+        self.assertEqual(status, 'success')
+        self.assertGreater(usage.max_rss_kb, 200 * 1024)
+
+    def test_memory_limit(self):
+        status, error, usage = run_measured("x = bytearray(1024 ** 3)", '', [], 5, Limits(memory_bytes=512 * 1024 ** 2))
+        self.assertEqual(status, 'error')
+        self.assertIn('MemoryError', error)
+
+    def test_output_limit(self):
+        started_at = time.monotonic()
+        status, message = run("while True:\n    print('spam')", '', [], 10)
+        self.assertEqual(status, 'output_limit')
+        self.assertIn('stdout', message)
+        self.assertLess(time.monotonic() - started_at, 5)
+
+    def test_only_end_of_stderr_is_kept(self):
+        status, error = run("import sys\nsys.stderr.write('noise\\n' * 100000)\n1 / 0", '', [], 5)
+        self.assertEqual(status, 'error')
+        self.assertIn('ZeroDivisionError', error)
+        self.assertLess(len(error), 5000)
+
+    def test_stderr_limit(self):
+        status, message = run("import sys\nwhile True:\n    sys.stderr.write('spam\\n')", '', [], 10)
+        self.assertEqual(status, 'output_limit')
+        self.assertIn('stderr', message)
+
+    def test_workers_are_killed_on_timeout(self):
+        status, alive = surviving_workers(run, "while True:\n    pass", 1)
+        self.assertEqual(status, 'timeout')
+        self.assertEqual(alive, [])
+
+    def test_workers_are_killed_when_program_exits(self):
+        status, alive = surviving_workers(run, "print('done')")
+        self.assertEqual(status, 'success')
+        self.assertEqual(alive, [])
+
+    def test_workers_are_killed_on_error(self):
+        status, alive = surviving_workers(run, "1 / 0")
+        self.assertEqual(status, 'error')
+        self.assertEqual(alive, [])
+
 if __name__ == '__main__':
     unittest.main()
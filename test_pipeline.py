@@ -0,0 +1,41 @@
+import unittest
+from pipeline import Pipeline
+
+class TestPipeline(unittest.TestCase):
+
+    def test_items_flow_through_stages(self):
+        def double(item):
+            item['value'] *= 2
+            return 'add'
+        def add(item):
+            item['value'] += 1
+            return None
+        pipeline = Pipeline([('double', double, 2, 0), ('add', add, 1, 1)])
+        futures = [pipeline.submit({'value': i}) for i in range(20)]
+        self.assertEqual([f.result(timeout=5)['value'] for f in futures], [i * 2 + 1 for i in range(20)])
+        stats = {s['stage']: s for s in pipeline.stats()}
+        self.assertEqual(stats['double']['processed'], 20)
+        self.assertEqual(stats['add']['processed'], 20)
+        self.assertEqual(stats['add']['queue_depth'], 0)
+        pipeline.close()
+
+    def test_items_can_loop_back(self):
+        def first(item):
+            item['visits'] += 1
+            return 'second'
+        def second(item):
+            return 'first' if item['visits'] < 3 else None
+        pipeline = Pipeline([('first', first, 1, 0), ('second', second, 1, 1)])
+        self.assertEqual(pipeline.submit({'visits': 0}).result(timeout=5)['visits'], 3)
+        pipeline.close()
+
+    def test_stage_exception_fails_the_item(self):
+        def fail(item):
+            raise ValueError('boom')
+        pipeline = Pipeline([('fail', fail, 1, 0)])
+        with self.assertRaises(ValueError):
+            pipeline.submit({}).result(timeout=5)
+        pipeline.close()
+
+if __name__ == '__main__':
+    unittest.main()
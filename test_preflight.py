@@ -0,0 +1,46 @@
+import unittest
+from perform import run
+from preflight import Preflight, check_program
+
+class TestPreflight(unittest.TestCase):
+
+    def assertSameErrorAsRun(self, program, reason):
+        problem = check_program(program)
+        self.assertEqual(problem[0], reason)
+        status, error = run(program, '', [], 5)
+        self.assertEqual(status, 'error')
+        # Only the exception, the traceback above it differs between Python versions.
+        self.assertEqual(problem[1].strip().splitlines()[-1], error.strip().splitlines()[-1])
+
+    def test_syntax_error(self):
+        self.assertSameErrorAsRun("def solve(:\n    pass", 'syntax')
+
+    def test_prose(self):
+        self.assertSameErrorAsRun("Here is the solution to the puzzle:\n\nIt counts the lines.", 'syntax')
+
+    def test_missing_module(self):
+        self.assertSameErrorAsRun("import sys\nimport no_such_module_here\nprint(1)", 'missing_module')
+        self.assertSameErrorAsRun("from no_such_module_here.sub import thing\nprint(1)", 'missing_module')
+
+    def test_guarded_imports_are_allowed(self):
+        self.assertIsNone(check_program("try:\n    import no_such_module_here\nexcept ImportError:\n    pass\nprint(1)"))
+        self.assertIsNone(check_program("def solve():\n    import no_such_module_here\nprint(1)"))
+
+    def test_program_without_calls(self):
+        self.assertEqual(check_program("42")[0], 'no_calls')
+        self.assertEqual(check_program("'The answer is in the code above.'")[0], 'no_calls')
+
+    def test_runnable_program(self):
+        self.assertIsNone(check_program("import sys\nfrom collections import Counter\nprint(Counter(sys.stdin.read()))"))
+
+    def test_counts_rejections(self):
+        preflight = Preflight()
+        self.assertIsNone(preflight.check("print(1)"))
+        self.assertIn('SyntaxError', preflight.check("print(1"))
+        self.assertIn('ModuleNotFoundError', preflight.check("import no_such_module_here"))
+        self.assertEqual(preflight.checked, 3)
+        self.assertEqual(dict(preflight.rejected), {'syntax': 1, 'missing_module': 1})
+        self.assertIn('rejected 2', preflight.format_stats())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import perform
+from profiler import summarize
+
+SLOW = """
+def unique(n):
+    seen = []
+    for i in range(n):
+        if i not in seen:
+            seen.append(i)
+    return len(seen)
+
+print(unique(1000))
+while True:
+    unique(3000)
+"""
+
+class TestProfiler(unittest.TestCase):
+
+    def test_summarize(self):
+        samples = b"<module>:9;unique:4\n<module>:9;unique:4\n<module>:9;unique:6\n<module>:10\n<startup>\n<module>:9;uni"
+        profile = summarize(samples, 2)
+        self.assertEqual(profile['samples'], 5)
+        self.assertEqual(profile['functions'], [{'function': '<module>', 'samples': 4}, {'function': 'unique', 'samples': 3}])
+        self.assertEqual(profile['lines'], [{'function': 'unique', 'line': 4, 'samples': 2},
+                                            {'function': 'unique', 'line': 6, 'samples': 1}])
+
+    def test_timed_out_program_keeps_its_profile(self):
+        perform.start_profiling(5)
+        try:
+            status, _, usage = perform.run_measured(SLOW, '', [], 1)
+        finally:
+            perform.stop_profiling()
+        self.assertEqual(status, 'timeout')
+        self.assertGreater(usage.profile['samples'], 50)
+        self.assertEqual(usage.profile['lines'][0]['function'], 'unique')
+
+    def test_profiling_does_not_change_the_outcome(self):
+        perform.start_profiling(5)
+        try:
+            profiled = perform.run("import sys\nprint(sys.argv[1:])\nprint(sum(range(10 ** 6)))", '', ['a'], 5)
+            error = perform.run("1 / 0", '', [], 5)
+        finally:
+            perform.stop_profiling()
+        self.assertEqual(profiled, ('success', "['a']\n499999500000\n"))
+        self.assertEqual(error, perform.run("1 / 0", '', [], 5))
+
+    def test_not_profiled_by_default(self):
+        _, _, usage = perform.run_measured("print(1)", '', [], 5)
+        self.assertIsNone(usage.profile)
+
+if __name__ == '__main__':
+    unittest.main()
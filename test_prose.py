@@ -0,0 +1,64 @@
+import unittest
+from bs4 import BeautifulSoup
+import prose
+
+# A puzzle page like the ones aocd caches, with both parts shown and the parts that trip up a
+# simple scanner: comments, scripts, entities and nested articles.
+PAGE = """<!DOCTYPE html>
+<html lang="en-us">
+<head>
+<meta charset="utf-8"/>
+<title>Day 1 - Advent of Code 2024</title>
+<link rel="stylesheet" type="text/css" href="/static/style.css?31"/>
+<style>body { color: red; }</style>
+<script>window.addEventListener('click', function(e,s,t){if(e.target.nodeName==='CODE' && e.detail===3){s=window.getSelection();s.removeAllRanges();t=document.createRange();t.selectNodeContents(e.target);s.addRange(t);}});</script>
+</head><!--
+Oh, hello!  Funny seeing you here. <article class="day-desc">not this</article>
+-->
+<body>
+<header><div><h1 class="title-global"><a href="/">Advent of Code</a></h1><nav><ul><li><a href="/2024/about">[About]</a></li></ul></nav></div></header>
+<main>
+<article class="day-desc"><h2>--- Day 1: Historian Hysteria ---</h2><p>The <em>Chief Historian</em> is always present &amp; accounted for &lt;here&gt; &quot;quoted&quot; &#8212; &eacute;t&eacute; &#x27;s.</p>
+<pre><code>3   4
+4   3
+</code></pre>
+<p>Total: <code><em>11</em></code>.<br/>Done &hellip;</p>
+<article>nested <b>one</b></article> after nested
+</article>
+<p>Your puzzle answer was <code>1234</code>.</p><article class="day-desc wide"><h2 id="part2">--- Part Two ---</h2><p>Similarity <span title="x &gt; y">score</span>.</p><script>ignored()</script></article>
+<p>Both parts of this puzzle are complete!</p>
+<!-- comment --><script>(function(i,s,o,g,r,a,m){i['GoogleAnalyticsObject']=r;})</script>
+</main>
+</body>
+</html>
+"""
+
+def beautiful_soup_prose(page, puzzle_part):
+    """How aoc.puzzle_prose extracted the prose before prose.extract."""
+    soup = BeautifulSoup(page, features="html.parser")
+    articles = [article.text for article in soup.find_all('article', class_='day-desc')]
+    if not articles:
+        return soup.text
+    if puzzle_part == 1:
+        return articles[0]
+    return '\n'.join(articles)
+
+class TestProse(unittest.TestCase):
+
+    def test_same_as_beautiful_soup(self):
+        pages = [PAGE, PAGE.replace('day-desc', 'other'), '', 'plain &amp; text',
+                 '<article class=day-desc>unclosed <p>paragraph']
+        for page in pages:
+            for puzzle_part in [1, 2]:
+                with self.subTest(page=page[:40], puzzle_part=puzzle_part):
+                    self.assertEqual(prose.extract(page, puzzle_part), beautiful_soup_prose(page, puzzle_part))
+
+    def test_parts(self):
+        part_1 = prose.extract(PAGE, 1)
+        self.assertTrue(part_1.startswith('--- Day 1: Historian Hysteria ---'))
+        self.assertIn('present & accounted for <here>', part_1)
+        self.assertNotIn('not this', part_1)
+        self.assertEqual(prose.extract(PAGE, 2), part_1 + '\n--- Part Two ---Similarity score.')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from puzzle_fixtures import PuzzleFixtures, write_fixtures
+from test_puzzle_store import FakeSite
+
+class TestPuzzleFixtures(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.site = FakeSite()
+        self.site.answers[2024, 1, 2] = '31'
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def check_fixtures(self, path):
+        self.assertEqual(write_fixtures(self.site, path, [2024], [1, 2]), [])
+        fixtures = PuzzleFixtures(path)
+        self.assertEqual(fixtures.input(2024, 1), "input of 1\n")
+        self.assertEqual(fixtures.puzzle_prose(2024, 1, 2), "Part 1 of 1\nPart 2 of 1")
+        self.assertEqual(fixtures.answer(2024, 1, 1), '11')
+        self.assertTrue(fixtures.puzzle_solved(2024, 1, 2))
+        self.assertFalse(fixtures.puzzle_solved(2024, 2, 1))
+        self.assertTrue(fixtures.check_answer(2024, 1, 2, '31 '))
+        self.assertFalse(fixtures.check_answer(2024, 1, 2, '30'))
+        self.assertFalse(fixtures.check_answer(2024, 2, 1, '30'))
+        self.assertEqual(fixtures.verify_many([(2024, 1, 1, 11), (2024, 2, 1, '7')]), [True, None])
+        with self.assertRaises(FileNotFoundError):
+            fixtures.puzzle_prose(2024, 2, 2)  # Not shown before part 1 is solved.
+        with self.assertRaises(FileNotFoundError):
+            fixtures.input(2024, 3)
+
+    def test_directory(self):
+        self.check_fixtures(os.path.join(self.dir.name, 'fixtures'))
+
+    def test_zip(self):
+        self.check_fixtures(os.path.join(self.dir.name, 'fixtures.zip'))
+
+    def test_files_are_read_once(self):
+        path = os.path.join(self.dir.name, 'fixtures')
+        write_fixtures(self.site, path, [2024], [1])
+        fixtures = PuzzleFixtures(path)
+        fixtures.input(2024, 1)
+        os.remove(os.path.join(path, '2024', '1', 'input.txt'))
+        self.assertEqual(fixtures.input(2024, 1), "input of 1\n")
+
+    def test_missing(self):
+        with self.assertRaises(ValueError):
+            PuzzleFixtures(os.path.join(self.dir.name, 'missing'))
+
+    def test_api_without_aocd(self):
+        path = os.path.join(self.dir.name, 'fixtures')
+        write_fixtures(self.site, path, [2024], [1])
+        code = "\n".join([
+            "import sys",
+            "sys.modules['aocd'] = None",  # Any import of aocd fails.
+            "import aoc_api",
+            "print(aoc_api.verify_answers([(2024, 1, 1, '11')]), 'aoc' in sys.modules)",
+        ])
+        env = dict(os.environ, AOC_FIXTURES=path, PYTHON_KEYRING_BACKEND='keyring.backends.null.Keyring')
+        result = subprocess.run([sys.executable, '-W', 'ignore', '-c', code], env=env, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout, "[True] False\n")
+
+if __name__ == '__main__':
+    unittest.main()
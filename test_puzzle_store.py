@@ -0,0 +1,111 @@
+import collections
+import os
+import tempfile
+import unittest
+from puzzle_store import PuzzleStore, parse_range
+
+class FakeSite:
+    """Stands in for aoc.py and counts the calls made to it."""
+
+    def __init__(self):
+        self.calls = collections.Counter()
+        self.answers = {(2024, 1, 1): '11'}
+
+    def puzzle_solved(self, puzzle_year, puzzle_day, puzzle_part):
+        self.calls['puzzle_solved'] += 1
+        return (puzzle_year, puzzle_day, puzzle_part) in self.answers
+
+    def answer(self, puzzle_year, puzzle_day, puzzle_part):
+        self.calls['answer'] += 1
+        return self.answers.get((puzzle_year, puzzle_day, puzzle_part))
+
+    def puzzle_prose(self, puzzle_year, puzzle_day, puzzle_part):
+        self.calls['puzzle_prose'] += 1
+        solved = (puzzle_year, puzzle_day, 1) in self.answers
+        return f"Part 1 of {puzzle_day}" + (f"\nPart 2 of {puzzle_day}" if puzzle_part == 2 and solved else '')
+
+    def input(self, puzzle_year, puzzle_day):
+        self.calls['input'] += 1
+        return f"input of {puzzle_day}\n"
+
+    def check_answer(self, puzzle_year, puzzle_day, puzzle_part, answer):
+        self.calls['check_answer'] += 1
+        if answer == '29':
+            return None  # Submitted too recently, say.
+        return answer == '31'
+
+class TestPuzzleStore(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'store.db')
+        self.site = FakeSite()
+        self.store = PuzzleStore(self.site, self.path)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_served_from_memory_after_first_call(self):
+        for _ in range(3):
+            self.assertEqual(self.store.input(2024, 1), "input of 1\n")
+            self.assertEqual(self.store.puzzle_prose(2024, 1, 1), "Part 1 of 1")
+            self.assertTrue(self.store.puzzle_solved(2024, 1, 1))
+        self.assertEqual(self.site.calls, {'input': 1, 'puzzle_prose': 1, 'answer': 1})
+
+    def test_survives_restart(self):
+        self.store.input(2024, 1)
+        self.store.puzzle_prose(2024, 1, 2)
+        restarted = PuzzleStore(FakeSite(), self.path)
+        self.assertEqual(restarted.input(2024, 1), "input of 1\n")
+        self.assertEqual(restarted.puzzle_prose(2024, 1, 2), "Part 1 of 1\nPart 2 of 1")
+        self.assertEqual(restarted.answer(2024, 1, 1), '11')
+        self.assertEqual(restarted.source.calls, {})
+
+    def test_part_2_prose_is_not_stored_before_part_1_is_solved(self):
+        self.assertEqual(self.store.puzzle_prose(2024, 2, 2), "Part 1 of 2")
+        self.site.answers[2024, 2, 1] = '7'
+        self.assertEqual(self.store.puzzle_prose(2024, 2, 2), "Part 1 of 2\nPart 2 of 2")
+
+    def test_correct_answer_is_stored(self):
+        self.assertFalse(self.store.puzzle_solved(2024, 1, 2))
+        self.assertFalse(self.store.check_answer(2024, 1, 2, '30'))
+        self.assertTrue(self.store.check_answer(2024, 1, 2, '31'))
+        self.assertEqual(self.store.answer(2024, 1, 2), '31')
+
+    def test_known_answers_are_checked_locally(self):
+        self.assertTrue(self.store.check_answer(2024, 1, 1, ' 11\n'))
+        self.assertFalse(self.store.check_answer(2024, 1, 1, '12'))
+        self.assertFalse(self.store.check_answer(2024, 1, 2, '30'))
+        self.assertFalse(self.store.check_answer(2024, 1, 2, '30 '))
+        self.assertEqual(self.site.calls['check_answer'], 1)
+
+    def test_answer_without_verdict_is_not_remembered(self):
+        self.assertFalse(self.store.check_answer(2024, 1, 2, '29'))
+        self.assertIsNone(self.store.verify(2024, 1, 2, '29'))
+        self.assertFalse(self.store.check_answer(2024, 1, 2, '29'))
+        self.assertEqual(self.site.calls['check_answer'], 2)
+        self.assertIsNone(PuzzleStore(FakeSite(), self.path).verify(2024, 1, 2, '29'))
+
+    def test_verify_many(self):
+        self.store.check_answer(2024, 1, 1, '11')
+        self.store.check_answer(2024, 1, 2, '30')
+        restarted = PuzzleStore(FakeSite(), self.path)
+        answers = [(2024, 1, 1, '11'), (2024, 1, 1, 11), (2024, 1, 2, '30'), (2024, 1, 2, '31')]
+        self.assertEqual(restarted.verify_many(answers), [True, True, False, None])
+        self.assertEqual(restarted.verify_many(answers * 1000).count(None), 1000)
+        self.assertEqual(restarted.source.calls, {})
+
+    def test_prefetch(self):
+        self.assertEqual(self.store.prefetch([2024], parse_range('1-3')), [])
+        calls = dict(self.site.calls)
+        self.store.prefetch([2024], parse_range('1-3'))
+        self.assertEqual(self.site.calls['input'], 3)
+        self.assertEqual(self.site.calls['puzzle_prose'], calls['puzzle_prose'])
+        self.assertEqual(PuzzleStore(FakeSite(), self.path).puzzle_prose(2024, 1, 2), "Part 1 of 1\nPart 2 of 1")
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('2015-2024'), range(2015, 2025))
+        self.assertEqual(parse_range('2020'), range(2020, 2021))
+
+if __name__ == '__main__':
+    unittest.main()
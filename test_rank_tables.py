@@ -0,0 +1,76 @@
+import random
+import sqlite3
+import unittest
+from rank_tables import rebuild_ranking_tables
+
+MODELS = [('Gemini', 'gemini-a'), ('Gemini', 'gemini-b'), ('ollama', 'ollama-a')]
+
+def rank_tables(cursor):
+    tables = {}
+    for table, key in [('ModelRank', 'model_family, model_name'), ('ModelFamilyRank', 'model_family'), ('YearRank', 'puzzle_year')]:
+        cursor.execute(f"SELECT * FROM {table} ORDER BY {key}")
+        tables[table] = [tuple(round(v, 9) if isinstance(v, float) else v for v in row) for row in cursor.fetchall()]
+    return tables
+
+class TestRankTables(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        with open('schema.sql', 'r') as f:
+            self.conn.executescript(f.read())
+        self.cursor = self.conn.cursor()
+
+    def assertMatchesRebuild(self):
+        incremental = rank_tables(self.cursor)
+        rebuild_ranking_tables(self.conn)
+        self.assertEqual(incremental, rank_tables(self.cursor))
+
+    def insert(self, rng, part=1):
+        family, model = rng.choice(MODELS)
+        self.cursor.execute("""
+            INSERT OR IGNORE INTO Experiments (model_family, model_name, puzzle_year, puzzle_day, puzzle_part, experiment_started_at)
+            VALUES (?, ?, ?, ?, ?, '2024-12-01')
+        """, (family, model, rng.randint(2015, 2024), rng.randint(1, 25), part))
+
+    def test_incremental_matches_rebuild(self):
+        rng = random.Random(0)
+        for step in range(1000):
+            action = rng.random()
+            if action < 0.5:
+                # A new attempt starts with no answer yet, like the runner's INSERT
+                self.insert(rng, part=rng.choice([1, 2]))
+            elif action < 0.85:
+                self.cursor.execute("""
+                    UPDATE Experiments SET run_status = 'answer', answer_is_correct = ?
+                    WHERE experiment_id = (SELECT experiment_id FROM Experiments ORDER BY RANDOM() LIMIT 1)
+                """, (rng.random() < 0.5,))
+            elif action < 0.95:
+                self.cursor.execute("""
+                    UPDATE Experiments SET run_status = 'timeout', run_timeout_seconds = 10
+                    WHERE experiment_id = (SELECT experiment_id FROM Experiments ORDER BY RANDOM() LIMIT 1)
+                """)
+            else:
+                self.cursor.execute("DELETE FROM Experiments WHERE experiment_id = (SELECT experiment_id FROM Experiments ORDER BY RANDOM() LIMIT 1)")
+            if step % 100 == 0:
+                self.assertMatchesRebuild()
+        self.assertMatchesRebuild()
+
+    def test_deleting_all_experiments_empties_ranks(self):
+        rng = random.Random(1)
+        for _ in range(20):
+            self.insert(rng)
+        self.cursor.execute("UPDATE Experiments SET answer_is_correct = 1")
+        self.cursor.execute("DELETE FROM Experiments")
+        for rows in rank_tables(self.cursor).values():
+            self.assertEqual(rows, [])
+
+    def test_moving_experiment_to_another_year(self):
+        rng = random.Random(2)
+        for _ in range(20):
+            self.insert(rng)
+        self.cursor.execute("UPDATE Experiments SET answer_is_correct = 1 WHERE experiment_id % 2 = 0")
+        self.cursor.execute("UPDATE Experiments SET puzzle_year = 2030 WHERE experiment_id % 3 = 0")
+        self.assertMatchesRebuild()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import sqlite3
+import unittest
+from rate_limiter import RateLimiter
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+class TestRateLimiter(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = RateLimiter({'fast': {'minute': 2, 'day': 3}, 'local': {}}, clock=self.clock)
+
+    def test_minute_bucket_limits_burst(self):
+        self.limiter.acquire('fast')
+        self.limiter.acquire('fast')
+        self.assertFalse(self.limiter.available('fast'))
+        self.assertAlmostEqual(self.limiter.wait_time('fast'), 30)
+        self.clock.now += 30
+        self.assertTrue(self.limiter.available('fast'))
+
+    def test_day_bucket_limits_total(self):
+        for _ in range(3):
+            self.clock.now += 60
+            self.limiter.acquire('fast')
+        self.clock.now += 60
+        self.assertFalse(self.limiter.available('fast'))
+        self.assertGreater(self.limiter.wait_time('fast'), 3600)
+
+    def test_models_without_limits_are_always_available(self):
+        for _ in range(100):
+            self.limiter.acquire('local')
+        self.assertTrue(self.limiter.available('local'))
+        self.assertIsNone(self.limiter.next_available_time(['local', 'fast']))
+
+    def test_exhausted_drains_all_buckets(self):
+        self.limiter.exhausted('fast')
+        self.assertFalse(self.limiter.available('fast'))
+        self.assertIsNotNone(self.limiter.next_available_time(['fast']))
+
+    def test_budget_survives_restart(self):
+        conn = sqlite3.connect(':memory:')
+        with open('schema.sql', 'r') as f:
+            conn.executescript(f.read())
+        self.limiter.acquire('fast')
+        self.limiter.acquire('fast')
+        self.limiter.save(conn)
+        conn.commit()
+
+        restarted = RateLimiter({'fast': {'minute': 2, 'day': 3}, 'local': {}}, clock=self.clock)
+        restarted.load(conn.cursor())
+        self.assertFalse(restarted.available('fast'))
+        self.clock.now += 30
+        self.assertTrue(restarted.available('fast'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import sqlite3
+import unittest
+from perform import Limits, Usage
+from result_cache import ResultCache
+
+PROGRAM = "print(sum(map(int, open(0))))"
+INPUT = "1\n2\n3\n"
+RESULT = ('success', '6\n', Usage(0.5, 0.1, 12000))
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ResultCache()
+
+    def test_hit_after_put(self):
+        key = ResultCache.key(PROGRAM, INPUT, 1, 10)
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, RESULT)
+        self.assertEqual(self.cache.get(key), RESULT)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertAlmostEqual(self.cache.cpu_seconds_saved, 0.6)
+
+    def test_key_covers_program_input_part_and_limits(self):
+        key = ResultCache.key(PROGRAM, INPUT, 1, 10)
+        self.assertEqual(key, ResultCache.key(PROGRAM, INPUT, 1, 10, Limits()))
+        others = [
+            ResultCache.key(PROGRAM + "\n", INPUT, 1, 10),
+            ResultCache.key(PROGRAM, INPUT + "4\n", 1, 10),
+            ResultCache.key(PROGRAM, INPUT, 2, 10),
+            ResultCache.key(PROGRAM, INPUT, 1, 100),
+            ResultCache.key(PROGRAM, INPUT, 1, 10, Limits(memory_bytes=1024 ** 3)),
+            ResultCache.key(PROGRAM, INPUT, 1, 10, warm=True),
+        ]
+        self.assertNotIn(key, others)
+
+    def test_runs_that_did_not_start_are_not_cached(self):
+        key = ResultCache.key(PROGRAM, INPUT, 1, 10)
+        self.cache.put(key, ('error', 'Too many open files', None))
+        self.assertIsNone(self.cache.get(key))
+
+    def test_only_cpu_timeouts_are_cached(self):
+        key = ResultCache.key(PROGRAM, INPUT, 1, 10)
+        self.cache.put(key, ('timeout', None, Usage(2.5, 0.1, 12000)))
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, ('timeout', None, Usage(10.0, 0.2, 12000)))
+        self.assertEqual(self.cache.get(key), ('timeout', None, Usage(10.0, 0.2, 12000)))
+
+    def test_results_survive_restart(self):
+        conn = sqlite3.connect(':memory:')
+        with open('schema.sql', 'r') as f:
+            conn.executescript(f.read())
+        key = ResultCache.key(PROGRAM, INPUT, 1, 10)
+        self.cache.put(key, RESULT)
+        self.cache.save(conn)
+        # Saving again doesn't write the same result twice.
+        self.cache.save(conn)
+        conn.commit()
+
+        restarted = ResultCache()
+        restarted.load(conn.cursor())
+        self.assertEqual(restarted.get(key), RESULT)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import os
+import time
+import unittest
+from sandbox_pool import SandboxPool
+
+class TestSandboxPool(unittest.TestCase):
+
+    def test_futures_resolve_to_results(self):
+        pool = SandboxPool(max_jobs=2, pin=False)
+        futures = [pool.submit(f"print({i} * 2)", '', [], 5) for i in range(4)]
+        self.assertEqual([future.result()[:2] for future in futures], [('success', f"{i * 2}\n") for i in range(4)])
+        pool.shutdown()
+
+    def test_concurrency_cap(self):
+        pool = SandboxPool(max_jobs=2, pin=False)
+        started_at = time.monotonic()
+        futures = [pool.submit("import time\ntime.sleep(0.5)", '', [], 5) for _ in range(4)]
+        for future in futures:
+            self.assertEqual(future.result()[0], 'success')
+        self.assertGreaterEqual(time.monotonic() - started_at, 1.0)
+        pool.shutdown()
+
+    @unittest.skipUnless(hasattr(os, 'sched_setaffinity'), "needs sched_setaffinity")
+    def test_jobs_are_pinned(self):
+        cores = sorted(os.sched_getaffinity(0))
+        pool = SandboxPool()
+        futures = [pool.submit("import os\nprint(sorted(os.sched_getaffinity(0)))", '', [], 5) for _ in cores]
+        pinned = [eval(future.result()[1]) for future in futures]
+        self.assertTrue(all(len(p) == 1 and p[0] in cores for p in pinned))
+        pool.shutdown()
+
+    def test_too_many_pinned_jobs(self):
+        with self.assertRaises(ValueError):
+            SandboxPool(max_jobs=2, cores=[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+import random
+import sqlite3
+import unittest
+from scheduler import ModelAffinity, WorkFrontier, get_next_puzzle_to_solve, pending_cells_sql
+
+MODELS = [('Gemini', 'gemini-a'), ('Gemini', 'gemini-b'), ('ollama', 'ollama-a')]
+
+def create_synthetic_db(seed, experiment_count):
+    """Creates an in-memory puzzle database filled with random experiment results."""
+    conn = sqlite3.connect(':memory:')
+    cursor = conn.cursor()
+    with open('schema.sql', 'r') as f:
+        cursor.executescript(f.read())
+    for family, model in MODELS:
+        cursor.execute("INSERT OR IGNORE INTO ModelFamilies (model_family) VALUES (?)", (family,))
+        cursor.execute("INSERT INTO Models (model_name, model_family) VALUES (?, ?)", (model, family))
+
+    rng = random.Random(seed)
+    for _ in range(experiment_count):
+        family, model = rng.choice(MODELS)
+        year, day = rng.randint(2015, 2024), rng.randint(1, 25)
+        insert_experiment(cursor, (year, day, 1, family, model), rng.random() < 0.6)
+        if day != 25 and rng.random() < 0.5:
+            cursor.execute("""
+                SELECT answer_is_correct FROM Experiments
+                WHERE model_family = ? AND model_name = ? AND puzzle_year = ? AND puzzle_day = ? AND puzzle_part = 1
+            """, (family, model, year, day))
+            if cursor.fetchone()[0] == 1:
+                insert_experiment(cursor, (year, day, 2, family, model), rng.random() < 0.4)
+    conn.commit()
+    return conn
+
+def insert_experiment(cursor, cell, is_correct):
+    year, day, part, family, model = cell
+    cursor.execute("""
+        INSERT OR IGNORE INTO Experiments (
+            model_family, model_name, puzzle_year, puzzle_day, puzzle_part, run_status, answer, answer_is_correct
+        ) VALUES (?, ?, ?, ?, ?, 'answer', '42', ?)
+    """, (family, model, year, day, part, is_correct))
+
+class TestWorkFrontier(unittest.TestCase):
+
+    def assertMatchesSql(self, frontier, cursor):
+        missing, extra = frontier.verify_against_sql(cursor)
+        self.assertEqual(missing, set())
+        self.assertEqual(extra, set())
+
+    def test_empty_database(self):
+        conn = create_synthetic_db(seed=0, experiment_count=0)
+        frontier = WorkFrontier(conn.cursor())
+        self.assertEqual(len(frontier.pending_cells()), len(MODELS) * 10 * 25)
+        self.assertMatchesSql(frontier, conn.cursor())
+
+    def test_initial_frontier_matches_sql(self):
+        for seed in range(5):
+            conn = create_synthetic_db(seed=seed, experiment_count=500)
+            self.assertMatchesSql(WorkFrontier(conn.cursor()), conn.cursor())
+
+    def test_incremental_updates_match_sql(self):
+        conn = create_synthetic_db(seed=1, experiment_count=200)
+        cursor = conn.cursor()
+        frontier = WorkFrontier(cursor)
+        rng = random.Random(1)
+        for step in range(300):
+            cell = frontier.next_puzzle()
+            insert_experiment(cursor, cell, rng.random() < 0.5)
+            frontier.refresh_cell(cursor, cell)
+            if step % 25 == 0:
+                self.assertMatchesSql(frontier, cursor)
+        self.assertMatchesSql(frontier, cursor)
+
+    def test_part_2_unlocked_by_correct_part_1(self):
+        conn = create_synthetic_db(seed=0, experiment_count=0)
+        cursor = conn.cursor()
+        frontier = WorkFrontier(cursor)
+        part_1 = (2020, 3, 1, 'ollama', 'ollama-a')
+        part_2 = (2020, 3, 2, 'ollama', 'ollama-a')
+        self.assertNotIn(part_2, frontier.pending_cells())
+        insert_experiment(cursor, part_1, True)
+        frontier.refresh_cell(cursor, part_1)
+        self.assertIn(part_2, frontier.pending_cells())
+        self.assertNotIn(part_1, frontier.pending_cells())
+
+    def test_day_25_has_no_part_2(self):
+        conn = create_synthetic_db(seed=0, experiment_count=0)
+        cursor = conn.cursor()
+        frontier = WorkFrontier(cursor)
+        part_1 = (2020, 25, 1, 'ollama', 'ollama-a')
+        insert_experiment(cursor, part_1, True)
+        frontier.refresh_cell(cursor, part_1)
+        self.assertNotIn((2020, 25, 2, 'ollama', 'ollama-a'), frontier.pending_cells())
+
+    def test_next_puzzle_agrees_with_sql(self):
+        conn = create_synthetic_db(seed=2, experiment_count=300)
+        cursor = conn.cursor()
+        frontier = WorkFrontier(cursor)
+        pending = pending_cells_sql(cursor)
+        for timed_out in [[], ['gemini-a'], ['gemini-a', 'gemini-b'], [m for _, m in MODELS]]:
+            sql_next, sql_more = get_next_puzzle_to_solve(cursor, timed_out)
+            next_puzzle, more = frontier.next_puzzle_to_solve(timed_out)
+            self.assertEqual(more, sql_more)
+            self.assertEqual(next_puzzle is None, sql_next is None)
+            if next_puzzle is not None:
+                self.assertIn(next_puzzle, pending)
+                self.assertNotIn(next_puzzle[4], timed_out)
+
+    def test_skip_drops_cell_for_this_run(self):
+        conn = create_synthetic_db(seed=0, experiment_count=0)
+        cursor = conn.cursor()
+        frontier = WorkFrontier(cursor)
+        cell = frontier.next_puzzle()
+        frontier.refresh_cell(cursor, cell)
+        self.assertNotIn(cell, frontier.pending_cells())
+        self.assertTrue(frontier.more_puzzles_available())
+
+class TestModelAffinity(unittest.TestCase):
+
+    def setUp(self):
+        conn = create_synthetic_db(seed=0, experiment_count=0)
+        self.frontier = WorkFrontier(conn.cursor())
+
+    def run_attempts(self, affinity, count):
+        models = []
+        for _ in range(count):
+            cell = self.frontier.next_puzzle(affinity.excluded_models(self.frontier, []))
+            affinity.started(cell[3], cell[4])
+            self.frontier.record_attempt(cell, False)
+            models.append(cell[4])
+        return models
+
+    def test_batches_alternate_between_models(self):
+        affinity = ModelAffinity({'Gemini': ['gemini-a', 'gemini-b']}, batch_size=10)
+        models = self.run_attempts(affinity, 35)
+        self.assertEqual(models, ['gemini-a'] * 10 + ['gemini-b'] * 10 + ['gemini-a'] * 10 + ['gemini-b'] * 5)
+        self.assertEqual(affinity.switches, {'Gemini': 3})
+
+    def test_stays_on_model_until_it_is_done(self):
+        affinity = ModelAffinity({'Gemini': ['gemini-a', 'gemini-b']})
+        models = self.run_attempts(affinity, 260)
+        self.assertEqual(models, ['gemini-a'] * 250 + ['gemini-b'] * 10)
+        self.assertEqual(affinity.switches, {'Gemini': 1})
+
+    def test_no_switch_while_model_is_running(self):
+        affinity = ModelAffinity({'Gemini': ['gemini-a', 'gemini-b']}, batch_size=1)
+        affinity.started('Gemini', 'gemini-a')
+        self.assertEqual(affinity.excluded_models(self.frontier, ['gemini-a']), {'gemini-b'})
+        self.assertEqual(affinity.excluded_models(self.frontier, []), {'gemini-a'})
+
+    def test_other_families_are_not_batched(self):
+        affinity = ModelAffinity({'Gemini': ['gemini-a', 'gemini-b']}, batch_size=10)
+        affinity.started('ollama', 'ollama-a')
+        self.assertEqual(affinity.excluded_models(self.frontier, ['ollama-a']), set())
+
+if __name__ == '__main__':
+    unittest.main()
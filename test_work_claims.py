@@ -0,0 +1,64 @@
+import datetime
+import os
+import sqlite3
+import tempfile
+import unittest
+from work_claims import claim_cell, release_cell, renew_leases
+
+CELL = (2024, 5, 1, 'Gemini', 'gemini-a')
+
+class TestWorkClaims(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        db_name = os.path.join(self.tmp.name, 'puzzle.db')
+        with open('schema.sql', 'r') as f:
+            schema = f.read()
+        # Two connections stand in for two runner processes.
+        self.worker_a = sqlite3.connect(db_name)
+        self.worker_a.executescript(schema)
+        self.worker_b = sqlite3.connect(db_name)
+
+    def tearDown(self):
+        self.worker_a.close()
+        self.worker_b.close()
+        self.tmp.cleanup()
+
+    def test_only_one_worker_claims_a_cell(self):
+        self.assertEqual(claim_cell(self.worker_a, CELL, 'a', 300), ('claimed', None))
+        status, lease_expires_at = claim_cell(self.worker_b, CELL, 'b', 300)
+        self.assertEqual(status, 'held')
+        self.assertGreater(lease_expires_at, datetime.datetime.now())
+
+    def test_worker_can_reclaim_its_own_cell(self):
+        self.assertEqual(claim_cell(self.worker_a, CELL, 'a', 300)[0], 'claimed')
+        self.assertEqual(claim_cell(self.worker_a, CELL, 'a', 300)[0], 'claimed')
+
+    def test_expired_lease_is_reclaimed(self):
+        self.assertEqual(claim_cell(self.worker_a, CELL, 'a', -1)[0], 'claimed')
+        self.assertEqual(claim_cell(self.worker_b, CELL, 'b', 300)[0], 'claimed')
+        self.assertEqual(claim_cell(self.worker_a, CELL, 'a', 300)[0], 'held')
+
+    def test_renewed_lease_is_not_reclaimed(self):
+        self.assertEqual(claim_cell(self.worker_a, CELL, 'a', -1)[0], 'claimed')
+        renew_leases(self.worker_a, 'a', 300)
+        self.assertEqual(claim_cell(self.worker_b, CELL, 'b', 300)[0], 'held')
+
+    def test_released_cell_can_be_claimed(self):
+        self.assertEqual(claim_cell(self.worker_a, CELL, 'a', 300)[0], 'claimed')
+        with self.worker_a:
+            release_cell(self.worker_a, CELL, 'a')
+        self.assertEqual(claim_cell(self.worker_b, CELL, 'b', 300)[0], 'claimed')
+
+    def test_finished_cell_is_reported_done(self):
+        self.assertEqual(claim_cell(self.worker_a, CELL, 'a', 300)[0], 'claimed')
+        with self.worker_a:
+            self.worker_a.execute("""
+                INSERT INTO Experiments (model_family, model_name, puzzle_year, puzzle_day, puzzle_part, answer_is_correct)
+                VALUES ('Gemini', 'gemini-a', 2024, 5, 1, 1)
+            """)
+            release_cell(self.worker_a, CELL, 'a')
+        self.assertEqual(claim_cell(self.worker_b, CELL, 'b', 300), ('done', True))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import time
+import unittest
+from input_files import InputFiles
+from perform import Limits, run, run_measured
+from test_perform import surviving_workers
+from test_profiler import SLOW
+from zygote import Zygote
+
+class TestZygote(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.zygote = Zygote(preload=['json', 'collections'])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.zygote.close()
+
+    def assertSameAsCold(self, program, input='', args=[]):
+        self.assertEqual(self.zygote.run(program, input, args, 5), run(program, input, args, 5))
+
+    def test_matches_cold_start(self):
+        self.assertSameAsCold("print('Hello, world!')")
+        self.assertSameAsCold("import sys\nprint(sys.stdin.read().strip())", 'test input')
+        self.assertSameAsCold("import sys\nprint(sys.argv)", '', ['arg1', 'arg2'])
+        self.assertSameAsCold("1 / 0")
+        self.assertSameAsCold("import sys\nsys.exit('bye')")
+        self.assertSameAsCold("import sys\nsys.exit(3)")
+        self.assertSameAsCold("print(__name__)")
+
+    def test_large_input_and_output(self):
+        status, output, _ = self.zygote.run_measured("import sys\nprint(len(sys.stdin.read()))\nprint('x' * 3000000)", 'y' * 5000000, [], 5,
+                                                     Limits(stdout_bytes=4000000))
+        self.assertEqual(status, 'success')
+        self.assertEqual(output.split('\n')[0], '5000000')
+        self.assertEqual(len(output), len('5000000\n') + 3000001)
+
+    def test_input_file(self):
+        files = InputFiles()
+        try:
+            input_file = files.get((2024, 1), lambda: 'y' * 5000000)
+            self.assertEqual(self.zygote.run("import sys\nprint(len(sys.stdin.read()))", input_file, [], 5), ('success', '5000000\n'))
+        finally:
+            files.close()
+
+    def test_timeout(self):
+        started_at = time.monotonic()
+        status, output = self.zygote.run("while True:\n    pass", '', [], 1)
+        self.assertEqual(status, 'timeout')
+        self.assertIsNone(output)
+        self.assertLess(time.monotonic() - started_at, 3)
+
+    def test_timeout_after_closing_output(self):
+        started_at = time.monotonic()
+        status, output = self.zygote.run("import os, time\nos.close(1)\nos.close(2)\ntime.sleep(15)", '', [], 1)
+        self.assertEqual(status, 'timeout')
+        self.assertIsNone(output)
+        self.assertLess(time.monotonic() - started_at, 5)
+
+    def test_memory_matches_cold_start(self):
+        # numpy's pages are inherited by every child, but aren't the program's.
+        zygote = Zygote(preload=['numpy'])
+        try:
+            program, limits = "x = bytearray(192 * 1024 ** 2)", Limits(memory_bytes=256 * 1024 ** 2)
+            warm_status, _, warm_usage = zygote.run_measured(program, '', [], 5, limits)
+            cold_status, _, cold_usage = run_measured(program, '', [], 5, limits)
+        finally:
+            zygote.close()
+        self.assertEqual((warm_status, cold_status), ('success', 'success'))
+        self.assertLess(abs(warm_usage.max_rss_kb - cold_usage.max_rss_kb), 10 * 1024)
+
+    def test_output_limit(self):
+        status, message = self.zygote.run("while True:\n    print('spam')", '', [], 5)
+        self.assertEqual(status, 'output_limit')
+        self.assertIn('stdout', message)
+
+    def test_workers_are_killed(self):
+        self.assertEqual(surviving_workers(self.zygote.run, "while True:\n    pass", 1), ('timeout', []))
+        self.assertEqual(surviving_workers(self.zygote.run, "print('done')"), ('success', []))
+
+    def test_programs_do_not_share_state(self):
+        self.zygote.run("import json\njson.leaked = True", '', [], 5)
+        status, output = self.zygote.run("import json\nprint(hasattr(json, 'leaked'))", '', [], 5)
+        self.assertEqual((status, output), ('success', 'False\n'))
+
+    def test_profile(self):
+        status, _, usage = self.zygote.run_measured(SLOW, '', [], 1, profile_top=3)
+        self.assertEqual(status, 'timeout')
+        self.assertEqual(usage.profile['lines'][0]['function'], 'unique')
+        self.assertLessEqual(len(usage.profile['lines']), 3)
+
+if __name__ == '__main__':
+    unittest.main()
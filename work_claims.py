@@ -0,0 +1,80 @@
+import datetime
+import os
+import socket
+from typing import Tuple
+
+# A cell is (puzzle_year, puzzle_day, puzzle_part, model_family, model_name), as in scheduler.Cell.
+
+def default_worker_id() -> str:
+    """Returns an id that is unique among the runners working on the same database."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def claim_cell(conn, cell, worker_id: str, lease_seconds: float) -> Tuple[str, object]:
+    """Tries to claim a cell for this worker.
+
+    The claim succeeds if nobody holds the cell, or if the worker holding it let its lease
+    expire, for example because it crashed. It's a single statement, so two runners can't
+    both claim the same cell.
+
+    Returns:
+        ('claimed', None) if this worker now holds the cell.
+        ('done', answer_is_correct) if another worker already recorded the experiment.
+        ('held', lease_expires_at) if another worker holds a live lease on the cell.
+    """
+    puzzle_year, puzzle_day, puzzle_part, model_family, model_name = cell
+    now = datetime.datetime.now()
+    lease_expires_at = now + datetime.timedelta(seconds=lease_seconds)
+    with conn:
+        cursor = conn.execute("""
+            INSERT INTO WorkClaims (
+                model_family, model_name, puzzle_year, puzzle_day, puzzle_part,
+                worker_id, claimed_at, heartbeat_at, lease_expires_at
+            )
+            SELECT ?, ?, ?, ?, ?, ?, ?, ?, ?
+            WHERE NOT EXISTS (
+                SELECT 1 FROM Experiments
+                WHERE model_family = ? AND model_name = ? AND puzzle_year = ? AND puzzle_day = ? AND puzzle_part = ?
+            )
+            ON CONFLICT (model_family, model_name, puzzle_year, puzzle_day, puzzle_part) DO UPDATE SET
+                worker_id = excluded.worker_id,
+                claimed_at = excluded.claimed_at,
+                heartbeat_at = excluded.heartbeat_at,
+                lease_expires_at = excluded.lease_expires_at
+            WHERE WorkClaims.lease_expires_at < excluded.claimed_at OR WorkClaims.worker_id = excluded.worker_id
+        """, (model_family, model_name, puzzle_year, puzzle_day, puzzle_part, worker_id, now, now, lease_expires_at,
+              model_family, model_name, puzzle_year, puzzle_day, puzzle_part))
+        if cursor.rowcount == 1:
+            return ('claimed', None)
+
+    row = conn.execute("""
+        SELECT answer_is_correct FROM Experiments
+        WHERE model_family = ? AND model_name = ? AND puzzle_year = ? AND puzzle_day = ? AND puzzle_part = ?
+    """, (model_family, model_name, puzzle_year, puzzle_day, puzzle_part)).fetchone()
+    if row is not None:
+        return ('done', row[0] == 1)
+    row = conn.execute("""
+        SELECT lease_expires_at FROM WorkClaims
+        WHERE model_family = ? AND model_name = ? AND puzzle_year = ? AND puzzle_day = ? AND puzzle_part = ?
+    """, (model_family, model_name, puzzle_year, puzzle_day, puzzle_part)).fetchone()
+    if row is None:
+        # The other worker finished and released the cell between the two queries.
+        return claim_cell(conn, cell, worker_id, lease_seconds)
+    lease_expires_at = row[0]
+    if isinstance(lease_expires_at, str):
+        lease_expires_at = datetime.datetime.fromisoformat(lease_expires_at)
+    return ('held', lease_expires_at)
+
+def release_cell(conn, cell, worker_id: str):
+    """Gives up this worker's claim on a cell. The caller commits."""
+    puzzle_year, puzzle_day, puzzle_part, model_family, model_name = cell
+    conn.execute("""
+        DELETE FROM WorkClaims
+        WHERE model_family = ? AND model_name = ? AND puzzle_year = ? AND puzzle_day = ? AND puzzle_part = ? AND worker_id = ?
+    """, (model_family, model_name, puzzle_year, puzzle_day, puzzle_part, worker_id))
+
+def renew_leases(conn, worker_id: str, lease_seconds: float):
+    """Extends the leases on every cell this worker holds, as a heartbeat."""
+    now = datetime.datetime.now()
+    with conn:
+        conn.execute("UPDATE WorkClaims SET heartbeat_at = ?, lease_expires_at = ? WHERE worker_id = ?",
+                     (now, now + datetime.timedelta(seconds=lease_seconds), worker_id))
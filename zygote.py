@@ -0,0 +1,303 @@
+import builtins
+import dataclasses
+import json
+import os
+import perform
+import profiler
+import selectors
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+import types
+from typing import Iterable, List, Tuple
+
+# Modules that generated programs commonly import, loaded once in the zygote.
+PRELOAD = ['collections', 'functools', 'heapq', 'itertools', 'math', 're', 'numpy', 'networkx']
+
+class Zygote:
+    """
+    A warm Python interpreter that forks a fresh child for every program it runs.
+
+    Starting python and importing numpy and networkx takes far longer than most generated
+    programs run for. The zygote is a separate process that imports PRELOAD once and then
+    forks a child per program, so each program starts with those modules already loaded.
+
+    The zygote never runs a program itself, so every child starts from the same clean state.
+    Each child gets its own __main__ module, sys.argv, stdin, stdout and stderr. It runs in its
+    own process group, like the `python -c` process started by perform.run, and the group is
+    killed when the child exits.
+
+    A child inherits the pages of the preloaded modules. Their resident size is left out of
+    the child's max_rss_kb and their address space is added to its memory limit, so memory
+    usage and limits compare with cold runs. One difference remains: all children share the
+    zygote's string hash seed, where separate interpreters each get a random one.
+
+    run() is safe to call from several threads; the zygote forks children concurrently.
+    """
+
+    def __init__(self, preload: List[str] = PRELOAD, start_timeout: float = 60):
+        self._dir = tempfile.mkdtemp(prefix='zygote-')
+        self._path = os.path.join(self._dir, 'socket')
+        # The zygote exits when its stdin is closed, so it doesn't outlive the runner.
+        self._process = subprocess.Popen([sys.executable, os.path.abspath(__file__), self._path, *preload],
+                                         stdin=subprocess.PIPE)
+        deadline = time.monotonic() + start_timeout
+        while not os.path.exists(self._path):
+            if self._process.poll() is not None or time.monotonic() > deadline:
+                self.close()
+                raise RuntimeError("The zygote failed to start")
+            time.sleep(0.01)
+
+    def run(self, program: str, input: str | perform.InputFile, args: List[str], timeout: int) -> Tuple[str, str | None]:
+        """Runs a program in a child of the zygote. Same contract as perform.run."""
+        status, output, _ = self.run_measured(program, input, args, timeout)
+        return status, output
+
+    def run_measured(self, program: str, input: str | perform.InputFile, args: List[str], timeout: int,
+                     limits: perform.Limits = perform.LIMITS, cores: Iterable[int] | None = None,
+                     profile_top: int | None = None) -> Tuple[str, str | None, perform.Usage | None]:
+        """Runs a program in a child of the zygote. Same contract as perform.run_measured.
+
+        With profile_top the child is profiled and usage.profile is set, see profiler.py.
+        """
+        pipes = []
+        profile_file = tempfile.TemporaryFile() if profile_top else None
+        try:
+            stdin_r, stdin_w, data = perform.open_stdin(input)
+            pipes = [fd for fd in [stdin_r, stdin_w] if fd is not None]
+            stdout_r, stdout_w = os.pipe()
+            stderr_r, stderr_w = os.pipe()
+            pipes += [stdout_r, stdout_w, stderr_r, stderr_w]
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(self._path)
+                payload = json.dumps({'program': program, 'args': args, 'timeout': timeout,
+                                      'limits': dataclasses.asdict(limits), 'cores': cores and list(cores),
+                                      'profile': profile_file is not None}).encode()
+                fds = [stdin_r, stdout_w, stderr_w] + ([profile_file.fileno()] if profile_file else [])
+                socket.send_fds(sock, [len(payload).to_bytes(8, 'big')], fds)
+                sock.sendall(payload)
+                # Only the child keeps its ends of the pipes, so we see EOF when it exits.
+                for fd in [stdin_r, stdout_w, stderr_w]:
+                    os.close(fd)
+                    pipes.remove(fd)
+                replies = bytearray()
+                pid = int(_read_line(sock, replies))
+
+                deadline = time.monotonic() + timeout * perform.WALL_CLOCK_FACTOR
+                ended, stdout, stderr = perform.communicate(stdin_w, stdout_r, stderr_r, data, deadline, limits)
+                pipes = []
+                # A program can close its output and keep running, so the deadline holds until it exits.
+                reply = _read_line(sock, replies, deadline) if ended == 'closed' else None
+                if reply is None:
+                    ended = 'timeout' if ended == 'closed' else ended
+                    perform.kill_group(pid)
+                    reply = _read_line(sock, replies)
+                returncode, user_seconds, system_seconds, max_rss_kb = reply.split()
+            usage = perform.Usage(float(user_seconds), float(system_seconds), int(max_rss_kb))
+            if profile_file is not None:
+                usage.profile = profiler.read(profile_file, profile_top)
+            return perform.judge(int(returncode), usage, stdout, stderr, timeout, ended, limits)
+        except Exception as e:
+            return 'error', str(e), None
+        finally:
+            for fd in pipes:
+                os.close(fd)
+            if profile_file is not None:
+                profile_file.close()
+
+    def close(self):
+        if self._process.poll() is None:
+            self._process.stdin.close()
+            self._process.wait()
+        if os.path.exists(self._path):
+            os.remove(self._path)
+        os.rmdir(self._dir)
+
+def _read_line(sock, buffer: bytearray, deadline: float | None = None) -> bytes | None:
+    """Reads a line from sock, keeping what comes after it in buffer. Returns None if the deadline passes first."""
+    while b'\n' not in buffer:
+        sock.settimeout(None if deadline is None else max(deadline - time.monotonic(), 0))
+        try:
+            chunk = sock.recv(4096)
+        except (TimeoutError, BlockingIOError):
+            return None
+        finally:
+            sock.settimeout(None)
+        if not chunk:
+            raise RuntimeError("The zygote closed the connection")
+        buffer += chunk
+    line, _, rest = buffer.partition(b'\n')
+    buffer[:] = rest
+    return bytes(line)
+
+def _address_space_kb() -> int:
+    """The address space of this process in kilobytes, or 0 where there's no /proc."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmSize:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+def _child_rss_kb() -> int:
+    """The max_rss_kb of a child that exits as soon as it's forked, what every child starts with."""
+    pid = os.fork()
+    if pid == 0:
+        os._exit(0)
+    _, _, rusage = os.wait4(pid, 0)
+    return perform.Usage.from_rusage(rusage).max_rss_kb
+
+def serve(socket_path: str, preload: List[str]):
+    """The zygote's main loop: fork a child for each request and report when it exits."""
+    rss_before, size_before = _child_rss_kb(), _address_space_kb()
+    for name in preload:
+        try:
+            __import__(name)
+        except ImportError:
+            pass
+    # What every child inherits from the preloading, and a cold run doesn't have.
+    preload_rss_kb = max(_child_rss_kb() - rss_before, 0)
+    preload_size_kb = max(_address_space_kb() - size_before, 0)
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path + '.tmp')
+    listener.listen(64)
+    # Clients wait for the socket to appear, so only show it once it's listening.
+    os.rename(socket_path + '.tmp', socket_path)
+
+    wakeup_r, wakeup_w = os.pipe()
+    os.set_blocking(wakeup_w, False)
+    signal.set_wakeup_fd(wakeup_w)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+
+    children = {}  # pid -> connection of the client waiting for it
+    selector = selectors.DefaultSelector()
+    selector.register(listener, selectors.EVENT_READ)
+    selector.register(wakeup_r, selectors.EVENT_READ)
+    selector.register(sys.stdin, selectors.EVENT_READ)
+    while True:
+        for key, _ in selector.select():
+            if key.fileobj is sys.stdin:
+                return
+            elif key.fileobj is listener:
+                conn, _ = listener.accept()
+                try:
+                    request, fds = _receive(conn)
+                except Exception:
+                    conn.close()
+                    continue
+                pid = os.fork()
+                if pid == 0:
+                    selector.close()
+                    for fd in [listener.fileno(), conn.fileno(), wakeup_r, wakeup_w, *(c.fileno() for c in children.values())]:
+                        os.close(fd)
+                    _run_child(request, fds, preload_size_kb)
+                # Both sides set the process group, so it exists before the client can kill it.
+                try:
+                    os.setpgid(pid, pid)
+                except OSError:
+                    pass
+                for fd in fds:
+                    os.close(fd)
+                conn.sendall(f"{pid}\n".encode())
+                children[pid] = conn
+            else:
+                os.read(wakeup_r, 4096)
+                while children:
+                    exited = os.waitid(os.P_ALL, 0, os.WEXITED | os.WNOHANG | os.WNOWAIT)
+                    if exited is None:
+                        break
+                    # Like perform._wait, kill what's left of the group before reaping its leader.
+                    perform.kill_group(exited.si_pid)
+                    pid, status, rusage = os.wait4(exited.si_pid, 0)
+                    conn = children.pop(pid, None)
+                    if conn is not None:
+                        usage = perform.Usage.from_rusage(rusage)
+                        usage.max_rss_kb = max(usage.max_rss_kb - preload_rss_kb, 0)
+                        try:
+                            conn.sendall(f"{os.waitstatus_to_exitcode(status)} {usage.user_seconds} {usage.system_seconds} {usage.max_rss_kb}\n".encode())
+                        except OSError:
+                            pass
+                        conn.close()
+
+def _receive(conn):
+    conn.settimeout(10)
+    header, fds, _, _ = socket.recv_fds(conn, 8, 4)
+    while len(header) < 8:
+        header += conn.recv(8 - len(header))
+    length = int.from_bytes(header, 'big')
+    payload = b''
+    while len(payload) < length:
+        chunk = conn.recv(length - len(payload))
+        if not chunk:
+            raise EOFError
+        payload += chunk
+    return json.loads(payload), fds
+
+def _run_child(request, fds, preload_size_kb: int):
+    """Runs a program like `python -c program *args` would, then exits. Never returns.
+
+    The memory limit is raised by preload_size_kb, the address space of the preloaded modules.
+    """
+    code = 1
+    try:
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        os.setpgid(0, 0)
+        limits = perform.Limits(**request['limits'])
+        if limits.memory_bytes is not None:
+            limits.memory_bytes += preload_size_kb * 1024
+        perform.prepare_child(limits, request['timeout'], request['cores'])
+        for target, fd in enumerate(fds[:3]):
+            os.dup2(fd, target)
+            os.close(fd)
+        sys.stdin = sys.__stdin__ = open(0, 'r', closefd=False)
+        sys.stdout = sys.__stdout__ = open(1, 'w', closefd=False)
+        sys.stderr = sys.__stderr__ = open(2, 'w', closefd=False)
+        if 'numpy' in sys.modules:
+            # The random module reseeds itself after a fork, numpy doesn't.
+            sys.modules['numpy'].random.seed()
+        if request.get('profile'):
+            profiler.start(fds[3])
+        code = run_as_main(request['program'], request['args'])
+        profiler.stop()
+    except BaseException:
+        code = code or 120
+    finally:
+        os._exit(code)
+
+def run_as_main(program: str, args: List[str]) -> int:
+    """Runs a program in a new __main__ module like `python -c program *args` would. Returns the exit code."""
+    sys.argv = ['-c', *args]
+    # `python -c` looks for modules in the current directory first, not in this file's directory.
+    sys.path[0] = ''
+    main = types.ModuleType('__main__')
+    main.__builtins__ = builtins
+    sys.modules['__main__'] = main
+    try:
+        exec(compile(program, '<string>', 'exec'), main.__dict__)
+        code = 0
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException as e:
+        # Leave out this function's frame, like the traceback of `python -c`.
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+        code = 1
+    sys.stdout.flush()
+    sys.stderr.flush()
+    return code
+
+if __name__ == "__main__":
+    serve(sys.argv[1], sys.argv[2:])